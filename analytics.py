@@ -0,0 +1,149 @@
+# FILE: analytics.py
+"""Sales analytics for the Reports panel: top sellers, category/season margin and
+sell-through, and an hour x weekday heatmap over any date range.
+
+Columns are read in chunks (fetchmany) into NumPy arrays and grouped with
+vectorized bincount/unique instead of Python loops. Sales come from the
+per-day summary tables (summaries.py), so years of history are a few rows per
+day and item, not one row per sale line; purchases are summed per item, across
+the yearly history files (history.py) when the range reaches archived years.
+Results are cached per (range, data token): the panel passes app.db.data_token(),
+so a report is recomputed only after something was written.
+
+NumPy is only needed here and is imported lazily; without it the Reports panel
+keeps its plain totals.
+"""
+import datetime
+import threading
+from collections import OrderedDict
+from config import *
+from endpoints import remote_read
+import history
+
+def available():
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# --- LOADING ---
+def load_columns(conn, sql, params, dtypes, chunk=ANALYTICS_CHUNK):
+    """Runs sql and returns one NumPy array per column, built fetchmany(chunk) rows at a time"""
+    import numpy as np
+    cur = conn.execute(sql, params)
+    numeric = all(np.dtype(d).kind in "iuf" for d in dtypes)  # One 2-D block per chunk, no per-column tuples
+    parts = []
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows: break
+        if numeric: parts.append(np.array(rows, dtype=np.float64).reshape(len(rows), len(dtypes)))
+        else: parts.append([np.array(col, dtype=d) for col, d in zip(zip(*rows), dtypes)])
+    if not parts: return [np.array([], dtype=d) for d in dtypes]
+    if numeric:
+        block = np.concatenate(parts)
+        return [block[:, i].astype(d) for i, d in enumerate(dtypes)]
+    return [np.concatenate([p[i] for p in parts]) for i in range(len(dtypes))]
+
+def group_sum(keys, *values):
+    """Vectorized GROUP BY keys: (unique keys, one summed array per value)"""
+    import numpy as np
+    uniq, inv = np.unique(keys, return_inverse=True)
+    return uniq, [np.bincount(inv, weights=v, minlength=len(uniq)) for v in values]
+
+# --- BREAKDOWNS ---
+@remote_read
+def top_items(conn, start, end, n=ANALYTICS_TOP_N):
+    """[(item_id, name, category, qty, revenue, profit, margin, sell_through)] by revenue"""
+    import numpy as np
+    item, qty, rev, profit = load_columns(conn, "SELECT item_id, qty, revenue, profit FROM sales_item_daily WHERE day >= ? AND day < ?",
+                                          (start, end), (np.int64, np.float64, np.float64, np.float64))
+    ids, (qty, rev, profit) = group_sum(item, qty, rev, profit)
+    best = np.argsort(-rev, kind="stable")[:n]
+    ids = [int(i) for i in ids[best]]
+    info = {r[0]: r[1:] for r in conn.execute(
+        f"SELECT id, name, category, coalesce(stock, 0) FROM items WHERE id IN ({','.join('?' * len(ids))})", ids)} if ids else {}
+    out = []
+    for i, q, r, p in zip(ids, qty[best], rev[best], profit[best]):
+        name, cat, stock = info.get(i, (f"Item #{i}", "", 0))
+        out.append((i, name, cat, int(q), float(r), float(p), float(p / r) if r else 0.0, float(q / (q + max(stock, 0))) if q else 0.0))
+    return out
+
+@remote_read
+def category_mix(conn, start, end):
+    """[(category, season, qty, revenue, profit, margin, received, on_hand, sell_through)] by revenue.
+    Sell-through = units sold / (units sold + units on hand)."""
+    import numpy as np
+    cat, season, qty, rev, profit = load_columns(
+        conn, "SELECT category, season, qty, revenue, profit FROM sales_category_daily WHERE day >= ? AND day < ?",
+        (start, end), (object, object, np.float64, np.float64, np.float64))
+    i_id, i_cat, i_season, i_stock = load_columns(conn, "SELECT id, coalesce(category, ''), coalesce(season, ''), max(coalesce(stock, 0), 0) FROM items ORDER BY id",
+                                                  (), (np.int64, object, object, np.float64))
+    bought = history.grouped(conn, "purchases", ("t.item_id",), ("t.quantity",), start, end)  # Spans archived years too
+    p_item = np.fromiter((k[0] or 0 for k in bought), np.int64, len(bought))
+    p_qty = np.fromiter((v[0] for v in bought.values()), np.float64, len(bought))
+    # (category, season) -> one integer code; items are few distinct pairs, so strings are only
+    # compared once per pair and everything after is integer bincounts
+    pairs = sorted(set(zip(cat, season)) | set(zip(i_cat, i_season)))
+    code = {p: k for k, p in enumerate(pairs)}
+    s_code = np.array([code[p] for p in zip(cat, season)], dtype=np.int64)
+    i_code = np.array([code[p] for p in zip(i_cat, i_season)], dtype=np.int64)
+    # Purchases -> their item's code: items come sorted by id, so a searchsorted join
+    pos = np.clip(np.searchsorted(i_id, p_item), 0, max(len(i_id) - 1, 0))
+    known = i_id[pos] == p_item if len(i_id) else np.zeros(len(p_item), bool)
+    sums = lambda c, w: np.bincount(c, weights=w, minlength=len(pairs))
+    qty, rev, profit = sums(s_code, qty), sums(s_code, rev), sums(s_code, profit)
+    received, on_hand = sums(i_code[pos[known]], p_qty[known]), sums(i_code, i_stock)
+    out = []
+    for j in np.argsort(-rev, kind="stable"):
+        (c, s), sold = pairs[j], qty[j]
+        out.append((c, s, int(sold), float(rev[j]), float(profit[j]), float(profit[j] / rev[j]) if rev[j] else 0.0,
+                    int(received[j]), int(on_hand[j]), float(sold / (sold + on_hand[j])) if sold else 0.0))
+    return out
+
+@remote_read
+def heatmap(conn, start, end):
+    """7 x 24 revenue grid, rows Monday..Sunday, columns hour of day"""
+    import numpy as np
+    day, hour, rev = load_columns(conn, "SELECT day, hour, revenue FROM sales_hourly WHERE day >= ? AND day < ?",
+                                  (start, end), ("datetime64[D]", np.int64, np.float64))
+    weekday = (day.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+    grid = np.bincount(weekday * 24 + np.clip(hour, 0, 23), weights=rev, minlength=7 * 24)
+    return grid.reshape(7, 24).tolist()
+
+# --- CACHED REPORT ---
+class Analytics:
+    """All breakdowns for a date range, cached until the data token changes"""
+    def __init__(self, maxsize=ANALYTICS_CACHE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def report(self, conn, start, end, token=None, top_n=ANALYTICS_TOP_N):
+        """start / end: 'YYYY-MM-DD', end exclusive. conn may be a DBManager reader or a raw connection."""
+        import summaries
+        key = (start, end, top_n)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and token is not None and hit[0] == token:
+                self._cache.move_to_end(key)
+                return hit[1]
+        res = {"start": start, "end": end,
+               "totals": summaries.period_totals(conn, start, end),
+               "top_items": top_items(conn, start, end, top_n),
+               "mix": category_mix(conn, start, end),
+               "heatmap": heatmap(conn, start, end)}
+        if token is not None:
+            with self._lock:
+                self._cache[key] = (token, res)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.maxsize: self._cache.popitem(last=False)
+        return res
+
+def date_range(preset, today=None):
+    """'today' | 'month' | 'year' | '30d' -> (start, end) with end exclusive"""
+    today = today or datetime.date.today()
+    end = today + datetime.timedelta(days=1)
+    start = {"today": today, "month": today.replace(day=1), "year": today.replace(month=1, day=1),
+             "30d": today - datetime.timedelta(days=29)}[preset]
+    return start.isoformat(), end.isoformat()
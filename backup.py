@@ -0,0 +1,246 @@
+# FILE: backup.py
+"""Online backups of the store database, taken while the tills keep selling.
+
+A snapshot is copied with the sqlite3 online backup API, BACKUP_PAGES_PER_STEP
+pages at a time with a short pause between steps, on the scheduler's own thread
+and connection. The source connection holds one read transaction for the whole
+copy: in WAL mode that is a fixed snapshot of the last commit, so checkouts keep
+committing during the copy and it never restarts because of them.
+
+Each copy is checked with PRAGMA integrity_check, gzipped into
+BACKUP_DIR/dolmen-YYYYmmdd-HHMMSS.db.gz and only then counted; the newest
+BACKUP_KEEP snapshots are kept. The app (standalone till) and server.py run a
+BackupScheduler; it skips a run when nothing was committed since the last one.
+
+The yearly history files (history.py) hold the only copy of archived years, so
+every run also copies any history file that changed since its last copy into
+BACKUP_DIR/history/fyYYYY-YYYYmmdd-HHMMSS.db.gz; those are never rotated out. A
+restore puts back history files the restored database needs and reports files
+it does not know about (a snapshot from before an archive run).
+
+    python backup.py                      # take a snapshot now
+    python backup.py --list
+    python backup.py --verify FILE
+    python backup.py --restore FILE       # close the app / store server first
+"""
+import argparse
+import contextlib
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from config import *
+import history
+
+PREFIX, SUFFIX = "dolmen-", ".db.gz"
+
+class BackupError(Exception):
+    pass
+
+class BackupCancelled(BackupError):
+    pass
+
+def _check(conn):
+    """Raises BackupError unless PRAGMA integrity_check is clean"""
+    problems = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    if problems != ["ok"]: raise BackupError("integrity check failed: " + "; ".join(problems[:5]))
+
+# --- SNAPSHOT ---
+def snapshot(db_path=DB_NAME, directory=BACKUP_DIR, pages=BACKUP_PAGES_PER_STEP, pause=BACKUP_STEP_SLEEP, stop=None, prefix=PREFIX):
+    """Copies, verifies and compresses the live database; returns the snapshot's path.
+    stop: a threading.Event that cancels the copy between steps."""
+    os.makedirs(directory, exist_ok=True)
+    name = prefix + datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + SUFFIX
+    fd, raw = tempfile.mkstemp(prefix=".partial-", suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        def step(status, remaining, total):
+            if stop is not None and stop.is_set(): raise BackupCancelled("backup cancelled")
+            if remaining: time.sleep(pause)
+        with contextlib.closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, isolation_level=None)) as src, \
+             contextlib.closing(sqlite3.connect(raw)) as dst:
+            src.execute("BEGIN")  # One read snapshot for the whole copy (WAL: writers carry on)
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            src.backup(dst, pages=pages, progress=step)
+            src.execute("COMMIT")
+            dst.execute("PRAGMA journal_mode=DELETE")  # Self-contained file, no -wal beside it
+            _check(dst)
+        part = os.path.join(directory, name + ".partial")
+        with open(raw, "rb") as f, gzip.open(part, "wb", compresslevel=BACKUP_LEVEL) as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        os.replace(part, os.path.join(directory, name))
+    finally:
+        for p in (raw, os.path.join(directory, name + ".partial")):
+            with contextlib.suppress(FileNotFoundError): os.remove(p)
+    return os.path.join(directory, name)
+
+def snapshots(directory=BACKUP_DIR, prefix=PREFIX):
+    """Snapshot paths, oldest first (the names sort by time)"""
+    return sorted(glob.glob(os.path.join(directory, prefix + "*" + SUFFIX)))
+
+def rotate(directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Deletes all but the newest `keep` snapshots; returns the paths removed"""
+    old = snapshots(directory)[:-keep] if keep > 0 else []
+    for p in old: os.remove(p)
+    return old
+
+# --- HISTORY FILES ---
+def history_backups(directory=BACKUP_DIR):
+    return os.path.join(directory, HISTORY_DIR)
+
+def backup_history(db_path=DB_NAME, directory=BACKUP_DIR, stop=None):
+    """Snapshots each yearly history file written since its last copy; returns the new copies.
+    A history file only changes when its year is archived, so this is usually a few stat() calls."""
+    dest, out = history_backups(directory), []
+    for path in sorted(glob.glob(os.path.join(history.directory(db_path), "fy*.db"))):
+        prefix = os.path.basename(path)[:-3] + "-"
+        done = snapshots(dest, prefix)
+        if done and os.path.getmtime(done[-1]) >= os.path.getmtime(path): continue
+        out.append(snapshot(path, dest, pages=-1, pause=0, stop=stop, prefix=prefix))
+    return out
+
+def _reconcile_history(db_path, directory):
+    """After a restore: puts back missing history files the restored registry lists (from their
+    newest copy) and describes files on disk the registry doesn't list; returns notes for the operator"""
+    notes, base = [], history.directory(db_path)
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        registered = {fy: (file, sales) for fy, file, sales in conn.execute("SELECT fy, file, sales FROM history_years")} \
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_years'").fetchone() else {}
+    for fy, (file, sales) in sorted(registered.items()):
+        path = os.path.join(base, file)
+        if os.path.exists(path): continue
+        copies = snapshots(history_backups(directory), file[:-3] + "-")
+        if not copies:
+            notes.append(f"MISSING: {path} (FY{fy}, {sales:,} sales) is not on disk and has no backup"); continue
+        os.makedirs(base, exist_ok=True)
+        with unpacked(copies[-1]) as raw: shutil.copyfile(raw, path)
+        notes.append(f"restored {path} from {copies[-1]}")
+    for path in sorted(glob.glob(os.path.join(base, "fy*.db"))):
+        name = os.path.basename(path)
+        if not any(f == name for f, _ in registered.values()):
+            notes.append(f"{path} is not archived in the restored database (the snapshot predates that archive run): "
+                         f"its rows are live again and reports ignore the file; the next history.py --archive moves them back")
+    return notes
+
+# --- VERIFY / RESTORE ---
+@contextlib.contextmanager
+def unpacked(path):
+    """The snapshot decompressed to a temporary file, checked with integrity_check"""
+    fd, raw = tempfile.mkstemp(prefix="dolmen-restore-", suffix=".db")
+    try:
+        with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as f: shutil.copyfileobj(f, out, 1 << 20)
+        with contextlib.closing(sqlite3.connect(raw)) as conn: _check(conn)
+        yield raw
+    finally:
+        os.remove(raw)
+
+def verify(path):
+    """(schema version, sales rows) of a good snapshot; raises BackupError otherwise"""
+    try:
+        with unpacked(path) as raw, contextlib.closing(sqlite3.connect(raw)) as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0], conn.execute("SELECT count(*) FROM sales").fetchone()[0]
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        raise BackupError(f"{path}: {e}") from e
+
+def restore(path, db_path=DB_NAME):
+    """Replaces the database's contents with a verified snapshot. Returns (undo, notes): where the
+    current contents were saved first (a pre-restore-*.db.gz that rotate() never deletes), so it can
+    be undone, and what was done about the yearly history files (_reconcile_history)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    with unpacked(path) as raw:
+        undo = None
+        if os.path.exists(db_path):
+            undo = snapshot(db_path, directory, pages=-1, pause=0, prefix="pre-restore-")
+        with contextlib.closing(sqlite3.connect(raw)) as src, contextlib.closing(sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT)) as dst:
+            src.backup(dst)  # Through SQLite, so the live file's WAL and locks stay consistent
+    return undo, _reconcile_history(db_path, directory)
+
+# --- SCHEDULER ---
+class BackupScheduler:
+    """Takes a snapshot every BACKUP_INTERVAL_S on a background thread, if anything changed"""
+    def __init__(self, db_path=DB_NAME, directory=BACKUP_DIR, interval=BACKUP_INTERVAL_S, first=BACKUP_FIRST_S):
+        self.db_path, self.directory, self.interval, self.first = db_path, directory, interval, first
+        self.last = None       # (finished at, path, bytes, seconds) of the last good snapshot
+        self.error = None      # Last failure, cleared by the next good snapshot
+        self.runs = 0          # Attempts finished (the Settings panel waits for this to move)
+        self._version = None   # PRAGMA data_version at the last snapshot
+        self._stop, self._now = threading.Event(), threading.Event()
+        self._thread = None
+        existing = snapshots(directory)
+        if existing: self.last = (os.path.getmtime(existing[-1]), existing[-1], os.path.getsize(existing[-1]), None)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="db-backup", daemon=True)
+        self._thread.start()
+        return self
+
+    def run_now(self):
+        """Snapshot as soon as the thread is free, even if nothing changed"""
+        self._version = None
+        self._now.set()
+
+    def stop(self, wait=5.0):
+        """Cancels a copy in progress (its partial file is removed)"""
+        self._stop.set(); self._now.set()
+        if self._thread: self._thread.join(wait)
+
+    def _run(self):
+        with contextlib.closing(sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)) as watch:
+            self._now.wait(self.first)
+            while not self._stop.is_set():
+                self._now.clear()
+                version = watch.execute("PRAGMA data_version").fetchone()[0]  # Moves when another connection commits
+                if version != self._version or not snapshots(self.directory):
+                    self.run_once()
+                    if self.error is None: self._version = version
+                self._now.wait(self.interval)
+
+    def run_once(self):
+        t = time.perf_counter()
+        try:
+            path = snapshot(self.db_path, self.directory, stop=self._stop)
+            rotate(self.directory)
+            backup_history(self.db_path, self.directory, stop=self._stop)
+            self.last, self.error = (time.time(), path, os.path.getsize(path), time.perf_counter() - t), None
+            return path
+        except BackupCancelled: return None
+        except (BackupError, OSError, sqlite3.Error) as e:
+            self.error = f"{type(e).__name__}: {e}"
+            return None
+        finally:
+            self.runs += 1
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Snapshot, list, verify or restore store database backups")
+    ap.add_argument("--db", default=DB_NAME)
+    ap.add_argument("--dir", default=BACKUP_DIR)
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--list", action="store_true")
+    g.add_argument("--verify", metavar="FILE")
+    g.add_argument("--restore", metavar="FILE")
+    args = ap.parse_args()
+    try:
+        if args.list:
+            for p in snapshots(args.dir) + snapshots(history_backups(args.dir), "fy"):
+                print(f"{os.path.relpath(p, args.dir)}  {os.path.getsize(p) / 1048576:8.1f} MiB")
+        elif args.verify:
+            version, sales = verify(args.verify)
+            print(f"OK: schema version {version}, {sales:,} sales rows")
+        elif args.restore:
+            verify(args.restore)  # Before touching the database
+            undo, notes = restore(args.restore, args.db)
+            print(f"Restored {args.db} from {args.restore}" + (f"; previous contents saved as {undo}" if undo else ""))
+            for n in notes: print("  history: " + n)
+        else:
+            t = time.perf_counter()
+            path = snapshot(args.db, args.dir)
+            gone = rotate(args.dir)
+            for p in backup_history(args.db, args.dir): print(f"{p}: {os.path.getsize(p) / 1048576:.1f} MiB")
+            print(f"{path}: {os.path.getsize(path) / 1048576:.1f} MiB in {time.perf_counter() - t:.1f} s" + (f", {len(gone)} old removed" if gone else ""))
+    except BackupError as e:
+        raise SystemExit(str(e))
@@ -0,0 +1,688 @@
+# FILE: benchmark.py
+"""Headless benchmarks for the POS data layer.
+
+Runs against a scratch copy of the database so the live store file is never touched.
+Usage: python benchmark.py pool [--items N] [--sales N] [--runs N]
+       python benchmark.py search [--items N]
+       python benchmark.py checkout [--writers N] [--receipts N]
+       python benchmark.py startup [--runs N]   (needs a display)
+       python benchmark.py import [--rows N]
+       python benchmark.py export [--sales N]
+       python benchmark.py suite [--items N --sales N | --db FILE] [--save FILE] [--compare FILE]
+       python benchmark.py tills [--tills N] [--receipts N]   (store server load test)
+       python benchmark.py profile [--runs N]   (query profiling overhead)
+       python benchmark.py analytics [--items N --sales N | --db FILE]   (needs numpy)
+       python benchmark.py receipts [--receipts N]   (receipt archive vs one file per receipt)
+       python benchmark.py scan [--items N | --db FILE]   (scan lane: barcode -> cart line)
+       python benchmark.py backup [--items N --sales N | --db FILE]   (checkout latency during an online backup)
+       python benchmark.py history [--items N --sales N | --db FILE] [--keep N]   (archive closed years, multi-year scans)
+"""
+import argparse
+import csv
+import datetime
+import json
+import platform
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from config import *
+from database import DBManager
+from search import ProductSearch
+from profiler import PROFILER
+from checkout import CheckoutEngine, StockConflict, open_receipt, find_receipt
+from bulk_import import BulkImporter, read_csv
+import export
+from receipts import render_receipt, FileSink, ArchiveSink
+from receipt_archive import ReceiptArchive
+from scanner import BarcodeIndex, parse_entry
+from cart import Cart
+import backup
+import store
+import history
+import analytics
+import datagen
+import summaries
+import forecast
+
+# Queries issued by the panels on every keystroke / navigation
+HOT_QUERIES = {
+    "catalog_search": ("SELECT id, name, stock, sale_price FROM items WHERE name LIKE ? AND stock > 0", ("%Shirt%",)),
+    "inventory_list": ("SELECT * FROM items WHERE name LIKE ? ORDER BY id DESC", ("%Kurti%",)),
+    "item_by_id": ("SELECT id, name, stock, sale_price FROM items WHERE id=?", (1,)),
+    "dash_stock": ("SELECT sum(stock) FROM items", ()),
+    "dash_low": ("SELECT count(*) FROM items WHERE stock <= 5", ()),
+}
+
+# --- HELPERS ---
+def scratch_db(items=2000, sales=20000, seed=7):
+    """Creates a throwaway database with a little synthetic data, returns its path"""
+    path = os.path.join(tempfile.mkdtemp(prefix="dolmen_bench_"), DB_NAME)
+    db = DBManager(path)
+    rnd = random.Random(seed)
+    names = ["Shirt", "Kurti", "Jacket", "Trouser", "Scarf", "Sweater", "Jeans", "Shalwar"]
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO items (name, category, season, purchase_price, sale_price, stock) VALUES (?,?,?,?,?,?)",
+                         ((f"{rnd.choice(names)} {i}", rnd.choice(["Men", "Women", "Kids"]), rnd.choice(["Summer", "Winter", "All"]),
+                           500.0, 1200.0, rnd.randint(0, 60)) for i in range(items)))
+        dates = [f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 12:00" for _ in range(sales)]  # One single-line receipt per sale
+        conn.executemany("INSERT INTO receipts (id, number, terminal, seq, date, lines, total) VALUES (?, printf('R-%06d', ?), 'R', ?, ?, 1, 1200.0)",
+                         ((i, i, i, dt) for i, dt in enumerate(dates, 1)))
+        conn.execute("INSERT INTO terminal_seq (terminal, last) VALUES ('R', ?)", (sales,))
+        conn.executemany("INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?,?,?,?,?,?,?)",
+                         ((i, rnd.randint(1, items), 1, 1200.0, 700.0, 1200.0, dt) for i, dt in enumerate(dates, 1)))
+    db.close()
+    return path
+
+def timed(fn, runs):
+    """Returns per-call latencies in milliseconds"""
+    out = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000)
+    return out
+
+def summarize(lat):
+    lat = sorted(lat)
+    return {"p50": round(statistics.median(lat), 4),
+            "p95": round(lat[max(int(len(lat) * 0.95) - 1, 0)], 4),
+            "p99": round(lat[max(int(len(lat) * 0.99) - 1, 0)], 4),
+            "mean": round(statistics.fmean(lat), 4)}
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    print(f"{'query':<22}{'before p50':>12}{'after p50':>12}{'speedup':>10}")
+    for name, before, after in rows:
+        print(f"{name:<22}{before['p50']:>12.3f}{after['p50']:>12.3f}{before['p50'] / max(after['p50'], 1e-9):>9.1f}x")
+
+# --- BENCHMARKS ---
+def bench_pool(args):
+    path = scratch_db(args.items, args.sales)
+    db = DBManager(path)
+    rows = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        def before():
+            conn = sqlite3.connect(path)
+            conn.execute(sql, params).fetchall()
+            conn.close()
+        before_lat = timed(before, args.runs)
+        after_lat = timed(lambda: db.query(sql, params), args.runs)
+        rows.append((name, summarize(before_lat), summarize(after_lat)))
+    db.close()
+    print_table(f"Per-query latency in ms, connect-per-call vs pooled ({args.items} items, {args.sales} sales)", rows)
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+def bench_profile(args):
+    """Latency of the hot queries with the profiling hook off vs on; the difference is its cost"""
+    path = scratch_db(args.items, args.sales)
+    PROFILER.log_path = os.path.join(os.path.dirname(path), QUERY_LOG)
+    plain, traced = DBManager(path, profile=False), DBManager(path, profile=True)
+    rows, extra = [], []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for db in (plain, traced): timed(lambda: db.query(sql, params), 50)  # Warm up
+        off = summarize(timed(lambda: plain.query(sql, params), args.runs))
+        on = summarize(timed(lambda: traced.query(sql, params), args.runs))
+        rows.append((name, off, on))
+        extra.append(on["p50"] - off["p50"])
+    plain.close(); traced.close()
+    print(f"\nPer-query latency in ms, profiling off vs on ({args.runs} runs)")
+    print(f"{'query':<22}{'off p50':>12}{'on p50':>12}{'overhead':>12}")
+    for (name, off, on), d in zip(rows, extra):
+        print(f"{name:<22}{off['p50']:>12.4f}{on['p50']:>12.4f}{d * 1000:>10.1f}us")
+    print(f"median overhead {statistics.median(extra) * 1000:.1f} us per statement; {len(PROFILER.stats())} statements tracked")
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+def bench_search(args):
+    """Search-as-you-type latency: every prefix of each query, as the cashier types it"""
+    path = scratch_db(args.items, 0)
+    db = DBManager(path)
+    engine = ProductSearch(db)
+    typed = ["shirt", "kur", "jacket 12", "men sw", "winter jea", "sca 9"]
+    keystrokes = [q[:n] for q in typed for n in range(1, len(q) + 1)]
+    for in_stock in (True, False):
+        lat = timed(lambda: [list(engine.search(k, in_stock=in_stock)) for k in keystrokes], args.runs)
+        per_key = summarize([l / len(keystrokes) for l in lat])
+        print(f"{'catalog' if in_stock else 'inventory':<10} {args.items} items, per keystroke: "
+              f"p50 {per_key['p50']:.2f} ms  p95 {per_key['p95']:.2f} ms (budget 20 ms)")
+    lat = summarize(timed(lambda: db.query("SELECT * FROM items WHERE name LIKE ?", ("%jacket 12%",)), args.runs))
+    print(f"old LIKE '%...%' scan for comparison: p50 {lat['p50']:.2f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+def _till(path, items, receipts, seed):
+    """One simulated till: commits `receipts` random carts, returns (ok, conflicts, latencies)"""
+    db = DBManager(path)
+    engine = CheckoutEngine(db)
+    rnd = random.Random(seed)
+    ok = conflicts = 0
+    lat = []
+    for _ in range(receipts):
+        cart = [{"id": rnd.randint(1, items), "qty": rnd.randint(1, 3), "price": 1200.0, "total": 1200.0}
+                for _ in range(rnd.randint(1, 5))]
+        t = time.perf_counter()
+        try:
+            engine.commit(cart)
+            ok += 1
+        except StockConflict:
+            conflicts += 1
+        lat.append((time.perf_counter() - t) * 1000)
+    db.close()
+    return ok, conflicts, lat
+
+def bench_checkout(args):
+    """Receipts/second with N concurrent till processes writing the same database"""
+    path = scratch_db(args.items, 0)
+    db = DBManager(path)
+    for writers in sorted({1, args.writers}):
+        db.execute("UPDATE items SET stock = ?", (args.stock,))
+        t = time.perf_counter()
+        with multiprocessing.Pool(writers) as pool:
+            res = pool.starmap(_till, [(path, args.items, args.receipts, w) for w in range(writers)])
+        elapsed = time.perf_counter() - t
+        ok, conflicts = sum(r[0] for r in res), sum(r[1] for r in res)
+        lat = summarize([l for r in res for l in r[2]])
+        print(f"{writers:>2} writer(s): {ok / elapsed:8.1f} receipts/s  ({ok} committed, {conflicts} stock conflicts)  "
+              f"commit p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+def bench_startup(args):
+    """Launches main.py in probe mode and reports process start -> login screen -> dashboard"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    work = tempfile.mkdtemp(prefix="dolmen_start_")  # Fresh cwd: own DB, receipts and logo cache
+    for f in (DEFAULT_LOGO,):
+        if os.path.exists(os.path.join(here, f)): shutil.copy(os.path.join(here, f), work)
+    env = dict(os.environ, DOLMEN_STARTUP_PROBE="1")
+    results = {"imports": [], "login": [], "dashboard": []}
+    for run in range(args.runs + 1):  # First run is cold: creates the DB and logo cache, not counted
+        t0 = time.time()
+        proc = subprocess.run([sys.executable, os.path.join(here, "main.py")], cwd=work, env=env,
+                              capture_output=True, text=True, timeout=120)
+        marks = {l.split()[1]: float(l.split()[2]) for l in proc.stdout.splitlines() if l.startswith("STARTUP ")}
+        if proc.returncode or "dashboard" not in marks:
+            shutil.rmtree(work, ignore_errors=True)
+            raise SystemExit(f"main.py failed to start:\n{proc.stderr.strip()[-2000:]}")
+        label = "cold (first launch)" if run == 0 else f"run {run}"
+        print(f"{label:<20} " + "  ".join(f"{k} {1000 * (marks[k] - t0):7.1f} ms" for k in results))
+        if run:
+            for k in results: results[k].append(1000 * (marks[k] - t0))
+    print("median (warm)        " + "  ".join(f"{k} {statistics.median(v):7.1f} ms" for k, v in results.items()))
+    shutil.rmtree(work, ignore_errors=True)
+
+def bench_import(args):
+    """Bulk CSV import rows/s vs. one transaction per row (how the Purchase form writes)"""
+    path = scratch_db(0, 0)
+    work = os.path.dirname(path)
+    rnd = random.Random(3)
+    items_csv, purchases_csv = os.path.join(work, "items.csv"), os.path.join(work, "purchases.csv")
+    with open(items_csv, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "category", "season", "purchase_price", "sale_price", "stock"])
+        w.writerows((f"Article {i}", rnd.choice(["Men", "Women", "Kids"]), rnd.choice(["Summer", "Winter", "All"]),
+                     500, 1200, rnd.randint(0, 50)) for i in range(args.rows))
+    with open(purchases_csv, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "quantity", "purchase_price", "date"])
+        w.writerows((f"Article {rnd.randrange(args.rows)}", rnd.randint(1, 20), 520, "2025-06-01") for _ in range(args.rows))
+    db = DBManager(path)
+    for kind, src in (("items", items_csv), ("purchases", purchases_csv)):
+        t = time.perf_counter()
+        report = getattr(BulkImporter(db), f"import_{kind}")(read_csv(src))
+        elapsed = time.perf_counter() - t
+        print(f"{kind:<10} {report.ok:>8} rows in {elapsed:6.2f} s  {report.ok / elapsed:10.0f} rows/s  ({report.failed} rejected)")
+    n = min(args.rows, 2000)  # Baseline is slow; a sample is enough for the rate
+    t = time.perf_counter()
+    for i in range(n):
+        with db.transaction() as conn:
+            conn.execute("UPDATE items SET stock=stock+?, purchase_price=? WHERE id=?", (1, 520, i % args.rows + 1))
+            conn.execute("INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)", (i % args.rows + 1, 1, 520, "2025-06-01"))
+    elapsed = time.perf_counter() - t
+    print(f"{'per-row':<10} {n:>8} rows in {elapsed:6.2f} s  {n / elapsed:10.0f} rows/s  (baseline)")
+    db.close()
+    shutil.rmtree(work, ignore_errors=True)
+
+def bench_export(args):
+    """Export rows/s and peak Python memory; memory should not grow with --sales"""
+    path = scratch_db(2000, args.sales)
+    db = DBManager(path)
+    out = os.path.join(os.path.dirname(path), "exports")
+    for fmt in export.WRITERS:
+        t = time.perf_counter()
+        _, n = export.export(db.reader, "sales", fmt, out)
+        elapsed = time.perf_counter() - t
+        tracemalloc.start()  # Second, traced pass: tracing slows the export down several times
+        export.export(db.reader, "sales", fmt, out)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{fmt:<9} {n:>9} rows in {elapsed:6.2f} s  {n / elapsed:10.0f} rows/s  peak memory {peak / 2**20:6.2f} MiB")
+    def sale(dt):
+        with db.transaction() as conn:
+            rid, _ = open_receipt(conn, "R", dt, 1, 1200.0)
+            conn.execute("INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?, 1, 1, 1200, 700, 1200, ?)", (rid, dt))
+    sale("2025-12-31 18:00")
+    export.export(db.reader, "sales", "csv", out, incremental=True)
+    sale("2025-12-31 18:05")
+    t = time.perf_counter()
+    _, n = export.export(db.reader, "sales", "csv", out, incremental=True)
+    print(f"incremental run after 1 new sale: {n} row(s) in {1000 * (time.perf_counter() - t):.1f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+# --- STORE SERVER LOAD TEST ---
+def _remote_till(url, terminal, items, receipts, seed):
+    """One till in client mode: types a search, looks up items, checks out; returns (ok, conflicts, checkout ms, search ms)"""
+    from client import RemoteDB, RemoteSearch, RemoteCheckout
+    db = RemoteDB(url)
+    search, engine = RemoteSearch(db), RemoteCheckout(db, terminal)
+    rnd = random.Random(seed)
+    ok = conflicts = 0
+    lat, slat = [], []
+    for _ in range(receipts):
+        for k in range(1, 4):  # A few keystrokes of a search-as-you-type
+            t = time.perf_counter()
+            list(search.search(rnd.choice(["shirt", "kurti", "jacket", "scarf"])[:k], in_stock=True))
+            slat.append((time.perf_counter() - t) * 1000)
+        cart = []
+        for _ in range(rnd.randint(1, 4)):
+            iid, name, stock, price = store.item(db.reader, rnd.randint(1, items))
+            cart.append({"id": iid, "name": name, "qty": 1, "price": price, "total": price})
+        t = time.perf_counter()
+        try:
+            engine.commit(cart)
+            ok += 1
+        except StockConflict:
+            conflicts += 1
+        lat.append((time.perf_counter() - t) * 1000)
+    db.close()
+    return ok, conflicts, lat, slat
+
+def bench_tills(args):
+    """N client-mode tills against one store server on localhost"""
+    import server
+    path = scratch_db(args.items, 0)
+    db = DBManager(path)
+    db.execute("UPDATE items SET stock = ?", (args.stock,))
+    srv = server.serve(db, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    t = time.perf_counter()
+    with multiprocessing.Pool(args.tills) as pool:
+        res = pool.starmap(_remote_till, [(url, f"T{n + 1}", args.items, args.receipts, n) for n in range(args.tills)])
+    elapsed = time.perf_counter() - t
+    ok, conflicts = sum(r[0] for r in res), sum(r[1] for r in res)
+    lat, slat = summarize([l for r in res for l in r[2]]), summarize([l for r in res for l in r[3]])
+    print(f"{args.tills} tills, {ok / elapsed:.1f} receipts/s ({ok} committed, {conflicts} stock conflicts) in {elapsed:.1f} s")
+    print(f"checkout  p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms  p99 {lat['p99']:.2f} ms")
+    print(f"search    p50 {slat['p50']:.2f} ms  p95 {slat['p95']:.2f} ms  (server cache {srv.cache.hits} hits / {srv.cache.misses} misses)")
+    print(f"group commit: {srv.writer.writes} writes in {srv.writer.commits} commits ({srv.writer.writes / max(srv.writer.commits, 1):.1f} per commit)")
+    srv.shutdown(); srv.server_close()
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+# --- SUITE: the panels' hot paths on a generated store, with a JSON baseline ---
+def suite_db(args):
+    """Working copy of the suite database; generated datasets are cached in the temp dir between runs"""
+    src = args.db
+    if not src:
+        src = os.path.join(tempfile.gettempdir(), f"dolmen_datagen_{args.items}_{args.sales}_{args.years}_{args.seed}.db")
+        if not os.path.exists(src):
+            print(f"generating {args.items:,} items / {args.sales:,} sales (cached as {src})...")
+            datagen.generate(src + ".tmp", args.items, args.sales, args.years, args.seed)
+            os.replace(src + ".tmp", src)
+    work = os.path.join(tempfile.mkdtemp(prefix="dolmen_suite_"), DB_NAME)
+    with sqlite3.connect(src) as s, sqlite3.connect(work) as d: s.backup(d)  # Writes never touch the source
+    return work
+
+def suite_cases(db, rnd):
+    """name -> zero-arg callable, mirroring what each panel runs"""
+    reader, engine = db.reader, ProductSearch(db)
+    ids = [r[0] for r in db.query("SELECT id FROM items WHERE stock > 0")]
+    terms = ["shirt", "navy kur", "lawn", "winter jack", "black", "silk dup", "000123", "men swe"]
+    last_day = datetime.date.fromisoformat(db.scalar("SELECT max(day) FROM sales_daily", default="2025-12-31"))
+    term = lambda: rnd.choice(terms)
+    forecast.refresh(db, last_day + datetime.timedelta(days=1))
+    return {
+        "sales.load_items": lambda: list(engine.search(term(), in_stock=True, conn=reader)),          # SalesPanel catalog
+        "sales.load_items_empty": lambda: list(engine.search("", in_stock=True, conn=reader)),
+        "sales.add_to_cart": lambda: db.query_one("SELECT id, name, stock, sale_price FROM items WHERE id=?", (rnd.choice(ids),)),
+        "inventory.load_data": lambda: list(engine.search(term(), conn=reader)),                      # InventoryPanel
+        "inventory.load_data_empty": lambda: list(engine.search("", conn=reader)),
+        "dashboard.stats": lambda: summaries.dashboard_totals(reader, last_day),                       # DashboardPanel
+        "dashboard.reorder": lambda: forecast.reorder_list(reader, last_day),
+        "reports.day": lambda: summaries.period_totals(reader, last_day.isoformat()),                  # ReportsPanel.gen
+        "reports.month": lambda: summaries.period_totals(reader, last_day.strftime("%Y-%m-01")),
+        "reports.year": lambda: summaries.period_totals(reader, last_day.strftime("%Y-01-01")),
+    }
+
+def suite_writes(db, rnd, receipts):
+    """Checkout (SalesPanel.checkout) and stock entry (PurchasePanel.save) latency + throughput"""
+    ids = [r[0] for r in db.query("SELECT id FROM items")]
+    db.execute("UPDATE items SET stock = stock + 1000")
+    engine, out = CheckoutEngine(db), {}
+    def checkout():
+        cart = [{"id": rnd.choice(ids), "qty": rnd.randint(1, 3), "price": 1500.0} for _ in range(rnd.randint(1, 4))]
+        for c in cart: c["total"] = c["qty"] * c["price"]
+        engine.commit(cart)
+    def purchase():
+        with db.transaction() as conn:
+            iid = rnd.choice(ids)
+            conn.execute("UPDATE items SET stock=stock+?, purchase_price=? WHERE id=?", (12, 900.0, iid))
+            conn.execute("INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)", (iid, 12, 900.0, "2025-12-31"))
+    for name, fn in (("sales.checkout", checkout), ("purchase.save", purchase)):
+        t = time.perf_counter()
+        lat = timed(fn, receipts)
+        out[name] = dict(summarize(lat), runs=receipts, ops_s=round(receipts / (time.perf_counter() - t), 1))
+    return out
+
+def compare(baseline, results, tolerance):
+    """Prints p95 against the baseline; returns the names that regressed"""
+    regressed = []
+    print(f"\n{'case':<28}{'baseline p95':>14}{'now p95':>10}{'change':>9}")
+    for name, now in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"{name:<28}{'-':>14}{now['p95']:>10.3f}     new"); continue
+        change = now["p95"] / max(old["p95"], 1e-9) - 1
+        bad = change > tolerance and now["p95"] - old["p95"] > 0.1  # Ignore sub-0.1 ms jitter
+        if bad: regressed.append(name)
+        print(f"{name:<28}{old['p95']:>14.3f}{now['p95']:>10.3f}{change:>+8.0%}{'  REGRESSED' if bad else ''}")
+    return regressed
+
+def bench_suite(args):
+    """Latency percentiles / throughput of every panel hot path, saved as (or checked against) a JSON baseline"""
+    path = suite_db(args)
+    db = DBManager(path)
+    rnd = random.Random(args.seed)
+    meta = {"items": db.scalar("SELECT count(*) FROM items"), "sales": db.scalar("SELECT count(*) FROM sales"),
+            "sqlite": sqlite3.sqlite_version, "python": platform.python_version(), "machine": platform.machine(),
+            "when": datetime.datetime.now().isoformat(timespec="seconds")}
+    results = {}
+    for name, fn in suite_cases(db, rnd).items():
+        for _ in range(min(args.runs, 10)): fn()  # Warm the page cache and statement cache
+        t = time.perf_counter()
+        lat = timed(fn, args.runs)
+        results[name] = dict(summarize(lat), runs=args.runs, ops_s=round(args.runs / (time.perf_counter() - t), 1))
+    results.update(suite_writes(db, rnd, args.receipts))
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    print(f"{meta['items']:,} items, {meta['sales']:,} sales lines")
+    print(f"{'case':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ops/s':>10}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['p50']:>9.3f}{r['p95']:>9.3f}{r['p99']:>9.3f}{r['ops_s']:>10.0f}")
+    if args.save:
+        with open(args.save, "w") as f: json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"baseline written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        if baseline["meta"].get("sales") != meta["sales"]: print(f"warning: baseline was taken on {baseline['meta'].get('sales'):,} sales lines")
+        regressed = compare(baseline, results, args.tolerance)
+        if regressed: raise SystemExit(f"{len(regressed)} case(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+
+# --- ANALYTICS ---
+def bench_analytics(args):
+    """Reports panel breakdowns per date range: cold (computed) and cached (same data token)"""
+    if not analytics.available(): raise SystemExit("analytics needs numpy: pip install numpy")
+    path = suite_db(args)
+    db = DBManager(path)
+    last = datetime.date.fromisoformat(db.scalar("SELECT max(day) FROM sales_daily", default="2025-12-31"))
+    end = (last + datetime.timedelta(days=1)).isoformat()
+    ranges = {"month": last.strftime("%Y-%m-01"), "year": last.strftime("%Y-01-01"),
+              "all": db.scalar("SELECT min(day) FROM sales_daily", default=last.isoformat())}
+    print(f"{'range':<8}{'top_items':>11}{'mix':>9}{'heatmap':>9}{'report':>9}{'cached':>9}   (ms, median of {args.runs})")
+    for name, start in ranges.items():
+        cols = [statistics.median(timed(lambda: fn(db.reader, start, end), args.runs))
+                for fn in (analytics.top_items, analytics.category_mix, analytics.heatmap)]
+        engine, token = analytics.Analytics(), db.data_token()
+        cold = timed(lambda: engine.report(db.reader, start, end, token), 1)[0]
+        warm = statistics.median(timed(lambda: engine.report(db.reader, start, end, token), args.runs))
+        print(f"{name:<8}" + "".join(f"{v:>{w}.1f}" for v, w in zip(cols + [cold, warm], (11, 9, 9, 9, 9))))
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+# --- SCAN LANE ---
+def bench_scan(args):
+    """Barcode index build, and scan -> cart line (SalesPanel.scan_submit without the Tk redraw)"""
+    path = suite_db(args)
+    db = DBManager(path)
+    db.execute("UPDATE items SET barcode = printf('2%012d', id) WHERE barcode IS NULL")  # Datasets cached before barcodes
+    codes = db.query("SELECT barcode FROM items")
+    t = time.perf_counter()
+    index = BarcodeIndex()
+    index.swap(BarcodeIndex.build(db.reader), db.data_token())
+    print(f"index: {len(index):,} codes built in {(time.perf_counter() - t) * 1000:.0f} ms")
+    rnd = random.Random(5)
+    cart, parked = Cart(), []
+    cart.subscribe(lambda event, line: None)  # The panel's redraw hook, minus Tk
+    def scan():
+        qty, code = parse_entry(f"{rnd.choice('1112')}*{rnd.choice(codes)[0]}")
+        iid, name, price, stock = index.lookup(code)
+        if iid not in cart.lines and len(cart) >= 30:  # A big basket: park it, then the next customer
+            parked.append(cart.to_json()); cart.clear()
+        cart.add(iid, name, price, qty, stock)
+    lat = summarize(timed(scan, args.runs))
+    t = time.perf_counter()
+    for data in parked: Cart().load_json(data)
+    print(f"resume parked 30-line cart: {(time.perf_counter() - t) * 1e6 / max(len(parked), 1):.0f} us ({len(parked)} carts)")
+    miss = summarize(timed(lambda: db.query_one("SELECT id, name, sale_price, stock FROM items WHERE barcode=? OR id=?", (rnd.choice(codes)[0],) * 2), 200))
+    print(f"scan -> cart   p50 {lat['p50'] * 1000:.1f} us  p95 {lat['p95'] * 1000:.1f} us  (target 5 ms)")
+    print(f"index miss (query fallback)  p50 {miss['p50']:.3f} ms  p95 {miss['p95']:.3f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+# --- RECEIPT ARCHIVE ---
+def bench_receipts(args):
+    """Writes N receipts as loose files and into the archive; disk use, write rate, reprint lookup"""
+    rnd = random.Random(3)
+    docs = [{"id": f"T1-{i:06d}", "date": f"2025-{i * 12 // args.receipts + 1:02d}-15 12:00", "total": 0,
+             "lines": [(rnd.choice(["Men Formal Shirt", "Women Kurti", "Scarf", "Jeans"]), rnd.randint(1, 3), rnd.randint(5, 50) * 100.0)
+                       for _ in range(rnd.randint(1, 6))]} for i in range(args.receipts)]
+    texts = [(d["id"], render_receipt(d), d) for d in docs]
+    work = tempfile.mkdtemp(prefix="dolmen_receipts_")
+    loose, packed = os.path.join(work, "loose"), os.path.join(work, "archive")
+    sinks = {"files": FileSink(loose), "archive": ArchiveSink(ReceiptArchive(packed))}
+    for name, sink in sinks.items():
+        t = time.perf_counter()
+        for rid, text, d in texts: sink(d, text)
+        elapsed = time.perf_counter() - t
+        if name == "archive": sink.archive.close(); sink.archive = ReceiptArchive(packed)  # Checkpoint the index WAL
+        files = [os.path.join(r, f) for r, _, fs in os.walk(loose if name == "files" else packed) for f in fs]
+        size, disk = sum(os.path.getsize(f) for f in files), sum(os.stat(f).st_blocks * 512 for f in files)
+        print(f"{name:<8} {len(texts) / elapsed:9.0f} receipts/s  {len(files):>7} files  {size / 2**20:8.2f} MiB  ({disk / 2**20:.2f} MiB on disk)")
+    archive = sinks["archive"].archive
+    ids = [rnd.choice(texts)[0] for _ in range(1000)]
+    lat = summarize(timed(lambda: archive.get(ids.pop()), len(ids)))
+    print(f"reprint lookup p50 {lat['p50']:.3f} ms  p95 {lat['p95']:.3f} ms")
+    t = time.perf_counter()
+    n = ReceiptArchive(os.path.join(work, "packed")).pack(loose)
+    print(f"one-time pack of {n} loose files: {time.perf_counter() - t:.2f} s")
+    archive.close()
+    shutil.rmtree(work, ignore_errors=True)
+
+# --- ONLINE BACKUP ---
+def bench_backup(args):
+    """Checkout latency on one till with and without a snapshot being taken, then a verify + restore"""
+    path = suite_db(args)
+    db = DBManager(path)
+    engine = CheckoutEngine(db)
+    items = db.query("SELECT id, name, sale_price FROM items WHERE stock >= 1000 LIMIT 200") or \
+            db.query("SELECT id, name, sale_price FROM items ORDER BY stock DESC LIMIT 200")
+    rnd = random.Random(9)
+    def till(stop, lat):
+        while not stop.is_set():
+            iid, name, price = rnd.choice(items)
+            t = time.perf_counter()
+            try: engine.commit([{"id": iid, "name": name, "qty": 1, "price": price, "total": price}])
+            except StockConflict: continue
+            lat.append((time.perf_counter() - t) * 1000)
+            time.sleep(0.005)  # A till, not a load generator
+    directory = os.path.join(os.path.dirname(path), "backups")
+    for label, during in (("idle", lambda: time.sleep(args.seconds)), ("backup", lambda: backup.snapshot(path, directory))):
+        stop, lat = threading.Event(), []
+        th = threading.Thread(target=till, args=(stop, lat))
+        th.start()
+        t = time.perf_counter()
+        during()
+        took = time.perf_counter() - t
+        stop.set(); th.join()
+        s = summarize(lat)
+        print(f"checkout while {label:<7} {len(lat):>5} sales  p50 {s['p50']:.2f} ms  p99 {s['p99']:.2f} ms  max {max(lat):.2f} ms  ({took:.1f} s)")
+    snap = backup.snapshots(directory)[-1]
+    size = os.path.getsize(path)
+    print(f"snapshot: {size / 1048576:.1f} MiB -> {os.path.getsize(snap) / 1048576:.1f} MiB gzip")
+    t = time.perf_counter()
+    version, sales = backup.verify(snap)
+    print(f"verify: schema {version}, {sales:,} sales rows, {time.perf_counter() - t:.1f} s")
+    db.close()
+    t = time.perf_counter()
+    backup.restore(snap, path)
+    print(f"restore (with pre-restore copy): {time.perf_counter() - t:.1f} s")
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+def bench_history(args):
+    """Live database size and checkout latency before / after archiving closed years,
+    then multi-year scans over the history files in-process vs in the process pool"""
+    path = suite_db(args)
+    db = DBManager(path)
+    engine = CheckoutEngine(db)
+    items = db.query("SELECT id, name, sale_price FROM items ORDER BY stock DESC LIMIT 200")
+    rnd = random.Random(11)
+    def checkouts(n=300):
+        lat = []
+        for _ in range(n):
+            iid, name, price = rnd.choice(items)
+            t = time.perf_counter()
+            try: engine.commit([{"id": iid, "name": name, "qty": 1, "price": price, "total": price}])
+            except StockConflict: continue
+            lat.append((time.perf_counter() - t) * 1000)
+        return summarize(lat)
+    size = lambda: os.path.getsize(path) / 1048576
+    live = lambda: db.scalar("SELECT count(*) FROM sales")
+    s = checkouts()
+    print(f"before: {size():.1f} MiB, {live():,} live sales, checkout p50 {s['p50']:.2f} ms  p99 {s['p99']:.2f} ms")
+    t = time.perf_counter()
+    done = history.archive(db, keep=args.keep)
+    took = time.perf_counter() - t
+    db.conn.execute("VACUUM")
+    s = checkouts()
+    print(f"archived FY{', FY'.join(map(str, done))} in {took:.1f} s")
+    print(f"after:  {size():.1f} MiB, {live():,} live sales, checkout p50 {s['p50']:.2f} ms  p99 {s['p99']:.2f} ms")
+    t = time.perf_counter()
+    drift = summaries.verify(db.conn.cursor(), deep=True)
+    print(f"summaries verify --deep: {len(drift)} drifted row(s), {time.perf_counter() - t:.2f} s")
+    scans = {"purchases per item": ("purchases", ("t.item_id",), ("t.quantity",)),
+             "sales per item": ("sales", ("t.item_id",), ("t.quantity", "t.total", "t.profit")),
+             "sales per category": ("sales", ("coalesce((SELECT category FROM items WHERE id = t.item_id), '')",), ("t.total",))}
+    history.grouped(db.reader, "purchases", ("t.item_id",), ("t.quantity",), workers=args.workers)  # Start the pool
+    for name, (table, keys, measures) in scans.items():
+        times = {}
+        for label, workers in (("in-process", 1), (f"pool x{args.workers}", args.workers)):
+            t = time.perf_counter()
+            out = history.grouped(db.reader, table, keys, measures, workers=workers)
+            times[label] = (time.perf_counter() - t) * 1000
+        print(f"{name:<20} {len(out):>6} groups  " + "  ".join(f"{k} {v:7.1f} ms" for k, v in times.items()))
+    old = db.scalar("SELECT number FROM receipts WHERE date < ? AND kind = 'sale' ORDER BY id LIMIT 1", (history.cutoff(db.conn) or "",))
+    if old:
+        t = time.perf_counter()
+        for _ in range(50): find_receipt(db.reader, old)
+        print(f"reprint of an archived receipt: {(time.perf_counter() - t) * 20:.2f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Dolmen POS benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("pool", help="Connection-per-call vs pooled DBManager latency")
+    p.add_argument("--items", type=int, default=2000)
+    p.add_argument("--sales", type=int, default=20000)
+    p.add_argument("--runs", type=int, default=300)
+    p.set_defaults(fn=bench_pool)
+    p = sub.add_parser("profile", help="Cost of the query profiling hook per statement")
+    p.add_argument("--items", type=int, default=2000)
+    p.add_argument("--sales", type=int, default=20000)
+    p.add_argument("--runs", type=int, default=2000)
+    p.set_defaults(fn=bench_profile)
+    p = sub.add_parser("search", help="FTS product search latency per keystroke")
+    p.add_argument("--items", type=int, default=100000)
+    p.add_argument("--runs", type=int, default=20)
+    p.set_defaults(fn=bench_search)
+    p = sub.add_parser("checkout", help="Checkout throughput with concurrent writers")
+    p.add_argument("--writers", type=int, default=4)
+    p.add_argument("--receipts", type=int, default=500, help="per writer")
+    p.add_argument("--items", type=int, default=200)
+    p.add_argument("--stock", type=int, default=1000, help="starting stock per item (low values provoke conflicts)")
+    p.set_defaults(fn=bench_checkout)
+    p = sub.add_parser("startup", help="Time from process start to login screen and dashboard")
+    p.add_argument("--runs", type=int, default=5)
+    p.set_defaults(fn=bench_startup)
+    p = sub.add_parser("import", help="Bulk CSV import throughput")
+    p.add_argument("--rows", type=int, default=100000)
+    p.set_defaults(fn=bench_import)
+    p = sub.add_parser("export", help="Streaming export throughput and memory")
+    p.add_argument("--sales", type=int, default=500000)
+    p.set_defaults(fn=bench_export)
+    p = sub.add_parser("suite", help="All panel hot paths on a generated store, with a JSON baseline")
+    p.add_argument("--items", type=int, default=100000)
+    p.add_argument("--sales", type=int, default=5000000)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db", help="use this database (copied) instead of generating one")
+    p.add_argument("--runs", type=int, default=200)
+    p.add_argument("--receipts", type=int, default=300)
+    p.add_argument("--save", nargs="?", const=BENCH_BASELINE, help="write results as the new baseline")
+    p.add_argument("--compare", nargs="?", const=BENCH_BASELINE, help="fail if p95 regressed vs. this baseline")
+    p.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE)
+    p.set_defaults(fn=bench_suite)
+    p = sub.add_parser("tills", help="Store server load test with N client tills")
+    p.add_argument("--tills", type=int, default=12)
+    p.add_argument("--receipts", type=int, default=200, help="per till")
+    p.add_argument("--items", type=int, default=2000)
+    p.add_argument("--stock", type=int, default=1000)
+    p.set_defaults(fn=bench_tills)
+    p = sub.add_parser("analytics", help="Reports panel analytics per date range, computed and cached")
+    p.add_argument("--items", type=int, default=100000)
+    p.add_argument("--sales", type=int, default=1000000)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db", help="use this database (copied) instead of generating one")
+    p.add_argument("--runs", type=int, default=3)
+    p.set_defaults(fn=bench_analytics)
+    p = sub.add_parser("scan", help="Scan lane: barcode index build and scan-to-cart latency")
+    p.add_argument("--items", type=int, default=100000)
+    p.add_argument("--sales", type=int, default=1000000)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db", help="use this database (copied) instead of generating one")
+    p.add_argument("--runs", type=int, default=20000)
+    p.set_defaults(fn=bench_scan)
+    p = sub.add_parser("receipts", help="Receipt archive vs one text file per receipt")
+    p.add_argument("--receipts", type=int, default=50000)
+    p.set_defaults(fn=bench_receipts)
+    p = sub.add_parser("backup", help="Checkout latency while an online backup runs; verify and restore")
+    p.add_argument("--items", type=int, default=20000)
+    p.add_argument("--sales", type=int, default=200000)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db", help="use this database (copied) instead of generating one")
+    p.add_argument("--seconds", type=float, default=3.0, help="idle baseline length")
+    p.set_defaults(fn=bench_backup)
+    p = sub.add_parser("history", help="Archive closed fiscal years: live size, checkout, multi-year scans")
+    p.add_argument("--items", type=int, default=20000)
+    p.add_argument("--sales", type=int, default=200000)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db", help="use this database (copied) instead of generating one")
+    p.add_argument("--keep", type=int, default=0, help="closed years left live")
+    p.add_argument("--workers", type=int, default=HISTORY_WORKERS)
+    p.set_defaults(fn=bench_history)
+    args = ap.parse_args()
+    args.fn(args)
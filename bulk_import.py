@@ -0,0 +1,197 @@
+# FILE: bulk_import.py
+"""Streaming CSV import of items and stock receipts (supplier shipments).
+
+Rows are streamed from the file through generators and never held in memory
+as a whole. Each row is validated, and chunks of IMPORT_CHUNK rows are written
+with executemany, each chunk in one transaction. Stock, purchase_price and the
+purchases history therefore move together or not at all. Bad rows are skipped
+and reported with their line number.
+
+    python bulk_import.py items new_skus.csv
+    python bulk_import.py purchases shipment.csv
+
+items columns:     [id,] name, category, season, purchase_price, sale_price[, stock, barcode]
+purchases columns: item_id | name[, category, season], quantity, purchase_price[, date]
+An item row with an id (or a matching name/category/season) updates that item, otherwise inserts.
+A barcode already on another item rejects the row.
+"""
+import argparse
+import csv
+import datetime
+from itertools import islice
+from config import *
+
+# --- STREAMING ---
+def read_csv(path):
+    """Yields (line_no, row dict) with normalized lower_case headers"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower().replace(" ", "_") for h in next(reader, [])]
+        for row in reader:
+            if not any(c.strip() for c in row): continue
+            yield reader.line_num, dict(zip(header, (c.strip() for c in row)))
+
+def chunked(rows, size):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk: return
+        yield chunk
+
+def _key(name, category, season):
+    return (name.lower(), (category or "").lower(), (season or "").lower())
+
+# --- VALIDATION (raise ValueError with a readable message) ---
+def _num(row, col, cast, required=True, minimum=0):
+    raw = row.get(col, "")
+    if raw == "":
+        if required: raise ValueError(f"missing {col}")
+        return None
+    try: val = cast(raw.replace(",", ""))
+    except ValueError: raise ValueError(f"bad {col} {raw!r}")
+    if val < minimum: raise ValueError(f"{col} must be >= {minimum}")
+    return val
+
+def parse_item(row):
+    if not row.get("name"): raise ValueError("missing name")
+    item_id = _num(row, "id", int, required=False, minimum=1)
+    return (item_id, row["name"], row.get("category", ""), row.get("season", ""),
+            _num(row, "purchase_price", float), _num(row, "sale_price", float), _num(row, "stock", int, required=False),
+            row.get("barcode") or None)
+
+def parse_purchase(row):
+    item_id = _num(row, "item_id", int, required=False, minimum=1)
+    if item_id is None and not row.get("name"): raise ValueError("need item_id or name")
+    date = row.get("date") or datetime.date.today().isoformat()
+    try: datetime.date.fromisoformat(date[:10])
+    except ValueError: raise ValueError(f"bad date {date!r}")
+    return (item_id, _key(row.get("name", ""), row.get("category"), row.get("season")),
+            _num(row, "quantity", int, minimum=1), _num(row, "purchase_price", float), date)
+
+class ImportReport:
+    def __init__(self, max_errors=IMPORT_MAX_ERRORS):
+        self.ok = self.inserted = self.updated = self.failed = 0
+        self.errors = []  # (line_no, message), first max_errors only
+        self.max_errors = max_errors
+
+    def error(self, line, msg):
+        self.failed += 1
+        if len(self.errors) < self.max_errors: self.errors.append((line, msg))
+
+    def __str__(self):
+        out = f"{self.ok} rows imported ({self.inserted} new, {self.updated} updated), {self.failed} rejected"
+        return "\n".join([out] + [f"  line {l}: {m}" for l, m in self.errors])
+
+# --- IMPORTER ---
+class BulkImporter:
+    def __init__(self, db, chunk_size=IMPORT_CHUNK, progress=None):
+        self.db, self.chunk_size, self.progress = db, chunk_size, progress
+        self._index = None  # (name, category, season) -> item id
+        self._names = None  # name -> item id, None if several items share it
+        self._barcodes = None  # barcode -> item id
+
+    def index(self):
+        """Name/category/season lookup, built once per import (one pass over items, not over the file)"""
+        if self._index is None:
+            self._index = {_key(n, c, s): i for i, n, c, s in self.db.execute("SELECT id, name, category, season FROM items")}
+        return self._index
+
+    def lookup(self, key):
+        """Exact name/category/season match; a bare name matches if only one item has it"""
+        index = self.index()
+        if key in index or key[1] or key[2]: return index.get(key)
+        if self._names is None:
+            self._names = {}
+            for k, i in index.items(): self._names[k[0]] = None if k[0] in self._names else i
+        return self._names.get(key[0])
+
+    def barcodes(self):
+        if self._barcodes is None:
+            self._barcodes = dict(self.db.execute("SELECT barcode, id FROM items WHERE barcode IS NOT NULL"))
+        return self._barcodes
+
+    def _validated(self, rows, parse, report):
+        for line, row in rows:
+            try: yield line, parse(row)
+            except ValueError as e: report.error(line, str(e))
+
+    def import_items(self, rows):
+        report = ImportReport()
+        index, barcodes = self.index(), self.barcodes()
+        for chunk in chunked(self._validated(rows, parse_item, report), self.chunk_size):
+            with self.db.transaction() as conn:
+                known = self._existing(conn, [r[1][0] for r in chunk if r[1][0]])
+                updates, inserts = {}, {}
+                for line, (item_id, name, cat, season, cost, price, stock, barcode) in chunk:
+                    key = _key(name, cat, season)
+                    if item_id and item_id not in known:
+                        report.error(line, f"unknown item id {item_id}"); continue
+                    item_id = item_id or index.get(key)
+                    if barcode and barcodes.get(barcode, item_id or key) != (item_id or key):
+                        report.error(line, f"barcode {barcode} is already on another item"); continue
+                    if barcode: barcodes[barcode] = item_id or key  # New items: their key until the id is known
+                    if item_id: updates[item_id] = (name, cat, season, cost, price, stock, barcode, item_id)
+                    else:  # Later rows win; a blank stock / barcode keeps the earlier row's
+                        if stock is None: stock = inserts[key][5] if key in inserts else 0
+                        if barcode is None and key in inserts: barcode = inserts[key][6]
+                        inserts[key] = (name, cat, season, cost, price, stock, barcode)
+                if updates:
+                    conn.executemany('''UPDATE items SET name=?, category=?, season=?, purchase_price=?, sale_price=?,
+                                        stock=coalesce(?, stock), barcode=coalesce(?, barcode) WHERE id=?''', updates.values())
+                if inserts:
+                    # The per-row FTS trigger is ~10x slower than indexing the chunk in one statement.
+                    # DDL is transactional, so other tills never see the trigger missing.
+                    fts = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'items_fts_ai'").fetchone()
+                    if fts: conn.execute("DROP TRIGGER items_fts_ai")
+                    conn.executemany("INSERT INTO items (name, category, season, purchase_price, sale_price, stock, barcode) VALUES (?,?,?,?,?,?,?)",
+                                     inserts.values())
+                    # The chunk's ids are consecutive while we hold the write lock, ending at SQLite's own
+                    # last rowid (AUTOINCREMENT continues from sqlite_sequence, not from max(id))
+                    first = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(inserts) + 1
+                    if fts:
+                        conn.execute("INSERT INTO items_fts (rowid, name, category, season) SELECT id, name, category, season FROM items WHERE id >= ?", (first,))
+                        conn.execute(fts[0])
+                    for new_id, (key, row) in enumerate(inserts.items(), start=first):
+                        index[key] = new_id
+                        if row[6]: barcodes[row[6]] = new_id
+            report.inserted += len(inserts); report.updated += len(updates)
+            report.ok += len(updates) + len(inserts)
+            if self.progress: self.progress(report)
+        return report
+
+    def import_purchases(self, rows):
+        report = ImportReport()
+        for chunk in chunked(self._validated(rows, parse_purchase, report), self.chunk_size):
+            with self.db.transaction() as conn:
+                known = self._existing(conn, [r[1][0] for r in chunk if r[1][0]])
+                lines = []
+                for line, (item_id, key, qty, cost, date) in chunk:
+                    if item_id and item_id not in known: report.error(line, f"unknown item id {item_id}")
+                    elif not (item_id := item_id or self.lookup(key)): report.error(line, f"unknown or ambiguous item {key[0]!r}")
+                    else: lines.append((item_id, qty, cost, date))
+                # Stock, cost and purchase history of the chunk commit together
+                conn.executemany("UPDATE items SET stock = stock + ?, purchase_price = ? WHERE id = ?",
+                                 sorted(((q, c, i) for i, q, c, _ in lines), key=lambda r: r[2]))  # id order: fewer page hops, stable for repeats
+                conn.executemany("INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)", lines)
+            report.ok += len(lines); report.updated += len(lines)
+            if self.progress: self.progress(report)
+        return report
+
+    @staticmethod
+    def _existing(conn, ids):
+        ids = list(set(ids))
+        if not ids: return set()
+        return {r[0] for r in conn.execute(f"SELECT id FROM items WHERE id IN ({','.join('?' * len(ids))})", ids)}
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Bulk import items or stock receipts from CSV")
+    ap.add_argument("kind", choices=["items", "purchases"])
+    ap.add_argument("csv")
+    ap.add_argument("--db", default=DB_NAME)
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    importer = BulkImporter(db, progress=lambda r: print(f"\r{r.ok} rows...", end="", flush=True))
+    report = getattr(importer, f"import_{args.kind}")(read_csv(args.csv))
+    print(f"\r{report}")
+    db.close()
@@ -0,0 +1,140 @@
+# FILE: cart.py
+"""The till's cart: one line per item, a running total and change events.
+
+Lines are kept in a dict keyed by item id (in the order they were added), so
+adding an item that is already in the cart merges into its line, and the total
+is adjusted by each change instead of re-summed. Every change is published to
+subscribers as (event, line) with event "add", "update", "remove" or "clear",
+so the Sales panel redraws only the one Treeview row that changed.
+
+Each line remembers the shelf stock seen when it was added; reserved() is what
+the cart already holds of an item, so the catalog and the quantity prompt offer
+only stock - reserved. Checkout still re-checks stock under the write lock.
+
+A cart serializes to compact JSON (to_json / load_json); park() and unpark()
+keep suspended sales in the parked_carts table so any till can resume them
+(store-server endpoints in client mode, see endpoints.py).
+"""
+import datetime
+import json
+from config import *
+from endpoints import remote_read, remote_write
+
+class CartLine:
+    __slots__ = ("item_id", "name", "price", "qty", "total", "stock")
+
+    def __init__(self, item_id, name, price, qty=0, stock=None):
+        self.item_id, self.name, self.price = item_id, name, price or 0
+        self.qty, self.total, self.stock = qty, 0, stock
+
+    def row(self):
+        """(item id, name, qty, total) for the cart table"""
+        return (self.item_id, self.name, self.qty, f"{self.total:,.0f}")
+
+    def as_dict(self):
+        """The line as CheckoutEngine.commit takes it"""
+        return {"id": self.item_id, "name": self.name, "qty": self.qty, "price": self.price, "total": self.total}
+
+class Cart:
+    def __init__(self):
+        self.lines = {}       # item id -> CartLine
+        self.total = 0
+        self.last = None      # Item id of the line changed last (the scan lane's + / − / Del)
+        self._listeners = []
+
+    def subscribe(self, fn):
+        """fn(event, line) after every change; for "clear", line is the list of lines removed"""
+        self._listeners.append(fn)
+
+    def _emit(self, event, line):
+        for fn in self._listeners: fn(event, line)
+
+    # --- CHANGES ---
+    def add(self, item_id, name, price, qty=1, stock=None):
+        """Adds qty of an item, merging into its line; returns the line"""
+        line = self.lines.get(item_id)
+        if line is None:
+            line = self.lines[item_id] = CartLine(item_id, name, price, 0, stock)
+            event = "add"
+        else:
+            event = "update"
+            if stock is not None: line.stock = stock
+        self._set(line, line.qty + qty, event)
+        return line
+
+    def set_qty(self, item_id, qty):
+        """New quantity for a line; 0 or less removes it. Returns the line, or None."""
+        line = self.lines.get(item_id)
+        if line is None: return None
+        if qty <= 0: return self.remove(item_id)
+        self._set(line, qty, "update")
+        return line
+
+    def _set(self, line, qty, event):
+        total = qty * line.price
+        self.total += total - line.total
+        line.qty, line.total = qty, total
+        self.last = line.item_id
+        self._emit(event, line)
+
+    def remove(self, item_id):
+        line = self.lines.pop(item_id, None)
+        if line is None: return None
+        self.total = self.total - line.total if self.lines else 0  # No float residue on an empty cart
+        if self.last == item_id: self.last = None
+        self._emit("remove", line)
+
+    def clear(self):
+        gone = list(self.lines.values())
+        self.lines.clear()
+        self.total, self.last = 0, None
+        self._emit("clear", gone)
+
+    # --- STOCK ---
+    def reserved(self, item_id):
+        line = self.lines.get(item_id)
+        return line.qty if line else 0
+
+    def short(self):
+        """Lines asking for more than the stock seen when they were added"""
+        return [l for l in self.lines.values() if l.stock is not None and l.qty > l.stock]
+
+    # --- CHECKOUT / PARKING ---
+    def checkout_lines(self):
+        return [l.as_dict() for l in self.lines.values()]
+
+    def to_json(self):
+        return json.dumps([[l.item_id, l.name, l.price, l.qty, l.stock] for l in self.lines.values()], separators=(",", ":"))
+
+    def load_json(self, data):
+        """Replaces the contents with a to_json() cart (prices as they were when it was parked)"""
+        self.clear()
+        for item_id, name, price, qty, stock in json.loads(data): self.add(item_id, name, price, qty, stock)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+# --- PARKED SALES ---
+def park(db, cart, label="", terminal=TERMINAL_ID):
+    """Stores the cart as a parked sale; returns its id. The caller clears the cart."""
+    return add_parked(db, terminal, datetime.datetime.now().strftime("%Y-%m-%d %H:%M"), label or None, len(cart), cart.total, cart.to_json())
+
+@remote_write
+def add_parked(conn, terminal, when, label, lines, total, data):
+    return conn.execute("INSERT INTO parked_carts (terminal, parked, label, lines, total, cart) VALUES (?, ?, ?, ?, ?, ?)",
+                        (terminal, when, label, lines, total, data)).lastrowid
+
+@remote_read
+def parked(conn):
+    """[(id, terminal, parked, label, lines, total)] oldest first"""
+    return conn.execute("SELECT id, terminal, parked, label, lines, total FROM parked_carts ORDER BY id").fetchall()
+
+@remote_write
+def unpark(conn, park_id):
+    """Called with the DBManager: the parked cart's JSON, removed from the table; None if another till resumed it first"""
+    row = conn.execute("SELECT cart FROM parked_carts WHERE id = ?", (park_id,)).fetchone()
+    if row is None or conn.execute("DELETE FROM parked_carts WHERE id = ?", (park_id,)).rowcount != 1: return None
+    return row[0]
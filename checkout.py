@@ -0,0 +1,164 @@
+# FILE: checkout.py
+"""Checkout engine: commits a whole cart atomically.
+
+The cart is written in one BEGIN IMMEDIATE transaction: the write lock is taken
+up front, stock is re-read under the lock, every line is checked, and the stock
+decrements / sales rows go in as two executemany batches. The decrement is
+guarded (stock >= qty) so stock can never go negative, even with several tills
+writing to the same database. If the database is busy the whole attempt is
+retried with jittered exponential backoff. Each line's profit is priced from the
+item's cost layers (cost.py) in the same transaction.
+
+Every cart gets one row in `receipts` (the header: number, terminal, date, totals)
+and its sales lines point at it by integer id. Numbers are "<terminal>-<seq>",
+with seq taken from the terminal's counter in `terminal_seq` under the same write
+lock, so tills never collide however many receipts they ring up per second, and
+a number is never reused even after old receipts are archived. Returns are
+receipts of kind 'return' with negative lines, linked to the original sale.
+Sales from a year history.py has archived can be looked up and reprinted but not
+returned: their lines live in the yearly file, not in the live `sales`.
+"""
+import datetime
+import random
+import sqlite3
+import time
+from config import *
+from endpoints import remote_read
+from cost import CostEngine
+import history
+
+class StockConflict(Exception):
+    """Cart asks for more than is on the shelf. .conflicts = [(item_id, name, wanted, available)]"""
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__("\n".join(f"{name or f'Item #{iid}'}: wanted {want}, only {have} left"
+                                   for iid, name, want, have in conflicts))
+
+def _is_busy(err):
+    msg = str(err).lower()
+    return "locked" in msg or "busy" in msg
+
+# --- RECEIPTS ---
+def receipt_number(terminal, seq):
+    return f"{terminal}-{seq:06d}"
+
+def open_receipt(conn, terminal, dt, lines, total, kind="sale", original=None):
+    """Takes the terminal's next number and writes the receipt header; call under the write lock.
+    Returns (receipt id, number)."""
+    seq = conn.execute('''INSERT INTO terminal_seq (terminal, last) VALUES (?, 1)
+                          ON CONFLICT(terminal) DO UPDATE SET last = last + 1 RETURNING last''', (terminal,)).fetchone()[0]
+    number = receipt_number(terminal, seq)
+    cur = conn.execute("INSERT INTO receipts (number, terminal, seq, date, lines, total, kind, original) VALUES (?,?,?,?,?,?,?,?)",
+                       (number, terminal, seq, dt, lines, total, kind, original))
+    return cur.lastrowid, number
+
+@remote_read
+def find_receipt(conn, number):
+    """Receipt header and lines for reprint / returns, or None:
+    {id, number, terminal, date, total, kind, original, archived, lines: [(item_id, name, qty, price, total, returnable)]}
+    archived: the fiscal year the receipt was archived in, or None while its lines are live"""
+    row = conn.execute("SELECT id, number, terminal, date, total, kind, original FROM receipts WHERE number = ?", (number,)).fetchone()
+    if row is None: return None
+    r = dict(zip(("id", "number", "terminal", "date", "total", "kind", "original"), row))
+    r["archived"] = archived_year(conn, r["date"])
+    left = dict(returnable(conn, r["id"])) if r["kind"] == "sale" and not r["archived"] else {}
+    day = datetime.date.fromisoformat(r["date"][:10])
+    sales = history.relation(conn, "sales", day.isoformat(), (day + datetime.timedelta(days=1)).isoformat())  # Old receipts: archived year
+    r["lines"] = [(iid, name or f"Item #{iid}", qty, price, total, left.get(iid, 0)) for iid, name, qty, price, total in conn.execute(
+        f'''SELECT s.item_id, i.name, s.quantity, s.sale_price, s.total FROM {sales} s LEFT JOIN items i ON i.id = s.item_id
+            WHERE s.receipt_id = ? ORDER BY s.id''', (r["id"],))]
+    return r
+
+def returnable(conn, receipt):
+    """[(item_id, qty still returnable)] for a sale receipt id: sold minus already returned"""
+    return conn.execute('''SELECT item_id, sum(quantity) FROM sales
+                             WHERE receipt_id = ? OR receipt_id IN (SELECT id FROM receipts WHERE original = ?)
+                             GROUP BY item_id HAVING sum(quantity) > 0''', (receipt, receipt)).fetchall()
+
+def archived_year(conn, date):
+    """Fiscal year a receipt dated `date` was archived in, or None if it is still in the live tables"""
+    cut = history.cutoff(conn)
+    return history.fiscal_year(datetime.date.fromisoformat(date[:10])) if cut and date[:10] < cut else None
+
+def receipt_doc(r):
+    """find_receipt() result -> the dict the receipt spooler prints"""
+    return {"id": r["number"], "date": r["date"], "total": r["total"], "lines": [(name, qty, total) for _, name, qty, _, total, _ in r["lines"]]}
+
+# --- CHECKOUT ---
+class CheckoutEngine:
+    def __init__(self, db, retries=CHECKOUT_RETRIES, backoff=CHECKOUT_BACKOFF, cost=None):
+        self.db, self.retries, self.backoff = db, retries, backoff
+        self.cost = cost or CostEngine()
+
+    def commit(self, lines, terminal=TERMINAL_ID, date=None):
+        """lines: cart dicts with id, qty, price, total. Returns (receipt number, date).
+        Raises StockConflict (nothing written) if any line can't be filled."""
+        lines = list(lines)
+        if not lines: raise ValueError("Cart is empty")
+        dt = date or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        return self._retry(lambda conn: self.write(conn, lines, terminal, dt)), dt
+
+    def refund(self, number, items=None, terminal=TERMINAL_ID, date=None):
+        """Returns items of sale receipt `number` to stock: items {item_id: qty}, default everything
+        still returnable. Returns (return receipt number, date)."""
+        dt = date or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        return self._retry(lambda conn: self.write_refund(conn, number, items, terminal, dt)), dt
+
+    def _retry(self, write):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.db.transaction("IMMEDIATE") as conn:
+                    return write(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self.retries: raise
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def write(self, conn, lines, terminal, dt):
+        """Checks and writes one cart on a connection that already holds the write lock
+        (its own transaction above, or a store-server batch). Returns the receipt number."""
+        if any(c['qty'] < 1 for c in lines): raise ValueError("Every line needs a quantity of at least 1")
+        want = {}
+        for c in lines: want[c['id']] = want.get(c['id'], 0) + c['qty']
+        ids = list(want)
+        # Re-read stock under the write lock; what the cashier saw may be stale
+        have = {r[0]: r for r in conn.execute(
+            f"SELECT id, name, stock FROM items WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        conflicts = [(iid, have[iid][1] if iid in have else None, q, have[iid][2] if iid in have else 0)
+                     for iid, q in want.items() if iid not in have or (have[iid][2] or 0) < q]
+        if conflicts: raise StockConflict(conflicts)
+
+        cur = conn.executemany("UPDATE items SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                               [(q, iid, q) for iid, q in want.items()])
+        if cur.rowcount != len(want):  # Guard tripped: someone else got there first
+            raise StockConflict([(iid, have[iid][1], q, have[iid][2]) for iid, q in want.items()])
+        rid, number = open_receipt(conn, terminal, dt, len(lines), sum(c['total'] for c in lines))
+        conn.executemany("INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?,?,?,?,?,?,?)",
+                         [(rid, c['id'], c['qty'], c['price'], round(c['total'] - self.cost.consume(conn, c['id'], c['qty']), 2), c['total'], dt)
+                          for c in lines])
+        return number
+
+    def write_refund(self, conn, number, items, terminal, dt):
+        """Return receipt for `number` under the write lock: negative sales lines at the price paid,
+        stock and cost layers put back at the cost the sale was booked at"""
+        orig = conn.execute("SELECT id, kind, date FROM receipts WHERE number = ?", (number,)).fetchone()
+        if orig is None or orig[1] != "sale": raise ValueError(f"No sale receipt {number}")
+        fy = archived_year(conn, orig[2])
+        if fy: raise ValueError(f"Receipt {number} was archived with FY{fy}; returns on archived receipts are not supported")
+        left = dict(returnable(conn, orig[0]))
+        want = {iid: q for iid, q in (items or left).items() if q > 0}
+        if not want: raise ValueError(f"Nothing left to return on {number}")
+        over = [(iid, q, left.get(iid, 0)) for iid, q in want.items() if q > left.get(iid, 0)]
+        if over: raise ValueError("\n".join(f"Item #{iid}: returning {q}, only {n} returnable" for iid, q, n in over))
+        sold = {iid: (qty, total, profit) for iid, qty, total, profit in conn.execute(
+            "SELECT item_id, sum(quantity), sum(total), sum(profit) FROM sales WHERE receipt_id = ? GROUP BY item_id", (orig[0],))}
+        rows = []
+        for iid, q in want.items():
+            qty, total, profit = sold[iid]
+            price, unit_cost = total / qty, (total - (profit or 0)) / qty
+            rows.append((iid, -q, price, -round((price - unit_cost) * q, 2), -round(price * q, 2), dt))
+            self.cost.restore(conn, iid, q, unit_cost)
+        conn.executemany("UPDATE items SET stock = stock + ? WHERE id = ?", [(q, iid) for iid, q in want.items()])
+        rid, ret = open_receipt(conn, terminal, dt, len(rows), sum(r[4] for r in rows), "return", orig[0])
+        conn.executemany("INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?,?,?,?,?,?,?)",
+                         [(rid,) + r for r in rows])
+        return ret
@@ -0,0 +1,138 @@
+# FILE: client.py
+"""Client mode: the app's database, search and checkout objects backed by server.py.
+
+RemoteDB stands in for DBManager on a till that has no database file of its
+own. The panels' reads and writes are typed endpoints (endpoints.py): called
+with RemoteDB or its connection they become one named request to server.py,
+which runs the same function on its database. Each thread keeps one keep-alive
+connection to the server.
+"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+from config import *
+from checkout import StockConflict
+import store
+from profiler import PROFILER, call_site
+
+READS = ("token", "read", "search")
+
+class ServerError(Exception):
+    """The store server rejected a request or could not be reached"""
+
+class RemoteConnection:
+    """Stands in for DBManager.conn / .reader: typed reads (endpoints.py) go to the server,
+    SQL does not"""
+    remote = True
+
+    def __init__(self, db):
+        self.db = db
+
+    def read(self, name, args, kwargs):
+        return self.db.read(name, args, kwargs)
+
+    def execute(self, sql, params=()):
+        raise ServerError("client mode sends no SQL to the store server; use a typed endpoint (endpoints.py)")
+
+    executemany = execute
+
+    def interrupt(self):
+        pass  # Server-side statements are short; a superseded result is simply dropped
+
+class RemoteDB:
+    remote = True
+
+    def __init__(self, url=STORE_SERVER, key=STORE_SERVER_KEY, timeout=SERVER_TIMEOUT, profile=QUERY_PROFILE):
+        self.profile = profile  # Round trips are recorded with the statement; plans are logged by the server
+        u = urlsplit(url)
+        self.host, self.port, self.key, self.timeout = u.hostname, u.port or STORE_SERVER_PORT, key, timeout
+        self.path = url
+        self._local = threading.local()
+        self.conn = self.reader = RemoteConnection(self)
+
+    # --- TRANSPORT ---
+    def _http(self):
+        h = getattr(self._local, "http", None)
+        if h is None: h = self._local.http = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return h
+
+    def call(self, endpoint, **body):
+        data = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.key: headers["X-Store-Key"] = self.key
+        for attempt in (0, 1):
+            h = self._http()
+            try:
+                h.request("POST", f"/{endpoint}", data, headers)
+                resp = h.getresponse()
+                status, reply = resp.status, json.loads(resp.read() or b"{}")
+                break
+            except (ConnectionError, http.client.HTTPException) as e:
+                h.close()  # Server restarted or dropped the keep-alive connection: reconnect once
+                self._local.http = None
+                # Writes are never resent: the server may have committed the first one
+                if attempt or endpoint not in READS: raise ServerError(f"store server unreachable: {e}")
+            except OSError as e:
+                h.close(); self._local.http = None
+                raise ServerError(f"store server unreachable: {e}")
+        if status == 409: raise StockConflict([tuple(c) for c in reply["conflicts"]])
+        if status != 200: raise ServerError(reply.get("error", f"HTTP {status}"))
+        return reply["result"]
+
+    def read(self, name, args=(), kwargs=None):
+        site, t = call_site(1) if self.profile else None, time.perf_counter()
+        res = self.call("read", name=name, args=list(args), kwargs=kwargs or {})
+        if self.profile: PROFILER.record(f"read {name}", site, (time.perf_counter() - t) * 1000, len(res) if isinstance(res, list) else 1)
+        return res
+
+    def write(self, name, args=()):
+        site, t = call_site(1) if self.profile else None, time.perf_counter()
+        res = self.call("write", name=name, args=list(args))
+        if self.profile: PROFILER.record(f"write {name}", site, (time.perf_counter() - t) * 1000, 1)
+        return res
+
+    # --- DBManager API ---
+    def connect(self):
+        return self.conn
+
+    def release(self):
+        h = getattr(self._local, "http", None)
+        if h: h.close()
+        self._local.http = None
+
+    def close(self):
+        self.release()
+
+    def init_db(self):
+        pass  # The server migrates its database
+
+    def data_token(self):
+        return self.call("token")
+
+    def get_shop_info(self):
+        return store.shop_info(self.conn)
+
+class RemoteSearch:
+    """ProductSearch over the store server (results cached there until the data changes)"""
+    fts = True
+
+    def __init__(self, db):
+        self.db = db
+
+    def search(self, text, in_stock=False, limit=SEARCH_LIMIT, conn=None):
+        return iter(tuple(r) for r in self.db.call("search", text=text, in_stock=in_stock, limit=limit))
+
+class RemoteCheckout:
+    """CheckoutEngine over the store server; the server numbers the receipt from this till's counter"""
+    def __init__(self, db, terminal=TERMINAL_ID):
+        self.db, self.terminal = db, terminal
+
+    def commit(self, lines, terminal=None, date=None):
+        lines = [{k: c[k] for k in ("id", "qty", "price", "total")} for c in lines]
+        if not lines: raise ValueError("Cart is empty")
+        return tuple(self.db.call("checkout", lines=lines, terminal=terminal or self.terminal))
+
+    def refund(self, number, items=None, terminal=None, date=None):
+        return tuple(self.db.call("refund", number=number, items=list((items or {}).items()), terminal=terminal or self.terminal))
@@ -1,5 +1,9 @@
 import tkinter as tk
+from tkinter import ttk
+import time
+from itertools import islice
 from config import *
+from telemetry import budget_for
 
 class ModernButton(tk.Button):
     """Stylized Button for Main Actions (Login, Add, Save)"""
@@ -27,4 +31,217 @@ class SidebarButton(tk.Button):
         
         # Hover Effects
         self.bind("<Enter>", lambda e: self.config(bg=COLOR_SIDEBAR_HOVER))
-        self.bind("<Leave>", lambda e: self.config(bg=COLOR_SIDEBAR))
\ No newline at end of file
+        self.bind("<Leave>", lambda e: self.config(bg=COLOR_SIDEBAR))
+
+class Debouncer:
+    """Calls fn once typing pauses for delay_ms (e.g. search-as-you-type)"""
+    def __init__(self, widget, delay_ms, fn):
+        self.widget, self.delay_ms, self.fn = widget, delay_ms, fn
+        self._job = None
+
+    def __call__(self, *args):
+        if self._job: self.widget.after_cancel(self._job)
+        self._job = self.widget.after(self.delay_ms, self._fire)
+
+    def _fire(self):
+        self._job = None
+        self.fn()
+
+
+
+class VirtualTable(ttk.Treeview):
+    """Treeview for large result sets, paged in progressively.
+
+    load(source) shows only the first page of rows; further pages are pulled from the
+    source (a cursor via fetchmany, or any iterator) as the user scrolls near the end.
+    This is not a windowed view: pages already shown stay in the Treeview, so a table
+    holds as many rows as the user has scrolled through, never the rows below that.
+    Reloading diffs against the rows on screen: unchanged rows stay, changed rows are
+    updated in place and only new/removed rows are inserted/deleted. Row iids are the
+    row keys, so selection survives a refresh.
+    """
+    def __init__(self, master, columns, key=lambda r: r[0], fmt=tuple, page_size=TABLE_PAGE_SIZE, **kwargs):
+        self._user_yscroll = kwargs.pop("yscrollcommand", None)
+        super().__init__(master, columns=columns, show="headings", yscrollcommand=self._on_scroll, **kwargs)
+        self.key, self.fmt, self.page_size = key, fmt, page_size
+        self.tag_configure('odd', background='#f8fafc'); self.tag_configure('even', background='#ffffff')
+        self._source = None
+        self._values = {}  # iid -> (values, tag) currently rendered
+
+    # --- LOADING ---
+    def load(self, source):
+        """Replace the contents with rows from source, applying a row-level diff"""
+        self._source = source if hasattr(source, "fetchmany") else iter(source)
+        self._diff(self._next_page())
+
+    def _next_page(self):
+        if self._source is None: return []
+        if hasattr(self._source, "fetchmany"): rows = self._source.fetchmany(self.page_size)
+        else: rows = list(islice(self._source, self.page_size))
+        if len(rows) < self.page_size: self._source = None  # Exhausted
+        return rows
+
+    def load_more(self):
+        for r in self._next_page():
+            iid = str(self.key(r))
+            if iid in self._values: continue
+            self._render(iid, r, len(self._values), "end")
+
+    def _on_scroll(self, first, last):
+        if self._user_yscroll: self._user_yscroll(first, last)
+        if self._source is not None and float(last) >= 0.9:
+            self.after_idle(self.load_more)
+
+    # --- DIFFING ---
+    def _diff(self, rows):
+        keep = {str(self.key(r)) for r in rows}
+        gone = [iid for iid in self._values if iid not in keep]
+        if gone:
+            self.delete(*gone)
+            for iid in gone: del self._values[iid]
+        order = list(self.get_children())
+        for idx, r in enumerate(rows):
+            iid = str(self.key(r))
+            if idx < len(order) and order[idx] == iid:
+                self._render(iid, r, idx)
+            else:
+                if iid in self._values: order.remove(iid)
+                self._render(iid, r, idx, idx)
+                order.insert(idx, iid)
+
+    def _render(self, iid, row, idx, position=None):
+        """Insert, move and/or update one row, touching Tk only for what changed"""
+        vals = (tuple(self.fmt(row)), 'even' if idx % 2 == 0 else 'odd')
+        if iid not in self._values:
+            self.insert("", "end" if position is None else position, iid=iid, values=vals[0], tags=(vals[1],))
+        else:
+            if position is not None: self.move(iid, "", position)
+            if self._values[iid] != vals: self.item(iid, values=vals[0], tags=(vals[1],))
+        self._values[iid] = vals
+
+    # --- SINGLE-ROW UPDATES ---
+    def upsert_row(self, row, position="end"):
+        iid = str(self.key(row))
+        idx = self.index(iid) if iid in self._values else len(self._values)
+        self._render(iid, row, idx, None if iid in self._values else position)
+
+    def refresh_row(self, row):
+        """Re-formats a row already on screen (its display depends on other state); others are left alone"""
+        iid = str(self.key(row))
+        if iid in self._values: self._render(iid, row, self.index(iid))
+
+    def remove_row(self, key):
+        iid = str(key)
+        if iid in self._values:
+            self.delete(iid)
+            del self._values[iid]
+
+    def clear(self):
+        self._source = None
+        if self._values: self.delete(*self._values)
+        self._values = {}
+
+
+class BusyIndicator(tk.Label):
+    """Small animated 'Loading' label; set(True/False) from QueryExecutor busy callbacks"""
+    FRAMES = ("⏳ Loading", "⏳ Loading.", "⏳ Loading..", "⏳ Loading...")
+
+    def __init__(self, master, **kwargs):
+        kwargs.setdefault("fg", COLOR_TEXT_SEC)
+        kwargs.setdefault("font", ("Helvetica", 9))
+        super().__init__(master, text="", **kwargs)
+        self._count, self._frame, self._job = 0, 0, None
+
+    def set(self, busy):
+        self._count = max(0, self._count + (1 if busy else -1))
+        if self._count and not self._job: self._tick()
+        if not self._count and self._job:
+            self.after_cancel(self._job)
+            self._job = None
+            self.config(text="")
+
+    def _tick(self):
+        self.config(text=self.FRAMES[self._frame % len(self.FRAMES)])
+        self._frame += 1
+        self._job = self.after(250, self._tick)
+
+class DiagnosticsOverlay(tk.Toplevel):
+    """Per-statement latency table, recent slow queries (profiler.py) and per-screen UI latency
+    (telemetry.py), refreshed live"""
+    SPARK = " ▁▂▃▄▅▆▇█"
+    COLS = ("Calls", "Total ms", "p50 ms", "p95 ms", "Max ms", "Rows", "Histogram", "Site", "Statement")
+    UI_COLS = ("Panel", "Metric", "n", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Budget")
+
+    def __init__(self, master, profiler, telemetry=None):
+        super().__init__(master, bg=COLOR_BG)
+        self.profiler, self.telemetry = profiler, telemetry
+        self.title("Diagnostics: database statements")
+        self.geometry("1200x700")
+        bar = tk.Frame(self, bg=COLOR_BG)
+        bar.pack(fill="x", padx=10, pady=8)
+        self.summary = tk.Label(bar, font=FONT_BOLD, bg=COLOR_BG, fg=COLOR_TEXT_MAIN)
+        self.summary.pack(side="left")
+        ModernButton(bar, text="Reset", command=self.reset).pack(side="right")
+        self.tree = ttk.Treeview(self, columns=self.COLS, show="headings", height=14)
+        for c in self.COLS:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width={"Statement": 420, "Site": 200, "Histogram": 150}.get(c, 70),
+                             anchor="w" if c in ("Statement", "Site", "Histogram") else "e")
+        self.tree.pack(fill="both", expand=True, padx=10)
+        if telemetry is not None:
+            tk.Label(self, text="UI latency per screen (p95 against budget)", font=FONT_BOLD,
+                     bg=COLOR_BG, fg=COLOR_TEXT_SEC).pack(anchor="w", padx=10, pady=(8, 0))
+            self.ui = ttk.Treeview(self, columns=self.UI_COLS, show="headings", height=6)
+            for c in self.UI_COLS:
+                self.ui.heading(c, text=c)
+                self.ui.column(c, width=120 if c in ("Panel", "Metric") else 80, anchor="w" if c in ("Panel", "Metric") else "e")
+            self.ui.tag_configure("over", foreground=COLOR_DANGER)
+            self.ui.pack(fill="x", padx=10)
+        tk.Label(self, text=f"Slow statements (>= {profiler.slow_ms} ms, also in {profiler.log_path})", font=FONT_BOLD,
+                 bg=COLOR_BG, fg=COLOR_TEXT_SEC).pack(anchor="w", padx=10, pady=(8, 0))
+        self.slow = tk.Text(self, height=12, font=("Consolas", 9), bg=COLOR_WHITE, relief="flat")
+        self.slow.pack(fill="both", padx=10, pady=(0, 10))
+        self._seen = None
+        self.refresh()
+
+    def spark(self, buckets):
+        """log2 latency histogram as one character per bucket, from the first used bucket to the last"""
+        used = [i for i, c in enumerate(buckets) if c]
+        if not used: return ""
+        top = max(buckets)
+        return "".join(self.SPARK[(c * (len(self.SPARK) - 1) + top - 1) // top] for c in buckets[used[0]:used[-1] + 1])
+
+    def refresh(self):
+        stats = self.profiler.stats()
+        self.tree.delete(*self.tree.get_children())
+        for sql, calls, total, p50, p95, mx, rows, site, buckets in stats:
+            self.tree.insert("", "end", values=(calls, f"{total:.1f}", f"{p50:.3f}", f"{p95:.3f}", f"{mx:.1f}", rows,
+                                                self.spark(buckets), site, sql[:300]))
+        self.summary.config(text=f"{sum(s[1] for s in stats):,} statements, {sum(s[2] for s in stats) / 1000:.2f} s in SQLite")
+        slow = list(self.profiler.slow)
+        if len(slow) != self._seen:
+            self._seen = len(slow)
+            self.slow.delete(1.0, "end")
+            for when, ms, sql, site, rows, plan in reversed(slow):
+                self.slow.insert("end", f"{time.strftime('%H:%M:%S', time.localtime(when))}  {ms:.1f} ms  {rows} rows  {site}\n  {sql.strip()[:400]}\n")
+                for p in plan or (): self.slow.insert("end", f"    | {p}\n")
+        if self.telemetry is not None: self.refresh_ui()
+        self._job = self.after(QUERY_OVERLAY_MS, self.refresh)
+
+    def refresh_ui(self):
+        self.ui.delete(*self.ui.get_children())
+        for panel, metrics in self.telemetry.summary().items():
+            for metric, st in metrics.items():
+                b = budget_for(panel, metric)
+                over = b is not None and st["n"] >= UI_BUDGET_MIN_SAMPLES and st["p95"] > b
+                self.ui.insert("", "end", values=(panel, metric, st["n"], f"{st['p50']:.1f}", f"{st['p95']:.1f}", f"{st['p99']:.1f}",
+                                                  f"{st['max']:.1f}", "-" if b is None else b), tags=("over",) if over else ())
+
+    def reset(self):
+        self.profiler.reset()
+        if self.telemetry is not None: self.telemetry.samples.clear(); self.telemetry.callbacks.clear()
+        self._seen = None
+
+    def destroy(self):
+        self.after_cancel(self._job)
+        super().destroy()
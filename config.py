@@ -1,9 +1,145 @@
 # FILE: config.py
+import os
 
 DB_NAME = "clothes_system.db"
 RECEIPT_DIR = "receipts"
 DEFAULT_SHOP_NAME = "Dolmen Clothes"
 DEFAULT_LOGO = "logo.png"
+LOGO_CACHE = "logo_180.png"    # Pre-scaled login logo (make_logo.py), loads without Pillow
+LOGO_SIZE = (180, 180)
+
+# --- DATABASE TUNING (applied once per pooled connection) ---
+DB_BUSY_TIMEOUT = 5.0          # Seconds to wait on a locked database
+DB_STATEMENT_CACHE = 256       # Prepared statements kept per connection
+DB_PRAGMAS = (
+    "journal_mode=WAL",        # Readers never block the till's writes
+    "synchronous=NORMAL",      # Safe with WAL, avoids an fsync per commit
+    "temp_store=MEMORY",
+    "cache_size=-16000",       # ~16 MB page cache
+    "mmap_size=268435456",     # 256 MB memory-mapped reads
+    "foreign_keys=ON",
+)
+
+# --- QUERY PROFILING (profiler.py; F12 opens the diagnostics overlay) ---
+QUERY_PROFILE = os.environ.get("DOLMEN_PROFILE", "1") != "0"  # Cheap enough to leave on
+SLOW_QUERY_MS = 50             # Statements at least this slow are logged with their query plan
+QUERY_LOG = "slow_queries.log"
+QUERY_LOG_BYTES = 1_000_000    # Rotated at this size
+QUERY_LOG_BACKUPS = 3
+QUERY_PLAN_INTERVAL_S = 60     # EXPLAIN a given slow statement at most this often
+QUERY_STATS_MAX = 500          # Distinct statements tracked; the rest are pooled
+QUERY_SLOW_KEEP = 200          # Recent slow statements kept for the overlay
+QUERY_OVERLAY_MS = 1000        # Overlay refresh interval
+
+# --- UI TELEMETRY (telemetry.py; shown in the F12 overlay) ---
+UI_HEARTBEAT_MS = 100          # Event-loop lag probe interval
+UI_SAMPLES = 3000              # Samples kept per panel and metric
+UI_EXPORT_MS = 300000          # Percentiles written to UI_TELEMETRY_FILE this often and on exit
+UI_TELEMETRY_FILE = "ui_telemetry.json"
+UI_TOP_CALLBACKS = 30          # Slowest callbacks listed in the export
+UI_BUDGET_MIN_SAMPLES = 20     # Fewer samples than this are not held to a budget
+UI_BUDGETS = {                 # p95 latency budget in ms per "panel.metric" ("*" = every panel)
+    "*.loop_lag": 50,
+    "*.callback": 50,
+    "sales.search_paint": 250,   # Includes SEARCH_DEBOUNCE_MS
+    "inv.search_paint": 300,
+    "sales.qty_prompt": 150,
+    "sales.scan_to_cart": 5,     # Enter / end of scanner burst -> line in the cart
+}
+
+# --- UI ---
+MAX_CACHED_PANELS = 4          # Panels kept alive (hidden) between sidebar clicks
+
+# --- BACKGROUND QUERIES ---
+QUERY_WORKERS = 2              # Threads running panel reads off the Tk main loop
+QUERY_POLL_MS = 15             # How often results are collected on the Tk thread
+
+# --- PRODUCT SEARCH ---
+SEARCH_LIMIT = 500             # Max rows a search-as-you-type query returns (a blank Inventory search is not capped)
+SEARCH_DEBOUNCE_MS = 120       # Wait for a pause in typing before querying
+TABLE_PAGE_SIZE = 100          # Rows a VirtualTable pulls in per page as the user scrolls down
+
+# --- SCAN LANE (scanner.py) ---
+SCAN_BURST_MS = 35             # Keystrokes closer than this are a keyboard-wedge scanner, not a person
+SCAN_MIN_LEN = 4               # Fast keystrokes in a row before it counts as a scan
+SCAN_END_MS = 80               # Scanners without an Enter suffix: submit after this much silence
+SCAN_INDEX_MAX_AGE_S = 60      # Rebuild the barcode index after a sale if it is older than this
+
+# --- INVENTORY ---
+LOW_STOCK_LEVEL = 5            # Items at or below this stock count as "low" (counted when read; a change applies at once)
+
+# --- REORDER FORECAST (forecast.py) ---
+FORECAST_HALF_LIFE = 14        # Days; a day's sales count half as much in the velocity after this long
+REORDER_LEAD_DAYS = 7          # Supplier lead time
+REORDER_SAFETY_DAYS = 7        # Reorder when stock covers fewer than lead + safety days
+REORDER_TARGET_DAYS = 30       # Days of sales an order should cover once it arrives
+REORDER_LIST_SIZE = 200        # Rows shown on the Dashboard / Stock Entry
+FORECAST_INTERVAL_S = 3600     # How often the till (or store server) looks for a finished day to forecast from
+
+# --- CHECKOUT ---
+CHECKOUT_RETRIES = 5           # Attempts after the first when the database is busy
+CHECKOUT_BACKOFF = 0.05        # Seconds; doubled on every retry (with jitter)
+
+# --- ANALYTICS (Reports panel, needs numpy) ---
+ANALYTICS_CHUNK = 20000        # Rows per fetchmany() when loading columns
+ANALYTICS_TOP_N = 25           # Top sellers listed
+ANALYTICS_CACHE = 16           # Reports (date ranges) kept until the data changes
+
+# --- COST OF GOODS ---
+COST_METHOD = "fifo"           # "fifo" (oldest stock first) or "average" (running weighted average)
+COST_BACKFILL_BATCH = 5000     # Sales rows rewritten per transaction by cost.py --backfill
+
+# --- STORE SERVER (several tills, one database) ---
+STORE_SERVER = os.environ.get("DOLMEN_SERVER")  # e.g. "http://192.168.1.10:8765": run this till as a client
+TERMINAL_ID = os.environ.get("DOLMEN_TERMINAL", "T1")  # This till's name in receipt ids
+STORE_SERVER_HOST = "127.0.0.1"  # server.py bind address; "0.0.0.0" to serve tills on the LAN (needs STORE_SERVER_KEY)
+STORE_SERVER_PORT = 8765
+STORE_SERVER_KEY = os.environ.get("DOLMEN_SERVER_KEY")  # Shared secret the tills send; required off loopback
+SERVER_BATCH = 64              # Max write requests committed together
+SERVER_BATCH_WINDOW_MS = 2     # Writer waits this long for more requests to share a commit
+SERVER_CACHE_SIZE = 1024       # Read results cached until the data changes
+SERVER_TIMEOUT = 10.0          # Client request timeout, seconds
+
+# --- BULK IMPORT ---
+IMPORT_CHUNK = 5000            # CSV rows written per transaction (write lock held ~50 ms)
+IMPORT_MAX_ERRORS = 200        # Rejected rows listed in the import report
+
+# --- BENCHMARKS ---
+DATAGEN_BATCH = 50000          # Rows per transaction when generating synthetic data
+BENCH_BASELINE = "bench_baseline.json"
+BENCH_TOLERANCE = 0.25         # Allowed p95 slowdown vs. the baseline before a check fails
+
+# --- EXPORT ---
+EXPORT_DIR = "exports"
+EXPORT_FETCH = 2000            # Rows pulled per fetchmany()
+EXPORT_STATE = "export_state.json"  # Last exported ids, kept in the output directory
+
+# --- RECEIPT OUTPUT ---
+RECEIPT_SINK = "archive"       # "archive", "file" (one .txt per receipt), "printer" or "none"
+RECEIPT_PRINT_COMMAND = ["lp"] # Used by the "printer" sink; receipt text goes to stdin
+RECEIPT_OPEN_AFTER = True      # "archive" / "file" sink: open the receipt in the viewer (Windows)
+RECEIPT_ARCHIVE_INDEX = "index.db"  # Receipt number -> segment offset, inside RECEIPT_DIR
+RECEIPT_ARCHIVE_LEVEL = 6      # zlib level
+RECEIPT_ARCHIVE_BATCH = 500    # Loose .txt files packed per index transaction
+RECEIPT_WORKERS = 1
+RECEIPT_QUEUE_SIZE = 200
+
+# --- BACKUPS (backup.py) ---
+BACKUP_DIR = "backups"
+BACKUP_INTERVAL_S = 3600       # Snapshot this often while the app / store server runs (skipped if nothing changed)
+BACKUP_FIRST_S = 300           # First snapshot this long after start, clear of the opening rush
+BACKUP_KEEP = 24               # Newest snapshots kept; older ones are deleted
+BACKUP_PAGES_PER_STEP = 256    # Pages copied per backup step (1 MB at 4 KB pages)
+BACKUP_STEP_SLEEP = 0.005      # Pause between steps, so the copy never hogs the disk
+BACKUP_LEVEL = 6               # gzip level
+
+# --- SALES HISTORY (history.py) ---
+HISTORY_DIR = "history"        # Yearly archive files (fyYYYY.db), next to the database; also BACKUP_DIR/history
+FISCAL_YEAR_START_MONTH = 1    # 7 for a July-June year; a fiscal year is named for the year it ends in
+HISTORY_KEEP_YEARS = 1         # Closed years kept live besides the current one
+HISTORY_MAX_ATTACHED = 8       # Archived years one connection keeps attached (SQLite allows 10 by default)
+HISTORY_PARALLEL_YEARS = 3     # Ranges over this many archived years are aggregated in a process pool
+HISTORY_WORKERS = min(4, os.cpu_count() or 1)
 
 # --- MODERN SLATE & EMERALD THEME ---
 COLOR_SIDEBAR = "#1e293b"      # Slate 800 (Dark Blue-Grey)
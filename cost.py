@@ -0,0 +1,122 @@
+# FILE: cost.py
+"""Cost of goods sold: fills sales.profit at checkout.
+
+Every purchase (Stock Entry, bulk import, the store server) adds a FIFO cost
+layer and folds into the item's running weighted average, via triggers on
+purchases / items. New items start with an opening layer for their stock.
+At checkout CostEngine consumes the oldest layers for each line; emptied
+layers drop out of the partial index, so each costs O(1) amortized. Both
+books are kept, and COST_METHOD picks which one prices the sale. When the
+layers run dry (stock added by hand), the average cost or purchase_price is used.
+
+Sales written before this existed have profit = 0. Repair them with:
+
+    python cost.py --backfill          # rows with profit 0 / NULL
+    python cost.py --backfill --all    # recompute every sale
+"""
+import argparse
+from collections import defaultdict, deque
+from config import *
+import summaries
+
+def _fold(item, qty, cost):
+    """UPSERT folding qty @ cost into item_costs' running average"""
+    return f'''INSERT INTO item_costs (item_id, qty, avg_cost) VALUES ({item}, {qty}, {cost})
+        ON CONFLICT(item_id) DO UPDATE SET
+            avg_cost = CASE WHEN max(qty, 0) + excluded.qty > 0
+                            THEN (max(qty, 0) * avg_cost + excluded.qty * excluded.avg_cost) / (max(qty, 0) + excluded.qty)
+                            ELSE excluded.avg_cost END,
+            qty = max(qty, 0) + excluded.qty;'''
+
+# --- CHECKOUT ---
+class CostEngine:
+    def __init__(self, method=COST_METHOD):
+        if method not in ("fifo", "average"): raise ValueError(f"unknown cost method {method!r}")
+        self.method = method
+
+    def consume(self, conn, item_id, qty):
+        """Takes qty off the item's cost books (inside the checkout transaction); returns the line's COGS"""
+        row = conn.execute('''SELECT c.avg_cost, i.purchase_price FROM items i LEFT JOIN item_costs c ON c.item_id = i.id
+                              WHERE i.id = ?''', (item_id,)).fetchone()
+        avg = row[0] if row and row[0] is not None else (row[1] if row else 0) or 0
+        need, fifo, used = qty, 0.0, []
+        for lid, left, unit in conn.execute("SELECT id, qty_left, unit_cost FROM cost_layers WHERE item_id = ? AND qty_left > 0 ORDER BY id", (item_id,)):
+            take = min(left, need)
+            fifo += take * unit
+            used.append((left - take, lid))
+            need -= take
+            if not need: break
+        fifo += need * avg  # Sold more than the layers hold: price the rest at the average
+        conn.executemany("UPDATE cost_layers SET qty_left = ? WHERE id = ?", used)
+        conn.execute("UPDATE item_costs SET qty = qty - ? WHERE item_id = ?", (qty, item_id))
+        return fifo if self.method == "fifo" else qty * avg
+
+    def restore(self, conn, item_id, qty, unit_cost):
+        """Puts returned stock back on the books as a new layer at the cost it was sold at"""
+        conn.execute("INSERT INTO cost_layers (item_id, qty_left, unit_cost, date) VALUES (?, ?, ?, date('now'))", (item_id, qty, unit_cost))
+        conn.execute(_fold("?", "?", "?"), (item_id, qty, unit_cost))
+
+# --- BACKFILL ---
+def backfill(db, method=COST_METHOD, everything=False, batch=COST_BACKFILL_BATCH, progress=None):
+    """Replays purchases and sales in date order and rewrites sales.profit in batches.
+    Only rows with profit 0 / NULL are touched unless everything=True. Returns rows updated."""
+    reader = db.reader
+    layers = defaultdict(deque)  # item_id -> [qty, unit_cost] oldest first
+    avg = {}                     # item_id -> [qty, avg_cost]
+    fallback = dict(reader.execute("SELECT id, coalesce(purchase_price, 0) FROM items"))
+    purchases = reader.execute("SELECT item_id, quantity, coalesce(purchase_price, 0), date FROM purchases ORDER BY date, id")
+    pending = purchases.fetchone()
+    updated, out = 0, []
+
+    def flush():
+        nonlocal updated
+        if not out: return
+        with db.transaction() as conn:
+            # Summaries get the batch's profit deltas in a few grouped UPDATEs instead of
+            # 8 trigger UPSERTs per row; DDL is transactional, so no till sees the triggers gone
+            saved = summaries.drop_triggers(conn)
+            conn.executemany("UPDATE sales SET profit = ? WHERE id = ?", [(new, sid) for sid, new, _, _, _ in out])
+            summaries.add_profit(conn, [(date, iid, new - old) for _, new, old, date, iid in out])
+            summaries.restore_triggers(conn, saved)
+        updated += len(out); out.clear()
+        if progress: progress(updated)
+
+    for sid, iid, qty, total, profit, date in reader.execute("SELECT id, item_id, quantity, total, profit, date FROM sales ORDER BY date, id"):
+        while pending and pending[3] <= date:  # Stock received before (or on the day of) this sale
+            p_iid, p_qty, p_cost, _ = pending
+            layers[p_iid].append([p_qty, p_cost])
+            q, a = avg.get(p_iid, (0, 0))
+            q = max(q, 0)
+            avg[p_iid] = [q + p_qty, (q * a + p_qty * p_cost) / (q + p_qty) if q + p_qty > 0 else p_cost]
+            pending = purchases.fetchone()
+        qty = qty or 0
+        unit_avg = avg[iid][1] if iid in avg else fallback.get(iid, 0)
+        need, fifo = qty, 0.0
+        book = layers[iid]
+        while need and book:
+            take = min(book[0][0], need)
+            fifo += take * book[0][1]
+            book[0][0] -= take
+            need -= take
+            if not book[0][0]: book.popleft()
+        fifo += need * unit_avg
+        if iid in avg: avg[iid][0] -= qty
+        new = round((total or 0) - (fifo if method == "fifo" else qty * unit_avg), 2)
+        if (everything or not profit) and abs((profit or 0) - new) > 0.005:
+            out.append((sid, new, profit or 0, date, iid))
+            if len(out) >= batch: flush()
+    flush()
+    return updated
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Recompute sales.profit from the purchase history")
+    ap.add_argument("--backfill", action="store_true", required=True)
+    ap.add_argument("--all", action="store_true", help="recompute every sale, not just rows with profit 0")
+    ap.add_argument("--method", choices=["fifo", "average"], default=COST_METHOD)
+    ap.add_argument("--db", default=DB_NAME)
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    n = backfill(db, args.method, args.all, progress=lambda n: print(f"\r{n} sales updated...", end="", flush=True))
+    print(f"\r{n} sales updated ({args.method}).")
+    db.close()
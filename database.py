@@ -1,83 +1,125 @@
 # FILE: database.py
 import sqlite3
+import threading
+from contextlib import contextmanager
 from config import *
+import migrations
+import profiler
 
 class DBManager:
-    def __init__(self):
-        self.conn = None
+    """Single data-access gateway for the app.
+
+    Connections are opened once per thread and kept for the life of the app,
+    so panels never pay sqlite3.connect() (and the pragma setup) on a hot path.
+    Statements are cached per connection by the sqlite3 module. With profile=True
+    every statement is timed and recorded (profiler.py).
+    """
+    def __init__(self, path=DB_NAME, profile=QUERY_PROFILE):
+        self.path, self.profile = path, profile
+        self._local = threading.local()
+        self._pool = []
+        self._pool_lock = threading.Lock()
         self.init_db()
 
+    # --- CONNECTIONS ---
+    def _open(self, readonly=False):
+        connect = profiler.connect if self.profile else sqlite3.connect
+        if readonly:
+            conn = connect(f"file:{self.path}?mode=ro", uri=True, timeout=DB_BUSY_TIMEOUT,
+                           cached_statements=DB_STATEMENT_CACHE, check_same_thread=False)
+        else:
+            conn = connect(self.path, timeout=DB_BUSY_TIMEOUT, isolation_level=None,
+                           cached_statements=DB_STATEMENT_CACHE, check_same_thread=False)
+        for p in DB_PRAGMAS:
+            if readonly and p.startswith("journal_mode"): continue  # Set by the writer, persists in the file
+            conn.execute(f"PRAGMA {p}")
+        with self._pool_lock: self._pool.append(conn)
+        return conn
+
+    @property
+    def conn(self):
+        """Long-lived read/write connection owned by the calling thread (autocommit)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    @property
+    def reader(self):
+        """Long-lived read-only connection owned by the calling thread"""
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            conn = self._local.reader = self._open(readonly=True)
+        return conn
+
     def connect(self):
-        self.conn = sqlite3.connect(DB_NAME)
         return self.conn.cursor()
 
+    def release(self):
+        """Closes the calling thread's connections (for short-lived worker threads)"""
+        for name in ("conn", "reader"):
+            conn = getattr(self._local, name, None)
+            if conn is None: continue
+            with self._pool_lock:
+                if conn in self._pool: self._pool.remove(conn)
+            conn.close()
+            setattr(self._local, name, None)
+
     def close(self):
-        if self.conn:
-            self.conn.close()
+        with self._pool_lock:
+            for conn in self._pool:
+                try:
+                    conn.execute("PRAGMA optimize")  # Refresh planner stats for tables that need it
+                except sqlite3.Error: pass
+                try: conn.close()
+                except sqlite3.Error: pass
+            self._pool = []
+        self._local = threading.local()
 
-    def init_db(self):
-        self.conn = sqlite3.connect(DB_NAME)
-        cur = self.conn.cursor()
-        
-        # 1. Users
-        cur.execute('''CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            username TEXT UNIQUE, 
-            password TEXT, 
-            role TEXT)''')
-
-        # 2. Shop Info
-        cur.execute('''CREATE TABLE IF NOT EXISTS shop_info (
-            id INTEGER PRIMARY KEY CHECK (id = 1), 
-            name TEXT, address TEXT, phone TEXT, terms TEXT)''')
-
-        # 3. Items (Ensure Prices are REAL/FLOAT)
-        cur.execute('''CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            name TEXT, category TEXT, season TEXT, 
-            purchase_price REAL, sale_price REAL, stock INTEGER)''')
-
-        # 4. Sales
-        cur.execute('''CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            receipt_id TEXT, item_id INTEGER, quantity INTEGER, 
-            sale_price REAL, profit REAL, total REAL, date TEXT)''')
-
-        # 5. Purchases
-        cur.execute('''CREATE TABLE IF NOT EXISTS purchases (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            item_id INTEGER, quantity INTEGER, 
-            purchase_price REAL, date TEXT)''')
-            
-        # Seed Data (Default Users)
+    # --- QUERY HELPERS ---
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()
+
+    def scalar(self, sql, params=(), default=None):
+        row = self.conn.execute(sql, params).fetchone()
+        return default if row is None or row[0] is None else row[0]
+
+    def execute(self, sql, params=()):
+        return self.conn.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq)
+
+    @contextmanager
+    def transaction(self, mode="IMMEDIATE"):
+        """BEGIN ... COMMIT on this thread's connection, ROLLBACK on error"""
+        conn = self.conn
+        conn.execute(f"BEGIN {mode}")
         try:
-            cur.execute("INSERT INTO users (username, password, role) VALUES ('admin', 'admin123', 'admin')")
-            cur.execute("INSERT INTO users (username, password, role) VALUES ('staff', 'staff123', 'staff')")
-        except: pass
-        
-        # Default Shop Info
-        cur.execute("SELECT count(*) FROM shop_info")
-        if cur.fetchone()[0] == 0:
-            cur.execute("INSERT INTO shop_info VALUES (1, ?, ?, ?, ?)", 
-                        (DEFAULT_SHOP_NAME, "123 Market St", "0300-1234567", "No Returns"))
-        
-        # Default Items for Testing
-        cur.execute("SELECT count(*) FROM items")
-        if cur.fetchone()[0] == 0:
-            items = [
-                ("Men Formal Shirt", "Men", "Summer", 800.0, 1500.0, 50),
-                ("Women Kurti", "Women", "Summer", 1000.0, 1800.0, 28),
-                ("Kids Winter Jacket", "Kids", "Winter", 1200.0, 2500.0, 19)
-            ]
-            cur.executemany("INSERT INTO items (name, category, season, purchase_price, sale_price, stock) VALUES (?,?,?,?,?,?)", items)
-
-        self.conn.commit()
-        self.conn.close()
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def init_db(self):
+        """Brings the schema up to date (see migrations.py)"""
+        migrations.migrate(self)
+
+    def data_token(self):
+        """Cheap token that changes whenever the database does: data_version moves when another
+        connection commits, total_changes when this thread's connection writes"""
+        conn = self.conn
+        return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+    def explain(self, sql, params=()):
+        """EXPLAIN QUERY PLAN details for a statement, one string per plan step"""
+        return [r[3] for r in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
 
     def get_shop_info(self):
-        conn = sqlite3.connect(DB_NAME)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM shop_info WHERE id=1")
-        data = cur.fetchone()
-        conn.close()
-        return data
\ No newline at end of file
+        return self.query_one("SELECT * FROM shop_info WHERE id=1")
@@ -0,0 +1,156 @@
+# FILE: datagen.py
+"""Reproducible synthetic store data for benchmarks and load tests.
+
+The same --seed always produces the same database. Item popularity is skewed
+(a few best sellers, a long tail), sales follow opening hours, weekends and
+seasons, and receipts carry 1-6 lines, so query plans and summary sizes look
+like a real store's rather than uniform noise.
+
+    python datagen.py bench.db --items 100000 --sales 5000000 --years 3
+
+Summary and FTS triggers are switched off while loading and everything is
+rebuilt once at the end, which is much faster than maintaining them row by row.
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+from itertools import accumulate, islice
+from config import *
+import summaries
+
+CATEGORIES = ["Men", "Women", "Kids"]
+SEASONS = ["Summer", "Winter", "All"]
+COLOURS = ["Black", "White", "Navy", "Maroon", "Olive", "Beige", "Grey", "Mustard", "Teal", "Rust", "Pink", "Sky"]
+FABRICS = ["Cotton", "Lawn", "Linen", "Khaddar", "Denim", "Wool", "Silk", "Chiffon", "Fleece", "Karandi"]
+ARTICLES = {
+    "Men": ["Shirt", "Kurta", "Shalwar Kameez", "Trouser", "Jeans", "Jacket", "Sweater", "Waistcoat", "Polo"],
+    "Women": ["Kurti", "Shalwar", "Dupatta", "Abaya", "Shawl", "Trouser", "Frock", "Scarf", "Cardigan"],
+    "Kids": ["Romper", "Frock", "Shorts", "T-Shirt", "Hoodie", "Jacket", "Pajama", "Kurta", "Sweater"],
+}
+HOUR_WEIGHTS = {10: 2, 11: 4, 12: 6, 13: 8, 14: 7, 15: 6, 16: 7, 17: 9, 18: 11, 19: 12, 20: 10, 21: 6, 22: 2}
+WINTER_MONTHS = {11, 12, 1, 2}
+
+def gen_items(rnd, n):
+    """(name, category, season, purchase_price, sale_price, stock)"""
+    for i in range(n):
+        cat = rnd.choice(CATEGORIES)
+        article = rnd.choice(ARTICLES[cat])
+        season = "Winter" if article in ("Jacket", "Sweater", "Shawl", "Hoodie", "Cardigan") else rnd.choice(SEASONS)
+        cost = round(rnd.lognormvariate(7, 0.5), -1)  # ~1,100 median, long tail
+        price = round(cost * rnd.uniform(1.4, 2.2), -1)
+        yield (f"{rnd.choice(COLOURS)} {rnd.choice(FABRICS)} {article} {i + 1:06d}", cat, season, cost, price, rnd.randint(0, 80))
+
+def daily_weights(start, days, rnd):
+    """Relative sales volume per day: weekends, Eid-like peaks and year-on-year growth"""
+    peaks = {rnd.randrange(days) for _ in range(days // 120)}
+    out = []
+    for d in range(days):
+        day = start + datetime.timedelta(days=d)
+        w = (1.6 if day.weekday() >= 5 else 1.0) * (1 + 0.25 * d / 365)
+        if any(0 <= p - d < 10 for p in peaks): w *= 3  # Festival rush in the days before a peak
+        out.append(w)
+    return out
+
+def gen_sales(rnd, items, n, start, days):
+    """(receipt, item_id, quantity, sale_price, profit, total, date) in date order; receipts count from 1.
+    items: [(id, season, cost, price)]"""
+    popularity = list(accumulate(1 / (r + 1) ** 0.9 for r in range(len(items))))  # Zipf-like
+    ranked = items[:]
+    rnd.shuffle(ranked)
+    winter = [i for i, it in enumerate(ranked) if it[1] == "Winter"]
+    hours, hour_w = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+    weights = [w * rnd.uniform(0.8, 1.2) for w in daily_weights(start, days, rnd)]
+    scale = n / sum(weights)
+    cum = [round(c * scale) for c in accumulate(weights)]  # Exactly n lines in total
+    receipt = 0
+    for d, target in enumerate(b - a for a, b in zip([0] + cum, cum)):
+        day = start + datetime.timedelta(days=d)
+        sizes = []
+        left = target
+        while left > 0:
+            sizes.append(min(rnd.choice((1, 1, 2, 2, 3, 4, 6)), left)); left -= sizes[-1]
+        stamps = sorted((rnd.choices(hours, hour_w)[0], rnd.randrange(60)) for _ in sizes)
+        in_winter = day.month in WINTER_MONTHS
+        for size, (h, m) in zip(sizes, stamps):
+            receipt += 1
+            rid, dt = receipt, f"{day.isoformat()} {h:02d}:{m:02d}"
+            for _ in range(size):
+                if in_winter and winter and rnd.random() < 0.3: iid, _, cost, price = ranked[rnd.choice(winter)]
+                else: iid, _, cost, price = rnd.choices(ranked, cum_weights=popularity)[0]
+                qty = rnd.choice((1, 1, 1, 1, 2, 2, 3))
+                yield rid, iid, qty, price, (price - cost) * qty, price * qty, dt
+
+def gen_purchases(rnd, items, start, days):
+    """(item_id, quantity, purchase_price, date): an opening delivery plus a few restocks per item"""
+    for iid, _, cost, _ in items:
+        yield iid, rnd.randint(20, 120), cost, start.isoformat()
+        for _ in range(rnd.randint(0, 4)):
+            yield iid, rnd.randint(10, 60), round(cost * rnd.uniform(0.95, 1.08), -1), (start + datetime.timedelta(days=rnd.randrange(days))).isoformat()
+
+def _batched(conn, sql, rows, batch, label, progress):
+    n, it = 0, iter(rows)
+    while True:
+        chunk = list(islice(it, batch))
+        if not chunk: return n
+        conn.execute("BEGIN")
+        conn.executemany(sql, chunk)
+        conn.execute("COMMIT")
+        n += len(chunk)
+        if progress: progress(f"{label}: {n:,}")
+
+def generate(path, items=10000, sales=500000, years=2, seed=42, batch=DATAGEN_BATCH, progress=None):
+    """Creates a new database at path filled with synthetic data; returns row counts"""
+    from database import DBManager
+    if os.path.exists(path): raise FileExistsError(path)
+    db = DBManager(path)
+    conn = db.conn
+    end = datetime.date(2025, 12, 31)  # Fixed, so a seed means the same data on every machine
+    start = end - datetime.timedelta(days=365 * years - 1)
+    rnd = random.Random(seed)
+
+    # Bulk load with the maintenance triggers off, then rebuild once
+    fts = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'items_fts_ai'").fetchone()
+    if fts: conn.execute("DROP TRIGGER items_fts_ai")
+    saved = summaries.drop_triggers(conn)
+    conn.execute("PRAGMA foreign_keys = OFF")  # Sales go in before their receipt headers, which are derived below
+    _batched(conn, "INSERT INTO items (name, category, season, purchase_price, sale_price, stock) VALUES (?,?,?,?,?,?)",
+             gen_items(rnd, items), batch, "items", progress)
+    conn.execute("UPDATE items SET barcode = printf('2%012d', id)")  # In-store EAN range, one per item
+    catalog = conn.execute("SELECT id, season, purchase_price, sale_price FROM items ORDER BY id").fetchall()
+    n_purchases = _batched(conn, "INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)",
+                           gen_purchases(rnd, catalog, start, 365 * years), batch, "purchases", progress)
+    n_sales = _batched(conn, "INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?,?,?,?,?,?,?)",
+                       gen_sales(rnd, catalog, sales, start, 365 * years), batch, "sales", progress)
+
+    if progress: progress("rebuilding receipts, search index and summaries")
+    with db.transaction() as c:
+        c.execute('''INSERT INTO receipts (id, number, terminal, seq, date, lines, total)
+                     SELECT receipt_id, printf('G-%06d', receipt_id), 'G', receipt_id, min(date), count(*), sum(total)
+                     FROM sales GROUP BY receipt_id''')  # Same numbers as checkout.receipt_number('G', seq)
+        c.execute("INSERT INTO terminal_seq (terminal, last) SELECT 'G', max(seq) FROM receipts HAVING count(*)")
+        if fts:
+            c.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+            c.execute(fts[0])
+        summaries.restore_triggers(c, saved)
+        summaries.rebuild(c)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("ANALYZE")  # Planner stats for a full database (not the empty-schema case)
+    db.close()
+    return {"items": len(catalog), "purchases": n_purchases, "sales": n_sales}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a synthetic store database")
+    ap.add_argument("path")
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--sales", type=int, default=5000000, help="sales lines")
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    if os.path.abspath(args.path) == os.path.abspath(DB_NAME): raise SystemExit("Refusing to overwrite the store database")
+    t = time.perf_counter()
+    try:
+        counts = generate(args.path, args.items, args.sales, args.years, args.seed, progress=lambda m: print(f"\r{m:<40}", end="", flush=True))
+    except FileExistsError: raise SystemExit(f"{args.path} already exists")
+    print(f"\r{', '.join(f'{v:,} {k}' for k, v in counts.items())} in {time.perf_counter() - t:.1f} s")
@@ -0,0 +1,48 @@
+# FILE: endpoints.py
+"""Typed store-server endpoints: the only database work a till in client mode can ask for.
+
+A reader or writer function is registered under "<module>.<name>" by decorating it:
+
+    @remote_read                       # fn(conn, *args) -> JSON-able result
+    def parked(conn): ...
+
+    @remote_write                      # fn(conn, *args), runs inside a write transaction
+    def delete_item(conn, item_id): ...
+
+Called on this machine they behave as before (a writer is called with the DBManager
+and runs in db.transaction()). Called with a client-mode connection / RemoteDB they
+send the function's name and arguments to server.py, which runs the registered
+function on its own connections. No SQL ever crosses the wire, so a till (or anyone
+else on the LAN) can do exactly what the panels do and nothing more.
+"""
+import functools
+
+READS = {}    # name -> (fn(conn, *args), cacheable)
+WRITES = {}   # name -> fn(conn, *args)
+
+def _name(fn):
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+def remote_read(fn=None, *, cache=True):
+    """Registers a reader; cache=False for results that must not be kept (login checks)"""
+    if fn is None: return functools.partial(remote_read, cache=cache)
+    name = _name(fn)
+    READS[name] = (fn, cache)
+
+    @functools.wraps(fn)
+    def read(conn, *args, **kwargs):
+        if getattr(conn, "remote", False): return conn.read(name, args, kwargs)
+        return fn(conn, *args, **kwargs)
+    return read
+
+def remote_write(fn):
+    """Registers a writer; called as fn(db, *args)"""
+    name = _name(fn)
+    WRITES[name] = fn
+
+    @functools.wraps(fn)
+    def write(db, *args):
+        if getattr(db, "remote", False): return db.write(name, args)
+        with db.transaction() as conn:
+            return fn(conn, *args)
+    return write
@@ -0,0 +1,93 @@
+# FILE: executor.py
+"""Background query executor.
+
+Panels hand DB reads to a small thread pool instead of running SQL inside Tk
+callbacks. Each worker uses its own long-lived read-only connection (DBManager.reader);
+the till's checkout commit also runs here, on the worker's own write connection.
+Results are queued and delivered back on the Tk thread by an after() poll, because
+Tk widgets must only be touched from the main thread.
+
+Requests are keyed (e.g. (panel, "catalog")): submitting again with the same key
+supersedes the previous request. If it hasn't started it is cancelled, if it is
+running its connection is interrupted, and a stale result is never delivered.
+"""
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from config import *
+
+class QueryExecutor:
+    def __init__(self, root, db, workers=QUERY_WORKERS, poll_ms=QUERY_POLL_MS):
+        self.root, self.db, self.poll_ms = root, db, poll_ms
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="query")
+        self.results = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._gen = {}       # key -> latest generation
+        self._futures = {}   # key -> Future of the latest request
+        self._handlers = {}  # key -> (callback, on_error, busy) of the latest request
+        self._running = {}   # key -> (generation, connection) while executing
+        self._job = self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, key, fn, callback, on_error=None, busy=None):
+        """Runs fn(conn) on a worker; callback(result) / on_error(exc) / busy(bool) run on the Tk thread"""
+        with self._lock:
+            gen = self._gen.get(key, 0) + 1
+            self._gen[key] = gen
+            self._supersede(key)
+        old = self._handlers.get(key)
+        if old and old[2]:
+            try: old[2](False)
+            except tk.TclError: pass
+        self._handlers[key] = (callback, on_error, busy)
+        if busy: busy(True)
+        self._futures[key] = self.pool.submit(self._run, key, gen, fn)
+
+    def cancel(self, key):
+        with self._lock:
+            self._gen[key] = self._gen.get(key, 0) + 1
+            self._supersede(key)
+        handlers = self._handlers.pop(key, None)
+        if handlers and handlers[2]: handlers[2](False)
+
+    def _supersede(self, key):
+        # Caller holds the lock
+        fut = self._futures.pop(key, None)
+        if fut: fut.cancel()
+        running = self._running.get(key)
+        if running: running[1].interrupt()  # Aborts the statement with "interrupted"
+
+    def _run(self, key, gen, fn):
+        conn = self.db.reader
+        with self._lock:
+            if self._gen.get(key) != gen: return  # Superseded while queued
+            self._running[key] = (gen, conn)
+        try:
+            res, err = fn(conn), None
+        except Exception as e:
+            res, err = None, e
+        finally:
+            with self._lock:
+                if self._running.get(key, (None,))[0] == gen: del self._running[key]
+        self.results.put((key, gen, res, err))
+
+    def _poll(self):
+        while True:
+            try: key, gen, res, err = self.results.get_nowait()
+            except queue.Empty: break
+            if self._gen.get(key) != gen: continue  # Stale: a newer request exists
+            callback, on_error, busy = self._handlers.pop(key, (None, None, None))
+            self._futures.pop(key, None)
+            try:
+                if busy: busy(False)
+                if err is None: callback and callback(res)
+                elif on_error: on_error(err)
+            except tk.TclError:
+                pass  # Widget was destroyed while the query ran
+        try: self._job = self.root.after(self.poll_ms, self._poll)
+        except tk.TclError: pass
+
+    def shutdown(self):
+        try: self.root.after_cancel(self._job)
+        except tk.TclError: pass
+        self.pool.shutdown(wait=False, cancel_futures=True)
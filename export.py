@@ -0,0 +1,141 @@
+# FILE: export.py
+"""Streaming export of sales, purchases and inventory for the accountants.
+
+Rows are pulled with fetchmany(EXPORT_FETCH) through a generator and written
+straight to CSV or gzip'd JSON lines, so memory stays flat however big the
+history is. Exports read through a read-only connection and never block a till.
+Sales / purchases exports by date also read the fiscal years moved into the
+yearly history files (history.py).
+
+Incremental mode remembers the last sales.id / purchases.id written to each
+output directory (export_state.json) and only writes newer rows. Files are
+written to *.part and renamed, and the state is saved only after the rename,
+so an interrupted run is simply repeated.
+
+    python export.py sales --from 2025-01-01 --to 2025-02-01
+    python export.py sales --incremental --format jsonl.gz --out exports/accounts
+    python export.py inventory
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import json
+import os
+from config import *
+import history
+
+# name -> (columns, SELECT ... FROM {table}, date column or None, incremental key or None)
+DATASETS = {
+    "sales": (("id", "receipt_id", "date", "item_id", "item", "category", "season", "quantity", "sale_price", "total", "profit"),
+              '''SELECT s.id, r.number, s.date, s.item_id, i.name, i.category, i.season, s.quantity, s.sale_price, s.total, s.profit
+                 FROM {table} s LEFT JOIN items i ON i.id = s.item_id LEFT JOIN receipts r ON r.id = s.receipt_id''', "s.date", "s.id"),
+    "purchases": (("id", "date", "item_id", "item", "quantity", "purchase_price"),
+                  '''SELECT p.id, p.date, p.item_id, i.name, p.quantity, p.purchase_price
+                     FROM {table} p LEFT JOIN items i ON i.id = p.item_id''', "p.date", "p.id"),
+    "inventory": (("id", "name", "category", "season", "purchase_price", "sale_price", "stock"),
+                  "SELECT id, name, category, season, purchase_price, sale_price, stock FROM items", None, None),
+}
+
+# --- STREAMING ---
+def stream(conn, sql, params=(), size=EXPORT_FETCH):
+    """Yields rows of one query, fetched size at a time"""
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows: return
+            yield from rows
+    finally:
+        cur.close()
+
+def build_query(dataset, start=None, end=None, after_id=None, table=None):
+    """SQL + params for a dataset; dates 'YYYY-MM-DD' as in [start, end), after_id for incremental runs.
+    table: what to read the dataset's rows from (history.relation), default its live table."""
+    cols, sql, date_col, key = DATASETS[dataset]
+    sql = sql.format(table=table or dataset)
+    where, params = [], []
+    if (start or end) and not date_col: raise ValueError(f"{dataset} has no date to filter on")
+    if after_id is not None and not key: raise ValueError(f"{dataset} can't be exported incrementally")
+    if start: where.append(f"{date_col} >= ?"); params.append(start)
+    if end: where.append(f"{date_col} < ?"); params.append(end)
+    if after_id is not None: where.append(f"{key} > ?"); params.append(after_id)
+    if where: sql += " WHERE " + " AND ".join(where)
+    if key: sql += f" ORDER BY {key}"
+    return sql, params
+
+# --- WRITERS: writer(rows, columns, path) -> (rows written, last row) ---
+def write_csv(rows, columns, path):
+    n, last = 0, None
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        for n, last in enumerate(rows, 1): w.writerow(last)
+    return n, last
+
+def write_jsonl_gz(rows, columns, path):
+    n, last = 0, None
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        encode = json.JSONEncoder(separators=(",", ":"), check_circular=False).encode
+        for n, last in enumerate(rows, 1): f.write(encode(dict(zip(columns, last))) + "\n")
+    return n, last
+
+WRITERS = {"csv": write_csv, "jsonl.gz": write_jsonl_gz}
+
+# --- INCREMENTAL STATE ---
+def load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, EXPORT_STATE)) as f: return json.load(f)
+    except FileNotFoundError: return {}
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, EXPORT_STATE)
+    with open(path + ".part", "w") as f: json.dump(state, f, indent=2)
+    os.replace(path + ".part", path)
+
+# --- EXPORTER ---
+def export(conn, dataset, fmt="csv", out_dir=EXPORT_DIR, start=None, end=None, incremental=False):
+    """Writes one export file; returns (path, rows). path is None if there was nothing new.
+    conn may be a DBManager reader or a raw connection."""
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir) if incremental else {}
+    after = state.get(dataset, 0) if incremental else None
+    table = history.relation(conn, dataset, start, end) if DATASETS[dataset][2] and not incremental else None  # Archived years too
+    sql, params = build_query(dataset, start, end, after, table)
+    columns = DATASETS[dataset][0]
+
+    if incremental: tag = f"from{after + 1}"
+    else: tag = f"{start or 'all'}_{end or datetime.date.today().isoformat()}"
+    path = os.path.join(out_dir, f"{dataset}_{tag}_{datetime.datetime.now():%Y%m%d%H%M%S}.{fmt}")
+
+    try:
+        n, last = WRITERS[fmt](stream(conn, sql, params), columns, path + ".part")
+    except BaseException:
+        os.remove(path + ".part")
+        raise
+    if not n:
+        os.remove(path + ".part")
+        return None, 0
+    os.replace(path + ".part", path)
+    if incremental:
+        state[dataset] = last[0]
+        save_state(out_dir, state)
+    return path, n
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Export sales / purchases / inventory for accounting")
+    ap.add_argument("dataset", choices=list(DATASETS))
+    ap.add_argument("--format", choices=list(WRITERS), default="csv")
+    ap.add_argument("--from", dest="start", help="first day, YYYY-MM-DD")
+    ap.add_argument("--to", dest="end", help="day after the last, YYYY-MM-DD")
+    ap.add_argument("--incremental", action="store_true", help="only rows added since the last incremental run")
+    ap.add_argument("--out", default=EXPORT_DIR)
+    ap.add_argument("--db", default=DB_NAME)
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    try:
+        path, n = export(db.reader, args.dataset, args.format, args.out, args.start, args.end, args.incremental)
+    except ValueError as e: raise SystemExit(str(e))
+    finally: db.close()
+    print(f"{n} rows -> {path}" if path else "Nothing new to export.")
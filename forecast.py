@@ -0,0 +1,152 @@
+# FILE: forecast.py
+"""Reorder forecasting: sales velocity per item, days of cover and what to order.
+
+Velocity is an exponentially weighted moving average of units sold per day
+(FORECAST_HALF_LIFE), kept deseasonalized: each day's sales are divided by a
+seasonal factor for the item's season field (Summer / Winter / All) and month,
+and multiplied back when forecasting. A winter jacket selling 2 a day in
+December is therefore not expected to keep selling 2 a day in May.
+
+update() folds only the days completed since its last run (from the per-item
+daily summary, summaries.py), so it costs O(new days), not O(history). A timer
+runs it every FORECAST_INTERVAL_S (the till's own, or the store server's); the
+Dashboard only reads the result.
+
+An item needs reordering when its stock covers fewer than
+REORDER_LEAD_DAYS + REORDER_SAFETY_DAYS days of forecast sales; the suggested
+quantity covers the lead time plus REORDER_TARGET_DAYS.
+
+    python forecast.py                 # update and print the reorder list
+    python forecast.py --rebuild       # recompute velocities from all history
+"""
+import argparse
+import datetime
+import math
+from calendar import monthrange
+from config import *
+from endpoints import remote_read
+
+DECAY = 0.5 ** (1 / FORECAST_HALF_LIFE)  # Per-day weight of yesterday's level
+ALPHA = 1 - DECAY
+MIN_LEVEL = 1e-3  # Below one unit per 1000 days the item is treated as not selling
+
+# --- SEASONALITY ---
+def season_factors(cur, last):
+    """{(season, month): factor}: average daily units in that month / over the whole year.
+    Needs a full year of history; until then every factor is 1."""
+    first = cur.execute("SELECT min(day) FROM sales_category_daily").fetchone()[0]
+    if not first: return {}
+    first = datetime.date.fromisoformat(first)
+    if (last - first).days < 365: return {}
+    days = {m: 0 for m in range(1, 13)}  # Calendar days of each month inside the history
+    for y in range(first.year, last.year + 1):
+        for m in range(1, 13):
+            lo, hi = max(first, datetime.date(y, m, 1)), min(last, datetime.date(y, m, monthrange(y, m)[1]))
+            if hi >= lo: days[m] += (hi - lo).days + 1
+    total_days = sum(days.values())
+    sold = {}
+    for season, m, qty in cur.execute('''SELECT season, CAST(substr(day, 6, 2) AS INTEGER), sum(qty) FROM sales_category_daily
+                                         WHERE day <= ? GROUP BY season, 2''', (last.isoformat(),)):
+        sold.setdefault(season, {})[m] = qty
+    out = {}
+    for season, months in sold.items():
+        overall = sum(months.values()) / total_days
+        for m in range(1, 13):
+            f = months.get(m, 0) / days[m] / overall if overall and days[m] else 1.0
+            out[(season, m)] = min(max(f, 0.25), 4.0)
+    return out
+
+def horizon(factors, season, start, days):
+    """Sum of the season's daily factors over `days` days from start (the forecast multiplier)"""
+    return sum(factors.get((season, (start + datetime.timedelta(days=d)).month), 1.0) for d in range(days))
+
+# --- INCREMENTAL UPDATE ---
+def update(cur, today=None, rebuild=False):
+    """Folds every complete day since the last run into item_velocity. Run it inside a write
+    transaction (db.transaction() or the store server's writer). Returns the number of days folded."""
+    today = today or datetime.date.today()
+    last = today - datetime.timedelta(days=1)  # Today is still selling; fold whole days only
+    if rebuild:
+        cur.execute("DELETE FROM item_velocity")
+        cur.execute("UPDATE forecast_state SET day = NULL WHERE id = 1")
+    done = cur.execute("SELECT day FROM forecast_state WHERE id = 1").fetchone()[0]
+    if done is None:
+        first = cur.execute("SELECT min(day) FROM sales_item_daily").fetchone()[0]
+        if first is None: return 0
+        done = (datetime.date.fromisoformat(first) - datetime.timedelta(days=1)).isoformat()
+    start = datetime.date.fromisoformat(done)
+    if last <= start: return 0
+
+    factors = season_factors(cur, last)
+    cur.execute("DELETE FROM season_index")
+    cur.executemany("INSERT INTO season_index (season, month, factor) VALUES (?, ?, ?)", [(s, m, f) for (s, m), f in factors.items()])
+
+    # L(last) = DECAY^(last - start) * L(start) + sum over new days d of ALPHA * q_d * DECAY^(last - d)
+    cur.execute("UPDATE item_velocity SET level = level * ?", (DECAY ** (last - start).days,))
+    seasons = dict(cur.execute("SELECT id, coalesce(season, '') FROM items"))
+    weight = {}  # 'YYYY-MM-DD' -> ALPHA * DECAY^(last - d)
+    add = {}
+    for day, item, qty in cur.execute("SELECT day, item_id, qty FROM sales_item_daily WHERE day > ? AND day <= ?", (done, last.isoformat())):
+        w = weight.get(day)
+        if w is None: w = weight[day] = ALPHA * DECAY ** (last - datetime.date.fromisoformat(day)).days
+        add[item] = add.get(item, 0.0) + w * qty / factors.get((seasons.get(item, ""), int(day[5:7])), 1.0)
+    cur.executemany('''INSERT INTO item_velocity (item_id, level) VALUES (?, ?)
+                       ON CONFLICT(item_id) DO UPDATE SET level = level + excluded.level''', add.items())
+    cur.execute("DELETE FROM item_velocity WHERE level < ?", (MIN_LEVEL,))
+    cur.execute("UPDATE forecast_state SET day = ? WHERE id = 1", (last.isoformat(),))
+    return (last - start).days
+
+def pending(conn, today=None):
+    """True when a finished day is waiting to be folded in; a read, so it takes no write lock"""
+    last = (today or datetime.date.today()) - datetime.timedelta(days=1)
+    done = conn.execute("SELECT day FROM forecast_state WHERE id = 1").fetchone()[0]
+    if done is None:
+        first = conn.execute("SELECT min(day) FROM sales_item_daily").fetchone()[0]
+        if first is None: return False
+        done = (datetime.date.fromisoformat(first) - datetime.timedelta(days=1)).isoformat()
+    return last > datetime.date.fromisoformat(done)
+
+def refresh(db, today=None):
+    """update() in its own transaction on this machine, only if a day is pending; in client mode
+    the store server runs it"""
+    if getattr(db, "remote", False) or not pending(db.reader, today): return 0
+    with db.transaction() as conn:
+        return update(conn, today)
+
+# --- READERS (conn may be a DBManager reader or a raw connection) ---
+@remote_read
+def reorder_list(conn, today=None, limit=None):
+    """Items to reorder, most urgent (fewest days of cover) first:
+    [(id, name, stock, purchase_price, units_per_day, days_of_cover, reorder_qty)]"""
+    today = today or datetime.date.today()
+    factors = {(s, m): f for s, m, f in conn.execute("SELECT season, month, factor FROM season_index")}
+    sql = '''SELECT i.id, i.name, max(coalesce(i.stock, 0), 0), coalesce(i.purchase_price, 0), coalesce(i.season, ''),
+                    v.level, v.level * coalesce(f.factor, 1.0) AS rate
+             FROM item_velocity v JOIN items i ON i.id = v.item_id
+             LEFT JOIN season_index f ON f.season = coalesce(i.season, '') AND f.month = ?
+             WHERE max(coalesce(i.stock, 0), 0) < (v.level * coalesce(f.factor, 1.0)) * ?
+             ORDER BY max(coalesce(i.stock, 0), 0) / (v.level * coalesce(f.factor, 1.0)), rate DESC'''
+    params = [today.month, REORDER_LEAD_DAYS + REORDER_SAFETY_DAYS]
+    if limit: sql += " LIMIT ?"; params.append(limit)
+    mult = {}  # season -> forecast multiplier over lead time + target cover
+    out = []
+    for iid, name, stock, cost, season, level, rate in conn.execute(sql, params):
+        if season not in mult: mult[season] = horizon(factors, season, today, REORDER_LEAD_DAYS + REORDER_TARGET_DAYS)
+        out.append((iid, name, stock, cost, rate, stock / rate, max(math.ceil(level * mult[season]) - stock, 1)))
+    return out
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Update sales velocities and print the reorder list")
+    ap.add_argument("--rebuild", action="store_true", help="recompute from all sales history")
+    ap.add_argument("--limit", type=int, default=30)
+    ap.add_argument("--db", default=DB_NAME)
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    with db.transaction() as conn:
+        n = update(conn, rebuild=args.rebuild)
+    print(f"{n} day(s) folded.")
+    print(f"{'ID':>7}  {'Item':<40}{'Stock':>7}{'/day':>8}{'Cover':>8}{'Order':>7}")
+    for iid, name, stock, _, rate, cover, qty in reorder_list(db.reader, limit=args.limit):
+        print(f"{iid:>7}  {name[:39]:<40}{stock:>7}{rate:>8.2f}{cover:>7.1f}d{qty:>7}")
+    db.close()
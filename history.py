@@ -0,0 +1,251 @@
+# FILE: history.py
+"""Hot/cold partitioning: closed fiscal years of sales and purchases live in yearly files.
+
+archive() moves every closed fiscal year older than HISTORY_KEEP_YEARS out of
+the live database into HISTORY_DIR/fyYYYY.db beside it (a fiscal year is named
+for the calendar year it ends in). The live tables, their indexes and every
+checkout stay the size of the recent years. A year is moved in two steps:
+
+1. its rows are copied into the year's file, committed and synced there;
+2. one write transaction checks every row made it, then deletes them from the
+   live tables and registers the year in history_years.
+
+A crash between the two leaves rows in both places, never in neither; the next
+run finishes the move. The summary tables (summaries.py) keep the archived
+days: the sales triggers are dropped around the delete, so the Dashboard and
+Reports totals still cover all history without touching the archives.
+
+Readers that need raw rows for a date range use relation() (ATTACH the years
+the range touches and UNION ALL them with the live table) or grouped()
+(aggregate each year on its own and merge the sums; ranges over
+HISTORY_PARALLEL_YEARS or more archived years are scanned in a process pool).
+Tills in client mode see the store server's live tables only.
+
+The history files hold the only copy of archived years: backup.py copies each
+one into BACKUP_DIR/history when it changes (after --archive here, and on every
+scheduled backup run).
+
+    python history.py --list
+    python history.py --archive [--through 2024] [--vacuum]   # after closing time
+"""
+import argparse
+import atexit
+import datetime
+import os
+import sqlite3
+from config import *
+import summaries
+
+TABLES = ("sales", "purchases")
+INDEXES = {"sales": ("date", "receipt_id", "item_id"), "purchases": ("date", "item_id")}
+
+class HistoryError(Exception):
+    pass
+
+# --- FISCAL YEARS ---
+def fiscal_year(day):
+    """date -> the fiscal year it falls in (named for the calendar year the fiscal year ends in)"""
+    return day.year + (FISCAL_YEAR_START_MONTH > 1 and day.month >= FISCAL_YEAR_START_MONTH)
+
+def year_bounds(fy):
+    """('YYYY-MM-DD', 'YYYY-MM-DD') with the end exclusive"""
+    first = datetime.date(fy - (FISCAL_YEAR_START_MONTH > 1), FISCAL_YEAR_START_MONTH, 1)
+    return first.isoformat(), first.replace(year=first.year + 1).isoformat()
+
+def closed_years(conn, today=None, keep=HISTORY_KEEP_YEARS):
+    """Fiscal years with rows still in the live tables that are due for archiving, oldest first"""
+    last = fiscal_year(today or datetime.date.today()) - 1 - keep
+    first = min((d for t in TABLES for d in conn.execute(f"SELECT min(date) FROM {t}").fetchone() if d), default=None)
+    if first is None: return []
+    return list(range(fiscal_year(datetime.date.fromisoformat(first[:10])), last + 1))
+
+# --- REGISTRY ---
+def years(conn, start=None, end=None):
+    """[(fy, file)] of archived years overlapping [start, end); dates 'YYYY-MM-DD'"""
+    sql, params = "SELECT fy, file FROM history_years WHERE 1", []
+    if start: sql += " AND end > ?"; params.append(start)
+    if end: sql += " AND start < ?"; params.append(end)
+    try: return [tuple(r) for r in conn.execute(sql + " ORDER BY fy", params).fetchall()]
+    except sqlite3.OperationalError: return []  # Schema older than the registry
+
+def cutoff(conn):
+    """First day still kept in the live tables (end of the last archived year), or None"""
+    try: return conn.execute("SELECT max(end) FROM history_years").fetchone()[0]
+    except sqlite3.OperationalError: return None
+
+def directory(db_path):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), HISTORY_DIR)
+
+def _raw(conn):
+    """The sqlite3 connection behind a DBManager or cursor; client-mode connections pass through"""
+    conn = getattr(conn, "connection", conn)
+    return getattr(conn, "conn", conn) if not isinstance(conn, sqlite3.Connection) else conn
+
+def _main_path(conn):
+    return next(r[2] for r in conn.execute("PRAGMA database_list") if r[1] == "main")
+
+def _columns(conn, table, schema="main"):
+    return [(r[1], r[2]) for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+# --- READING ACROSS YEARS ---
+def attach(conn, start=None, end=None):
+    """Schemas holding rows for [start, end): 'main' plus each archived year the range touches,
+    attached to conn as fyYYYY on first use. conn must not be inside a transaction."""
+    conn = _raw(conn)
+    need = years(conn, start, end)
+    if not need or not isinstance(conn, sqlite3.Connection): return ["main"]  # Client mode: live tables only
+    if len(need) > HISTORY_MAX_ATTACHED:
+        raise HistoryError(f"{len(need)} archived years in one query (max {HISTORY_MAX_ATTACHED}); use grouped()")
+    names = [f"fy{fy}" for fy, _ in need]
+    attached = {r[1] for r in conn.execute("PRAGMA database_list")}
+    spare = [s for s in attached if s.startswith("fy") and s not in names]
+    base = directory(_main_path(conn))
+    for (fy, file), name in zip(need, names):
+        if name in attached: continue
+        if len(attached) - 2 >= HISTORY_MAX_ATTACHED:  # Besides main and temp
+            old = spare.pop()
+            conn.execute(f"DETACH DATABASE {old}")
+            attached.discard(old)
+        conn.execute(f"ATTACH DATABASE ? AS {name}", (os.path.join(base, file),))
+        attached.add(name)
+    return ["main"] + names
+
+def relation(conn, table, start=None, end=None):
+    """FROM-clause SQL for `table` rows in [start, end): the live table, or a UNION ALL of it
+    and the archived years the range touches. The caller still filters on date."""
+    conn = _raw(conn)
+    schemas = attach(conn, start, end)
+    if len(schemas) == 1: return table
+    cols = ", ".join(c for c, _ in _columns(conn, table))
+    return "(" + " UNION ALL ".join(f"SELECT {cols} FROM {s}.{table}" for s in schemas) + ")"
+
+def grouped(conn, table, keys, measures, start=None, end=None, workers=HISTORY_WORKERS):
+    """{key tuple: [sums]} of `table` rows in [start, end) over the live and archived years.
+    keys / measures are SQL over the row alias t (item lookups may use unqualified `items`).
+    Each year is aggregated on its own and the partial sums merged; ranges over
+    HISTORY_PARALLEL_YEARS or more archived years are scanned in a process pool."""
+    conn = _raw(conn)
+    where, params = [], []
+    if start: where.append("t.date >= ?"); params.append(start)
+    if end: where.append("t.date < ?"); params.append(end)
+    sql = (f"SELECT {', '.join(keys)}, {', '.join(f'coalesce(sum({m}), 0)' for m in measures)} FROM {{schema}}.{table} t"
+           + (" WHERE " + " AND ".join(where) if where else "") + f" GROUP BY {', '.join(keys)}")
+    need = years(conn, start, end) if isinstance(conn, sqlite3.Connection) else []
+    if need and workers > 1 and (len(need) >= HISTORY_PARALLEL_YEARS or len(need) > HISTORY_MAX_ATTACHED):
+        live = _main_path(conn)
+        base = directory(live)
+        jobs = [(live, None, sql, params)] + [(live, os.path.join(base, file), sql, params) for _, file in need]
+        parts = list(_pool(workers).map(_scan, jobs))
+    else:
+        parts = [conn.execute(sql.format(schema=s), params).fetchall() for s in attach(conn, start, end)]
+    out, n = {}, len(keys)
+    for rows in parts:
+        for r in rows:
+            acc = out.get(r[:n])
+            if acc is None: out[r[:n]] = list(r[n:])
+            else:
+                for i, v in enumerate(r[n:]): acc[i] += v
+    return out
+
+# --- PROCESS POOL (multi-year scans) ---
+_POOL = None
+
+def _pool(workers):
+    """Spawned (not forked) workers: the app's threads and open connections don't leak into them"""
+    global _POOL
+    if _POOL is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(_POOL.shutdown, cancel_futures=True)
+    return _POOL
+
+def _scan(job):
+    """One year's rows of a grouped() query, in a worker process"""
+    live, archive_path, sql, params = job
+    conn = sqlite3.connect(f"file:{archive_path or live}?mode=ro", uri=True)
+    try:
+        if archive_path: conn.execute("ATTACH DATABASE ? AS live", (f"file:{live}?mode=ro",))  # items, for key lookups
+        return conn.execute(sql.format(schema="main"), params).fetchall()
+    finally:
+        conn.close()
+
+# --- ARCHIVING ---
+def archive_year(db, fy):
+    """Moves fiscal year fy's sales and purchases into its yearly file; returns (sales, purchases) moved"""
+    start, end = year_bounds(fy)
+    file = f"fy{fy}.db"
+    base = directory(db.path)
+    os.makedirs(base, exist_ok=True)
+    conn = db.conn
+    conn.execute("ATTACH DATABASE ? AS h", (os.path.join(base, file),))
+    try:
+        conn.execute("PRAGMA h.journal_mode=DELETE")  # A plain file readers can attach read-only
+        conn.execute("PRAGMA h.synchronous=FULL")     # On disk before anything leaves the live database
+        # 1. Copy
+        conn.execute("BEGIN")
+        for t in TABLES:
+            cols = _columns(conn, t)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS h.{t} ({', '.join(f'{c} {typ}'.strip() for c, typ in cols)}, PRIMARY KEY (id))"
+                         if cols[0][0] == "id" else f"CREATE TABLE IF NOT EXISTS h.{t} AS SELECT * FROM main.{t} WHERE 0")
+            names = ", ".join(c for c, _ in cols)
+            conn.execute(f"INSERT OR REPLACE INTO h.{t} ({names}) SELECT {names} FROM main.{t} WHERE date >= ? AND date < ?", (start, end))
+            for c in INDEXES[t]: conn.execute(f"CREATE INDEX IF NOT EXISTS h.idx_{t}_{c} ON {t}({c})")
+        conn.execute("COMMIT")
+        # 2. Move, under the write lock so no row can slip in between the check and the delete
+        with db.transaction() as c:
+            for t in TABLES:
+                missing = c.execute(f"SELECT count(*) FROM main.{t} m WHERE m.date >= ? AND m.date < ? "
+                                    f"AND NOT EXISTS (SELECT 1 FROM h.{t} WHERE id = m.id)", (start, end)).fetchone()[0]
+                if missing: raise HistoryError(f"FY{fy}: {missing} {t} rows not in {file}; nothing was moved")
+            saved = summaries.drop_triggers(c)  # The summaries keep the archived days
+            moved = [c.execute(f"DELETE FROM main.{t} WHERE date >= ? AND date < ?", (start, end)).rowcount for t in TABLES]
+            summaries.restore_triggers(c, saved)
+            counts = [c.execute(f"SELECT count(*) FROM h.{t}").fetchone()[0] for t in TABLES]
+            c.execute('''INSERT INTO history_years (fy, file, start, end, sales, purchases, archived) VALUES (?, ?, ?, ?, ?, ?, ?)
+                         ON CONFLICT(fy) DO UPDATE SET sales = excluded.sales, purchases = excluded.purchases, archived = excluded.archived''',
+                      (fy, file, start, end, *counts, datetime.datetime.now().strftime("%Y-%m-%d %H:%M")))
+    except BaseException:
+        if conn.in_transaction: conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE h")
+    return tuple(moved)
+
+def archive(db, through=None, today=None, keep=HISTORY_KEEP_YEARS, progress=None):
+    """Archives every closed fiscal year (up to `through`), oldest first; returns {fy: (sales, purchases)}"""
+    done = {}
+    for fy in closed_years(db.conn, today, keep):
+        if through is not None and fy > through: break
+        if progress: progress(fy)
+        done[fy] = archive_year(db, fy)
+    return done
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Move closed fiscal years of sales / purchases into yearly history files")
+    ap.add_argument("--db", default=DB_NAME)
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--list", action="store_true")
+    g.add_argument("--archive", action="store_true")
+    ap.add_argument("--through", type=int, metavar="FY", help="last fiscal year to archive")
+    ap.add_argument("--vacuum", action="store_true", help="shrink the live file afterwards (locks the database for a while)")
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    if args.archive:
+        before = os.path.getsize(args.db)
+        done = archive(db, args.through, progress=lambda fy: print(f"FY{fy}...", flush=True))
+        for fy, (s, p) in done.items(): print(f"FY{fy}: {s:,} sales, {p:,} purchases moved")
+        if not done: print("Nothing to archive.")
+        else:
+            import backup
+            for p in backup.backup_history(args.db): print(f"backed up {p}")
+        if done and args.vacuum:
+            db.conn.execute("VACUUM")
+            print(f"Live database {before / 1048576:.1f} MiB -> {os.path.getsize(args.db) / 1048576:.1f} MiB")
+    live = {t: db.scalar(f"SELECT count(*) FROM {t}") for t in TABLES}
+    print(f"{'FY':<8}{'sales':>12}{'purchases':>12}  file")
+    for fy, file, start, end, s, p, when in db.query("SELECT * FROM history_years ORDER BY fy"):
+        print(f"{fy:<8}{s:>12,}{p:>12,}  {os.path.join(HISTORY_DIR, file)}  ({start} .. {end}, archived {when})")
+    print(f"{'live':<8}{live['sales']:>12,}{live['purchases']:>12,}  {args.db}")
+    db.close()
@@ -1,15 +1,35 @@
 # FILE: main.py
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import os
-from PIL import Image, ImageTk  # Ensure Pillow is installed (pip install pillow)
+import threading
+import multiprocessing
+from collections import OrderedDict
 
 # Import functionalities from other modules
+# (panels and Pillow are imported lazily: neither is needed to draw the login screen)
 from config import *
 from database import DBManager
-from components import ModernButton, SidebarButton
-from panels import DashboardPanel, InventoryPanel, SalesPanel, ReportsPanel, SettingsPanel, PurchasePanel
+import store
+from search import ProductSearch
+from checkout import CheckoutEngine
+from receipts import ReceiptSpooler, make_sink
+from receipt_archive import has_loose_files
+from backup import BackupScheduler
+import forecast
+from executor import QueryExecutor
+from components import ModernButton, SidebarButton, DiagnosticsOverlay
+from profiler import PROFILER
+from telemetry import UITelemetry
+
+# Startup probe (benchmark.py startup): prints wall-clock milestones, then exits
+STARTUP_PROBE = os.environ.get("DOLMEN_STARTUP_PROBE") == "1"
+
+def mark(milestone):
+    if STARTUP_PROBE: print(f"STARTUP {milestone} {time.time():.6f}", flush=True)
+
+mark("imports")
 
 class ClothesApp(tk.Tk):
     def __init__(self):
@@ -19,10 +39,33 @@ class ClothesApp(tk.Tk):
         self.state("zoomed")
         self.configure(bg=COLOR_BG)
         
-        # Initialize Database
-        self.db = DBManager()
+        # UI latency telemetry first, so every callback registered below is timed
+        self.telemetry = UITelemetry(self)
+        self.telemetry.install()
+        
+        # Initialize Database (own file, or a store server shared by several tills)
+        self._stop = threading.Event()  # Background timers
+        if STORE_SERVER:
+            from client import RemoteDB, RemoteSearch, RemoteCheckout
+            self.db = RemoteDB(STORE_SERVER)
+            self.search, self.checkout = RemoteSearch(self.db), RemoteCheckout(self.db)
+            self.backups = None  # The store server backs up its database
+        else:
+            self.db = DBManager()
+            self.search = ProductSearch(self.db)
+            self.checkout = CheckoutEngine(self.db)
+            self.backups = BackupScheduler(self.db.path).start()
+            threading.Thread(target=self._forecast_loop, name="forecast", daemon=True).start()
+        self.spooler = ReceiptSpooler(make_sink())
+        archive = getattr(self.spooler.sink, "archive", None)
+        if archive and has_loose_files():  # One-time: fold the old one-file-per-receipt directory into the archive
+            threading.Thread(target=archive.pack, name="receipt-pack", daemon=True).start()
+        self.queries = QueryExecutor(self, self.db)
         self.user = None
         self.role = None
+        self._logo = None
+        self._diag = None
+        self.bind("<F12>", self.toggle_diagnostics)
         
         # Ensure Receipt Directory Exists
         if not os.path.exists(RECEIPT_DIR): os.makedirs(RECEIPT_DIR)
@@ -52,9 +95,17 @@ class ClothesApp(tk.Tk):
         
         self.show_login()
 
+    def _forecast_loop(self):
+        """Folds each finished day into the reorder forecast (a store server runs its own)"""
+        while True:
+            try: forecast.refresh(self.db)
+            except Exception: pass  # Retried next interval; the Dashboard keeps the previous forecast
+            if self._stop.wait(FORECAST_INTERVAL_S): return
+
     def show_login(self):
         # Clear current screen
         for w in self.container.winfo_children(): w.destroy()
+        self.telemetry.panel = "login"
         
         # --- SPLIT SCREEN LOGIN LAYOUT ---
         
@@ -68,11 +119,7 @@ class ClothesApp(tk.Tk):
         
         # Try Loading Logo
         try:
-            load = Image.open(DEFAULT_LOGO)
-            load = load.resize((180, 180), Image.Resampling.LANCZOS)
-            render = ImageTk.PhotoImage(load)
-            img_lbl = tk.Label(brand_container, image=render, bg=COLOR_SIDEBAR)
-            img_lbl.image = render # Keep reference
+            img_lbl = tk.Label(brand_container, image=self.load_logo(), bg=COLOR_SIDEBAR)
             img_lbl.pack(pady=(0, 20))
         except:
             # Fallback if logo.png is missing
@@ -106,13 +153,11 @@ class ClothesApp(tk.Tk):
         
         # Login Logic
         def login(event=None):
-            conn = sqlite3.connect(DB_NAME)
-            res = conn.execute("SELECT role FROM users WHERE username=? AND password=?", (u_entry.get(), p_entry.get())).fetchone()
-            conn.close()
+            role = store.login(self.db.reader, u_entry.get(), p_entry.get())
             
-            if res:
+            if role:
                 self.user = u_entry.get()
-                self.role = res[0]
+                self.role = role
                 self.load_dashboard()
             else:
                 messagebox.showerror("Access Denied", "Invalid Username or Password")
@@ -128,9 +173,40 @@ class ClothesApp(tk.Tk):
         
         # Footer
         tk.Label(login_box, text="Default: admin/admin123  |  staff/staff123", font=("Helvetica", 9), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(pady=20)
+        
+        if STARTUP_PROBE: self.after_idle(self.probe_login)
+
+    def load_logo(self):
+        """Login logo, decoded once per process (kept across logouts). Reads the pre-scaled
+        LOGO_CACHE with Tk's own PNG loader; Pillow is only imported to (re)build the cache."""
+        if self._logo is None:
+            if os.path.exists(DEFAULT_LOGO) and (not os.path.exists(LOGO_CACHE) or
+                                                 os.path.getmtime(LOGO_CACHE) < os.path.getmtime(DEFAULT_LOGO)):
+                from make_logo import create_scaled_logo
+                create_scaled_logo()
+            self._logo = tk.PhotoImage(file=LOGO_CACHE)
+        return self._logo
+
+    def probe_login(self):
+        """Startup probe: login screen is drawn; sign in as admin and time the dashboard"""
+        self.update_idletasks()
+        mark("login")
+        self.user, self.role = "admin", "admin"
+        self.load_dashboard()
+        self.update_idletasks()
+        mark("dashboard")
+        self.after_idle(self.destroy)
+
+    def toggle_diagnostics(self, event=None):
+        """F12: live per-statement timings and the slow query log (profiler.py)"""
+        if self._diag is not None and self._diag.winfo_exists():
+            self._diag.destroy(); self._diag = None
+        else:
+            self._diag = DiagnosticsOverlay(self, PROFILER, self.telemetry)
 
     def load_dashboard(self):
         for w in self.container.winfo_children(): w.destroy()
+        self.unbind('<Return>')  # Login shortcut; must not fire from the panels
         
         # --- SIDEBAR (Navigation) ---
         sidebar = tk.Frame(self.container, bg=COLOR_SIDEBAR, width=260)
@@ -164,6 +240,8 @@ class ClothesApp(tk.Tk):
         # --- MAIN CONTENT AREA ---
         self.content = tk.Frame(self.container, bg=COLOR_BG)
         self.content.pack(side="right", fill="both", expand=True)
+        self.panels = OrderedDict()  # page -> panel, least recently used first
+        self.current = None
         
         # Load Dashboard by default
         self.nav("dash")
@@ -176,20 +254,44 @@ class ClothesApp(tk.Tk):
         btn.pack(fill="x", pady=2)
 
     def nav(self, page):
-        """Switch between different panels"""
-        for w in self.content.winfo_children(): w.destroy()
+        """Switch between panels. Each panel is built once per login, then hidden and
+        shown again with a cheap refresh() instead of being destroyed and rebuilt."""
+        if page == self.current: return self.panels[page].refresh()
+        if self.current: self.panels[self.current].pack_forget()
         
-        # Wrapper for padding/margins
-        wrapper = tk.Frame(self.content, bg=COLOR_BG)
-        wrapper.pack(fill="both", expand=True, padx=30, pady=30)
+        panel = self.panels.get(page)
+        if panel is None:
+            self.evict_panels()
+            import panels  # Lazy: not needed for the login screen (a plain import, so PyInstaller bundles it)
+            panel = self.panels[page] = getattr(panels, PANELS[page])(self.content, self)
+        else:
+            panel.refresh()
+        self.panels.move_to_end(page)
         
-        if page == "dash": DashboardPanel(wrapper, self).pack(fill="both", expand=True)
-        if page == "sales": SalesPanel(wrapper, self).pack(fill="both", expand=True)
-        if page == "inv": InventoryPanel(wrapper, self).pack(fill="both", expand=True)
-        if page == "buy": PurchasePanel(wrapper, self).pack(fill="both", expand=True)
-        if page == "rep": ReportsPanel(wrapper, self).pack(fill="both", expand=True)
-        if page == "set": SettingsPanel(wrapper, self).pack(fill="both", expand=True)
+        # Padding/margins around the panel
+        panel.pack(fill="both", expand=True, padx=30, pady=30)
+        self.current = self.telemetry.panel = page
+
+    def evict_panels(self):
+        """Keeps at most MAX_CACHED_PANELS alive; never drops a sale in progress"""
+        for page in list(self.panels):
+            if len(self.panels) < MAX_CACHED_PANELS: break
+            panel = self.panels[page]
+            if page == self.current or getattr(panel, "cart", None): continue
+            panel.destroy()
+            del self.panels[page]
+
+PANELS = {"dash": "DashboardPanel", "sales": "SalesPanel", "inv": "InventoryPanel",
+          "buy": "PurchasePanel", "rep": "ReportsPanel", "set": "SettingsPanel"}
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Packaged build: lets history.py's report workers start
     app = ClothesApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    try: app.telemetry.export()
+    except OSError: pass
+    app._stop.set()
+    app.queries.shutdown()
+    if app.backups: app.backups.stop()
+    app.spooler.shutdown()
+    app.db.close()
\ No newline at end of file
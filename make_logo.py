@@ -1,4 +1,5 @@
 from PIL import Image, ImageDraw, ImageFont
+from config import DEFAULT_LOGO, LOGO_CACHE, LOGO_SIZE
 
 def create_simple_logo():
     # White background wali image banayega
@@ -13,8 +14,18 @@ def create_simple_logo():
     img.save('logo.png')
     print("Success: 'logo.png' ban gayi hai!")
 
+def create_scaled_logo(src=DEFAULT_LOGO, dst=LOGO_CACHE, size=LOGO_SIZE):
+    # Login screen wala chhota logo pehle se resize kar ke save karega,
+    # taake app har dafa Pillow load aur LANCZOS resize na kare
+    img = Image.open(src)
+    img = img.resize(size, Image.Resampling.LANCZOS)
+    img.save(dst, "PNG")  # Tk 8.6 PNG khud parh leta hai
+    return dst
+
 if __name__ == "__main__":
     try:
         create_simple_logo()
+        create_scaled_logo()
+        print(f"Success: '{LOGO_CACHE}' bhi ban gayi hai!")
     except ImportError:
-        print("Error: Pehle 'pip install pillow' run karein.")
\ No newline at end of file
+        print("Error: Pehle 'pip install pillow' run karein.")
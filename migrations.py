@@ -0,0 +1,326 @@
+# FILE: migrations.py
+"""Numbered schema migrations.
+
+The schema version lives in PRAGMA user_version. On startup every migration newer
+than the stored version runs in its own transaction, in order, and bumps the version.
+Never edit a released migration; append a new one instead. Each migration carries
+its own SQL, as released, rather than calling the modules that own the tables today:
+those keep changing, and an old database must still be brought up the way it was.
+"""
+import sqlite3
+from config import *
+
+MIGRATIONS = {}
+
+def migration(version):
+    """Registers fn(cur) as the step that brings the schema to `version`"""
+    def wrap(fn):
+        assert version not in MIGRATIONS, f"duplicate migration {version}"
+        MIGRATIONS[version] = fn
+        return fn
+    return wrap
+
+def latest_version():
+    return max(MIGRATIONS)
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(db):
+    """Applies pending migrations on db's connection, returns the list of versions applied"""
+    applied = []
+    if current_version(db.conn) >= latest_version(): return applied  # Fast path: nothing to do on a normal launch
+    for version in sorted(MIGRATIONS):
+        if version <= current_version(db.conn): continue
+        with db.transaction() as conn:
+            MIGRATIONS[version](conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+# --- 1. BASE SCHEMA + SEED DATA ---
+@migration(1)
+def base_schema(cur):
+    # 1. Users
+    cur.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT,
+        role TEXT)''')
+
+    # 2. Shop Info
+    cur.execute('''CREATE TABLE IF NOT EXISTS shop_info (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        name TEXT, address TEXT, phone TEXT, terms TEXT)''')
+
+    # 3. Items (Ensure Prices are REAL/FLOAT)
+    cur.execute('''CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT, category TEXT, season TEXT,
+        purchase_price REAL, sale_price REAL, stock INTEGER)''')
+
+    # 4. Sales
+    cur.execute('''CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        receipt_id TEXT, item_id INTEGER, quantity INTEGER,
+        sale_price REAL, profit REAL, total REAL, date TEXT)''')
+
+    # 5. Purchases
+    cur.execute('''CREATE TABLE IF NOT EXISTS purchases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_id INTEGER, quantity INTEGER,
+        purchase_price REAL, date TEXT)''')
+
+    # Seed Data (Default Users)
+    cur.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES ('admin', 'admin123', 'admin')")
+    cur.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES ('staff', 'staff123', 'staff')")
+
+    # Default Shop Info
+    cur.execute("SELECT count(*) FROM shop_info")
+    if cur.fetchone()[0] == 0:
+        cur.execute("INSERT INTO shop_info VALUES (1, ?, ?, ?, ?)",
+                    (DEFAULT_SHOP_NAME, "123 Market St", "0300-1234567", "No Returns"))
+
+    # Default Items for Testing
+    cur.execute("SELECT count(*) FROM items")
+    if cur.fetchone()[0] == 0:
+        items = [
+            ("Men Formal Shirt", "Men", "Summer", 800.0, 1500.0, 50),
+            ("Women Kurti", "Women", "Summer", 1000.0, 1800.0, 28),
+            ("Kids Winter Jacket", "Kids", "Winter", 1200.0, 2500.0, 19)
+        ]
+        cur.executemany("INSERT INTO items (name, category, season, purchase_price, sale_price, stock) VALUES (?,?,?,?,?,?)", items)
+
+
+# --- 2. HOT-QUERY INDEXES ---
+@migration(2)
+def hot_query_indexes(cur):
+    # Dashboard / Reports aggregates: date range + the summed columns, answered from the index alone
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_date_cover ON sales(date, total, profit)")
+    # Receipt lookup / reprint
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_receipt ON sales(receipt_id)")
+    # Per-item sales history
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sales_item_date ON sales(item_id, date)")
+    # Purchase history per item and per period
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_item_date ON purchases(item_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases(date)")
+    # Low-stock count and the in-stock filter of the catalog
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_items_stock ON items(stock)")
+    # Name lookups; NOCASE so prefix LIKE 'abc%' can seek (LIKE is case-insensitive)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_items_name ON items(name COLLATE NOCASE)")
+    cur.execute("ANALYZE")
+
+
+# --- 3. FULL-TEXT PRODUCT SEARCH ---
+@migration(3)
+def product_search_index(cur):
+    try:
+        cur.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            name, category, season,
+            content='items', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')''')
+    except sqlite3.OperationalError:
+        return  # SQLite built without FTS5; search.py falls back to LIKE
+    # External-content table: keep it in sync with items
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name, category, season) VALUES (new.id, new.name, new.category, new.season);
+    END''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, category, season) VALUES ('delete', old.id, old.name, old.category, old.season);
+    END''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, category, season ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, category, season) VALUES ('delete', old.id, old.name, old.category, old.season);
+        INSERT INTO items_fts(rowid, name, category, season) VALUES (new.id, new.name, new.category, new.season);
+    END''')
+    cur.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+# --- 4. MATERIALIZED SALES / INVENTORY SUMMARIES (as summaries.py shipped them) ---
+_V4_DAY = "substr({r}.date, 1, 10)"
+# table -> (key columns, key expressions over a sales row)
+_V4_TABLES = {
+    "sales_daily": (("day",), (_V4_DAY,)),
+    "sales_hourly": (("day", "hour"), (_V4_DAY, "CAST(substr({r}.date, 12, 2) AS INTEGER)")),
+    "sales_item_daily": (("day", "item_id"), (_V4_DAY, "{r}.item_id")),
+    "sales_category_daily": (("day", "category", "season"), (_V4_DAY, "coalesce((SELECT category FROM items WHERE id = {r}.item_id), '')",
+                                                             "coalesce((SELECT season FROM items WHERE id = {r}.item_id), '')")),
+}
+_V4_MEASURES = ("lines", "qty", "revenue", "profit")
+_V4_MEASURE_EXPRS = ("1", "{r}.quantity", "{r}.total", "{r}.profit")
+_V4_LOW_STOCK = 5
+
+def _v4_upsert(table, r, sign):
+    keys, key_exprs = _V4_TABLES[table]
+    vals = [e.format(r=r) for e in key_exprs] + [f"{'-' if sign < 0 else ''}coalesce({e.format(r=r)}, 0)" for e in _V4_MEASURE_EXPRS]
+    sets = ", ".join(f"{m} = {m} + excluded.{m}" for m in _V4_MEASURES)
+    return (f"INSERT INTO {table} ({', '.join(keys + _V4_MEASURES)}) VALUES ({', '.join(vals)}) "
+            f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {sets};")
+
+@migration(4)
+def sales_summaries(cur):
+    measures = "lines INTEGER NOT NULL DEFAULT 0, qty INTEGER NOT NULL DEFAULT 0, revenue REAL NOT NULL DEFAULT 0, profit REAL NOT NULL DEFAULT 0"
+    cur.execute(f"CREATE TABLE IF NOT EXISTS sales_daily (day TEXT PRIMARY KEY, {measures}) WITHOUT ROWID")
+    cur.execute(f"CREATE TABLE IF NOT EXISTS sales_hourly (day TEXT, hour INTEGER, {measures}, PRIMARY KEY (day, hour)) WITHOUT ROWID")
+    cur.execute(f"CREATE TABLE IF NOT EXISTS sales_item_daily (day TEXT, item_id INTEGER, {measures}, PRIMARY KEY (day, item_id)) WITHOUT ROWID")
+    cur.execute(f"CREATE TABLE IF NOT EXISTS sales_category_daily (day TEXT, category TEXT, season TEXT, {measures}, PRIMARY KEY (day, category, season)) WITHOUT ROWID")
+    cur.execute('''CREATE TABLE IF NOT EXISTS inventory_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        item_count INTEGER NOT NULL DEFAULT 0, total_stock INTEGER NOT NULL DEFAULT 0, low_count INTEGER NOT NULL DEFAULT 0)''')
+    cur.execute("INSERT OR IGNORE INTO inventory_summary (id) VALUES (1)")
+    # Triggers
+    add = lambda r: "\n".join(_v4_upsert(t, r, +1) for t in _V4_TABLES)
+    sub = lambda r: "\n".join(_v4_upsert(t, r, -1) for t in _V4_TABLES)
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS summary_sales_ai AFTER INSERT ON sales BEGIN\n{add('NEW')}\nEND")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS summary_sales_ad AFTER DELETE ON sales BEGIN\n{sub('OLD')}\nEND")
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS summary_sales_au AFTER UPDATE OF item_id, quantity, total, profit, date ON sales BEGIN
+        {sub('OLD')}
+        {add('NEW')}
+    END''')
+    low = lambda r: f"(coalesce({r}.stock, 0) <= {_V4_LOW_STOCK})"
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS summary_items_ai AFTER INSERT ON items BEGIN
+        UPDATE inventory_summary SET item_count = item_count + 1, total_stock = total_stock + coalesce(NEW.stock, 0),
+               low_count = low_count + {low('NEW')} WHERE id = 1;
+    END''')
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS summary_items_ad AFTER DELETE ON items BEGIN
+        UPDATE inventory_summary SET item_count = item_count - 1, total_stock = total_stock - coalesce(OLD.stock, 0),
+               low_count = low_count - {low('OLD')} WHERE id = 1;
+    END''')
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS summary_items_au AFTER UPDATE OF stock ON items BEGIN
+        UPDATE inventory_summary SET total_stock = total_stock - coalesce(OLD.stock, 0) + coalesce(NEW.stock, 0),
+               low_count = low_count - {low('OLD')} + {low('NEW')} WHERE id = 1;
+    END''')
+    # Fill them from the sales / items already there
+    for table, (keys, key_exprs) in _V4_TABLES.items():
+        cur.execute(f"DELETE FROM {table}")
+        sel = ", ".join(f"{e.format(r='s')} AS {k}" for e, k in zip(key_exprs, keys))
+        cur.execute(f"INSERT INTO {table} ({', '.join(keys + _V4_MEASURES)}) "
+                    f"SELECT {sel}, count(*), coalesce(sum(s.quantity), 0), coalesce(sum(s.total), 0), coalesce(sum(s.profit), 0) "
+                    f"FROM sales s GROUP BY {', '.join(keys)}")
+    cur.execute(f'''UPDATE inventory_summary SET (item_count, total_stock, low_count) =
+                   (SELECT count(*), coalesce(sum(stock), 0), count(CASE WHEN coalesce(stock, 0) <= {_V4_LOW_STOCK} THEN 1 END) FROM items)
+                   WHERE id = 1''')
+
+
+# --- 5. COST OF GOODS (FIFO layers / running average, cost.py) ---
+def _v5_fold(item, qty, cost):
+    return f'''INSERT INTO item_costs (item_id, qty, avg_cost) VALUES ({item}, {qty}, {cost})
+        ON CONFLICT(item_id) DO UPDATE SET
+            avg_cost = CASE WHEN max(qty, 0) + excluded.qty > 0
+                            THEN (max(qty, 0) * avg_cost + excluded.qty * excluded.avg_cost) / (max(qty, 0) + excluded.qty)
+                            ELSE excluded.avg_cost END,
+            qty = max(qty, 0) + excluded.qty;'''
+
+@migration(5)
+def cost_of_goods(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS cost_layers (
+        id INTEGER PRIMARY KEY, item_id INTEGER NOT NULL, qty_left INTEGER NOT NULL, unit_cost REAL NOT NULL, date TEXT)''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cost_layers_open ON cost_layers(item_id, id) WHERE qty_left > 0")
+    cur.execute('''CREATE TABLE IF NOT EXISTS item_costs (
+        item_id INTEGER PRIMARY KEY, qty INTEGER NOT NULL DEFAULT 0, avg_cost REAL NOT NULL DEFAULT 0)''')
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS cost_purchases_ai AFTER INSERT ON purchases BEGIN
+        INSERT INTO cost_layers (item_id, qty_left, unit_cost, date) VALUES (NEW.item_id, NEW.quantity, coalesce(NEW.purchase_price, 0), NEW.date);
+        {_v5_fold("NEW.item_id", "NEW.quantity", "coalesce(NEW.purchase_price, 0)")}
+    END''')
+    cur.execute(f'''CREATE TRIGGER IF NOT EXISTS cost_items_ai AFTER INSERT ON items WHEN coalesce(NEW.stock, 0) > 0 BEGIN
+        INSERT INTO cost_layers (item_id, qty_left, unit_cost, date) VALUES (NEW.id, NEW.stock, coalesce(NEW.purchase_price, 0), date('now'));
+        {_v5_fold("NEW.id", "NEW.stock", "coalesce(NEW.purchase_price, 0)")}
+    END''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS cost_items_ad AFTER DELETE ON items BEGIN
+        DELETE FROM cost_layers WHERE item_id = OLD.id;
+        DELETE FROM item_costs WHERE item_id = OLD.id;
+    END''')
+    # Opening layer per item for the stock already on the shelf, at its current purchase_price
+    cur.execute('''INSERT INTO cost_layers (item_id, qty_left, unit_cost, date)
+                   SELECT id, stock, coalesce(purchase_price, 0), date('now') FROM items WHERE stock > 0''')
+    cur.execute('''INSERT OR REPLACE INTO item_costs (item_id, qty, avg_cost)
+                   SELECT id, max(coalesce(stock, 0), 0), coalesce(purchase_price, 0) FROM items''')
+
+
+# --- 6. REORDER FORECAST STATE (filled incrementally by forecast.update) ---
+@migration(6)
+def reorder_forecast(cur):
+    cur.execute("CREATE TABLE IF NOT EXISTS item_velocity (item_id INTEGER PRIMARY KEY, level REAL NOT NULL DEFAULT 0)")
+    cur.execute("CREATE TABLE IF NOT EXISTS season_index (season TEXT, month INTEGER, factor REAL NOT NULL, PRIMARY KEY (season, month)) WITHOUT ROWID")
+    cur.execute("CREATE TABLE IF NOT EXISTS forecast_state (id INTEGER PRIMARY KEY CHECK (id = 1), day TEXT)")
+    cur.execute("INSERT OR IGNORE INTO forecast_state (id, day) VALUES (1, NULL)")
+
+
+# --- 7. RECEIPT HEADERS (sales.receipt_id becomes an integer key into receipts) ---
+@migration(7)
+def receipt_headers(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS receipts (
+        id INTEGER PRIMARY KEY,
+        number TEXT NOT NULL UNIQUE,
+        terminal TEXT NOT NULL, seq INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        lines INTEGER NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+        kind TEXT NOT NULL DEFAULT 'sale' CHECK (kind IN ('sale', 'return')),
+        original INTEGER REFERENCES receipts(id),
+        UNIQUE (terminal, seq))''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts(date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_receipts_original ON receipts(original) WHERE original IS NOT NULL")
+    cur.execute("CREATE TABLE IF NOT EXISTS terminal_seq (terminal TEXT PRIMARY KEY, last INTEGER NOT NULL) WITHOUT ROWID")
+    # One header per old text receipt id, numbered in the order they were rung up; the old id
+    # stays the number so existing paper receipts can still be looked up
+    cur.execute('''INSERT INTO receipts (number, terminal, seq, date, lines, total)
+                   SELECT receipt_id, 'legacy', row_number() OVER (ORDER BY min(id)), min(date), count(*), coalesce(sum(total), 0)
+                   FROM sales WHERE receipt_id IS NOT NULL GROUP BY receipt_id''')
+    cur.execute("INSERT INTO terminal_seq (terminal, last) SELECT 'legacy', max(seq) FROM receipts WHERE terminal = 'legacy' HAVING count(*)")
+    cur.execute("ALTER TABLE sales ADD COLUMN receipt INTEGER REFERENCES receipts(id)")
+    cur.execute("UPDATE sales SET receipt = (SELECT id FROM receipts WHERE number = sales.receipt_id) WHERE receipt_id IS NOT NULL")
+    cur.execute("DROP INDEX IF EXISTS idx_sales_receipt")
+    cur.execute("ALTER TABLE sales DROP COLUMN receipt_id")
+    cur.execute("ALTER TABLE sales RENAME COLUMN receipt TO receipt_id")
+    cur.execute("CREATE INDEX idx_sales_receipt ON sales(receipt_id)")
+
+
+# --- 8. BARCODES (scan lane, scanner.py) ---
+@migration(8)
+def item_barcodes(cur):
+    cur.execute("ALTER TABLE items ADD COLUMN barcode TEXT")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_barcode ON items(barcode) WHERE barcode IS NOT NULL")
+
+
+# --- 9. PARKED SALES (cart.py) ---
+@migration(9)
+def parked_carts(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS parked_carts (
+                       id INTEGER PRIMARY KEY, terminal TEXT NOT NULL, parked TEXT NOT NULL, label TEXT,
+                       lines INTEGER NOT NULL, total REAL NOT NULL, cart TEXT NOT NULL)''')
+
+
+# --- 10. SALES HISTORY REGISTRY (history.py) ---
+@migration(10)
+def history_years(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS history_years (
+                       fy INTEGER PRIMARY KEY, file TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL,
+                       sales INTEGER NOT NULL, purchases INTEGER NOT NULL, archived TEXT NOT NULL)''')
+
+
+# --- 11. DROP PLANNER STATS TAKEN ON A FRESH DATABASE ---
+@migration(11)
+def forget_seed_stats(cur):
+    # Migration 2's ANALYZE ran on the three seed items, and those stats made the planner scan
+    # items for id lookups; DBManager.close()'s PRAGMA optimize gathers them again once it matters
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        cur.execute("DELETE FROM sqlite_stat1")
+
+
+# --- 12. LOW-STOCK COUNT AT READ TIME (summaries.inventory_totals) ---
+@migration(12)
+def inventory_low_at_read_time(cur):
+    # Migration 4 baked LOW_STOCK_LEVEL into the items triggers, so changing the setting left them
+    # counting against the old level; the count is now taken from idx_items_stock when read
+    for t in ("summary_items_ai", "summary_items_ad", "summary_items_au"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {t}")
+    cur.execute('''CREATE TRIGGER summary_items_ai AFTER INSERT ON items BEGIN
+        UPDATE inventory_summary SET item_count = item_count + 1, total_stock = total_stock + coalesce(NEW.stock, 0) WHERE id = 1;
+    END''')
+    cur.execute('''CREATE TRIGGER summary_items_ad AFTER DELETE ON items BEGIN
+        UPDATE inventory_summary SET item_count = item_count - 1, total_stock = total_stock - coalesce(OLD.stock, 0) WHERE id = 1;
+    END''')
+    cur.execute('''CREATE TRIGGER summary_items_au AFTER UPDATE OF stock ON items BEGIN
+        UPDATE inventory_summary SET total_stock = total_stock - coalesce(OLD.stock, 0) + coalesce(NEW.stock, 0) WHERE id = 1;
+    END''')
+    cur.execute("ALTER TABLE inventory_summary DROP COLUMN low_count")
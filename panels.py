@@ -1,11 +1,22 @@
 # FILE: panels.py
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import sqlite3
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import datetime
 import os
+import queue
+import threading
+import time
+from itertools import chain
 from config import *
-from components import ModernButton
+from components import ModernButton, Debouncer, VirtualTable, BusyIndicator
+import summaries
+import analytics
+import forecast
+from checkout import StockConflict, find_receipt, receipt_doc
+from scanner import BarcodeIndex, ScanDetector, scan_item
+from cart import Cart, park, parked, unpark
+import store
+from search import to_match_query
 
 # --- HELPER: CARD FRAME ---
 def create_card_frame(parent, padding=20):
@@ -14,34 +25,184 @@ def create_card_frame(parent, padding=20):
     card.config(highlightbackground="#cbd5e1", highlightthickness=1)
     return card
 
+# --- HELPER: CSV IMPORT ---
+def import_csv(panel, kind, done):
+    """Runs a bulk import (bulk_import.py) on a worker thread with a progress window; done() runs after"""
+    if getattr(panel.app.db, "remote", False):
+        return messagebox.showinfo("Import CSV", "This till is a store-server client; run bulk_import.py on the server.")
+    path = filedialog.askopenfilename(parent=panel, title=f"Import {kind} CSV", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    if not path: return
+    from bulk_import import BulkImporter, read_csv
+    top = tk.Toplevel(panel); top.title("Importing..."); top.configure(bg=COLOR_WHITE); top.transient(panel)
+    lbl = tk.Label(top, text="Reading file...", font=FONT_BOLD, bg=COLOR_WHITE, fg=COLOR_TEXT_MAIN, padx=40, pady=30)
+    lbl.pack()
+    updates = queue.SimpleQueue()  # ("progress", report) / ("done", report) / ("error", exc)
+
+    def work():
+        try:
+            importer = BulkImporter(panel.app.db, progress=lambda r: updates.put(("progress", r.ok)))
+            updates.put(("done", getattr(importer, f"import_{kind}")(read_csv(path))))
+        except Exception as e: updates.put(("error", e))
+        finally: panel.app.db.release()
+
+    def poll():
+        while True:
+            try: what, val = updates.get_nowait()
+            except queue.Empty: break
+            if what == "progress": lbl.config(text=f"{val:,} rows imported...")
+            else:
+                top.destroy(); done()
+                if what == "error": messagebox.showerror("Import Failed", str(val))
+                else: messagebox.showinfo("Import Finished", str(val))
+                return
+        panel.after(100, poll)
+
+    threading.Thread(target=work, name="csv-import", daemon=True).start()
+    poll()
+
+# --- HELPER: REORDER LIST ---
+REORDER_COLS = ("ID", "Item", "Stock", "Sold / Day", "Days Cover", "Order Qty")
+
+def reorder_table(parent, height=10):
+    tree = VirtualTable(parent, REORDER_COLS, height=height)
+    for c in REORDER_COLS:
+        tree.heading(c, text=c)
+        tree.column(c, width=240 if c == "Item" else 90, anchor="w" if c == "Item" else "center")
+    return tree
+
+def reorder_rows(rows):
+    """forecast.reorder_list rows -> table values"""
+    return [(iid, name, stock, f"{rate:.2f}", f"{cover:.1f}", qty) for iid, name, stock, _, rate, cover, qty in rows]
+
+# --- HELPER: RECEIPT LOOKUP (reprint / returns) ---
+class ReceiptDialog(tk.Toplevel):
+    COLS = ("Item", "Qty", "Price", "Total", "Returnable")
+
+    def __init__(self, panel, receipt):
+        super().__init__(panel, bg=COLOR_WHITE, padx=20, pady=20)
+        self.panel, self.app, self.r = panel, panel.app, receipt
+        self.title(f"Receipt #{receipt['number']}"); self.transient(panel)
+        kind = "Return" if receipt["kind"] == "return" else "Sale"
+        tk.Label(self, text=f"{kind} #{receipt['number']}  ·  {receipt['date']}  ·  Rs. {receipt['total']:,.0f}",
+                 font=FONT_BOLD, bg=COLOR_WHITE, fg=COLOR_TEXT_MAIN).pack(anchor="w", pady=(0, 10))
+        self.tree = ttk.Treeview(self, columns=self.COLS, show="headings", height=8)
+        for c in self.COLS:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=220 if c == "Item" else 80, anchor="w" if c == "Item" else "e")
+        for iid, name, qty, price, total, left in receipt["lines"]:
+            self.tree.insert("", "end", iid=str(iid), values=(name, qty, f"{price:,.0f}", f"{total:,.0f}", left))
+        self.tree.pack(fill="both", expand=True)
+        bar = tk.Frame(self, bg=COLOR_WHITE)
+        bar.pack(fill="x", pady=(10, 0))
+        ModernButton(bar, text="🖨 Reprint", command=self.reprint).pack(side="left")
+        if receipt["kind"] == "sale" and receipt["archived"]:
+            tk.Label(bar, text=f"Archived with FY{receipt['archived']}: returns on archived receipts are not supported",
+                     font=FONT_NORMAL, bg=COLOR_WHITE, fg=COLOR_TEXT_SEC).pack(side="left", padx=10)
+        elif receipt["kind"] == "sale" and any(l[5] for l in receipt["lines"]):
+            ModernButton(bar, text="↩ Return Selected", command=self.return_selected).pack(side="left", padx=10)
+            ModernButton(bar, text="↩ Return All", command=lambda: self.do_return(None)).pack(side="left")
+
+    def reprint(self):
+        doc = receipt_doc(self.r)
+        archive = getattr(self.app.spooler.sink, "archive", None)
+        text = archive.get(doc["id"]) if archive else None
+        if text: doc["text"] = text  # Exactly as first printed
+        try: self.app.spooler.submit(doc)
+        except queue.Full: return messagebox.showwarning("Receipt Printer", "The receipt queue is full.", parent=self)
+        self.panel.watch_spooler()
+
+    def return_selected(self):
+        sel = self.tree.selection()
+        if not sel: return
+        line = next(l for l in self.r["lines"] if str(l[0]) == sel[0])
+        if not line[5]: return messagebox.showinfo("Return", f"{line[1]} was already returned.", parent=self)
+        qty = simpledialog.askinteger("Return", f"Return how many {line[1]}?", parent=self, minvalue=1, maxvalue=line[5], initialvalue=line[5])
+        if qty: self.do_return({line[0]: qty})
+
+    def do_return(self, items):
+        try:
+            number, dt = self.app.checkout.refund(self.r["number"], items)
+        except Exception as e: return messagebox.showerror("Return", str(e), parent=self)
+        ret = find_receipt(self.app.db.reader, number)
+        if ret:
+            try: self.app.spooler.submit(receipt_doc(ret))
+            except queue.Full: pass
+        self.panel.status_lbl.config(text=f"↩ Return #{number} processed", fg=COLOR_TEXT_SEC)
+        self.panel.load_items(); self.panel.watch_spooler()
+        self.destroy()
+
+class ParkedDialog(tk.Toplevel):
+    """Picks one of several parked sales; resume(id) restores it"""
+    COLS = ("#", "Till", "Parked", "Lines", "Total", "Note")
+
+    def __init__(self, panel, rows, resume):
+        super().__init__(panel, bg=COLOR_WHITE, padx=20, pady=20)
+        self.resume = resume
+        self.title("Parked Sales"); self.transient(panel)
+        self.tree = ttk.Treeview(self, columns=self.COLS, show="headings", height=8)
+        for c in self.COLS:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=200 if c == "Note" else 70, anchor="w" if c == "Note" else "center")
+        for pid, terminal, when, label, lines, total in rows:
+            self.tree.insert("", "end", iid=str(pid), values=(pid, terminal, when, lines, f"{total:,.0f}", label or ""))
+        self.tree.pack(fill="both", expand=True)
+        self.tree.bind("<Double-1>", self.pick)
+        ModernButton(self, text="▶ Resume", command=self.pick).pack(anchor="e", pady=(10, 0))
+
+    def pick(self, e=None):
+        sel = self.tree.selection()
+        if not sel: return
+        self.destroy()
+        self.resume(int(sel[0]))
+
 # --- 1. DASHBOARD PANEL (Clean Version - No Quick Actions) ---
 class DashboardPanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
+        self.app = app
         
         # Main Layout
         content = tk.Frame(self, bg=COLOR_BG)
         content.pack(fill="both", expand=True, padx=30, pady=30)
         
         # Header
-        tk.Label(content, text="Dashboard Overview", font=FONT_HEADER, bg=COLOR_BG, fg=COLOR_TEXT_MAIN).pack(anchor="w", pady=(0, 20))
+        header = tk.Frame(content, bg=COLOR_BG)
+        header.pack(fill="x", pady=(0, 20))
+        tk.Label(header, text="Dashboard Overview", font=FONT_HEADER, bg=COLOR_BG, fg=COLOR_TEXT_MAIN).pack(side="left")
+        self.busy = BusyIndicator(header, bg=COLOR_BG)
+        self.busy.pack(side="right")
         
         # Stats Grid
         stats_frame = tk.Frame(content, bg=COLOR_BG)
         stats_frame.pack(fill="x", pady=(0, 30))
         
-        # Fetch Data
-        conn = sqlite3.connect(DB_NAME)
-        items = conn.execute("SELECT sum(stock) FROM items").fetchone()[0] or 0
-        today = datetime.date.today().strftime("%Y-%m-%d")
-        sales = conn.execute("SELECT sum(total) FROM sales WHERE date LIKE ?", (f"{today}%",)).fetchone()[0] or 0.0
-        low = conn.execute("SELECT count(*) FROM items WHERE stock <= 5").fetchone()[0]
-        conn.close()
-        
-        # Create 3 Cards
-        self.create_stat_card(stats_frame, "📦 Total Inventory", f"{items} Items", COLOR_ACCENT)
-        self.create_stat_card(stats_frame, "💰 Today's Revenue", f"Rs. {sales:,.0f}", COLOR_SUCCESS)
-        self.create_stat_card(stats_frame, "⚠️ Low Stock Alerts", f"{low} Items", COLOR_DANGER)
+        # Create 3 Cards (values filled in when the background query returns)
+        self.items_lbl = self.create_stat_card(stats_frame, "📦 Total Inventory", "…", COLOR_ACCENT)
+        self.sales_lbl = self.create_stat_card(stats_frame, "💰 Today's Revenue", "…", COLOR_SUCCESS)
+        self.low_lbl = self.create_stat_card(stats_frame, "⚠️ Reorder Alerts", "…", COLOR_DANGER)
+        
+        # Reorder list: items whose stock runs out before a new order could arrive (forecast.py)
+        card = create_card_frame(content)
+        card.pack(fill="both", expand=True)
+        tk.Label(card, text="🔁 Reorder Now", font=FONT_TITLE, bg=COLOR_WHITE, fg=COLOR_TEXT_MAIN).pack(anchor="w", pady=(0, 10))
+        self.reorder = reorder_table(card)
+        self.reorder.pack(fill="both", expand=True)
+        self.load_stats()
+
+    def refresh(self):
+        self.load_stats()
+
+    def load_stats(self):
+        def work(conn):  # Read-only: the forecast timer (main.py / server.py) folds in finished days
+            return summaries.dashboard_totals(conn), forecast.reorder_list(conn)
+        self.app.queries.submit((self, "stats"), work, self.show_stats, busy=self.busy.set)
+
+    def show_stats(self, res):
+        (items, sales, _), reorder = res
+        self.items_lbl.config(text=f"{items} Items")
+        self.sales_lbl.config(text=f"Rs. {sales:,.0f}")
+        self.low_lbl.config(text=f"{len(reorder)} Items")
+        self.reorder.load(reorder_rows(reorder[:REORDER_LIST_SIZE]))
 
     def create_stat_card(self, parent, title, val, color):
         card = create_card_frame(parent, padding=25)
@@ -55,15 +216,18 @@ class DashboardPanel(tk.Frame):
         info_frame.pack(side="left")
         
         tk.Label(info_frame, text=title, bg=COLOR_WHITE, fg=COLOR_TEXT_SEC, font=("Helvetica", 11)).pack(anchor="w")
-        tk.Label(info_frame, text=val, bg=COLOR_WHITE, font=("Helvetica", 22, "bold"), fg=COLOR_TEXT_MAIN).pack(anchor="w", pady=(5, 0))
+        lbl = tk.Label(info_frame, text=val, bg=COLOR_WHITE, font=("Helvetica", 22, "bold"), fg=COLOR_TEXT_MAIN)
+        lbl.pack(anchor="w", pady=(5, 0))
+        return lbl
 
 
 # --- 2. SALES PANEL ---
 class SalesPanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
-        self.cart = []
+        self.cart = Cart()
         self.app = app 
+        self._paying = False  # A checkout commit is running on the query executor
         
         split = tk.Frame(self, bg=COLOR_BG)
         split.pack(fill="both", expand=True)
@@ -73,7 +237,11 @@ class SalesPanel(tk.Frame):
         left_frame.pack(side="left", fill="both", expand=True, padx=(0, 20))
         left_frame.config(highlightbackground="#cbd5e1", highlightthickness=1)
         
-        tk.Label(left_frame, text="Product Catalog", font=("Helvetica", 16, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_WHITE).pack(anchor="w", pady=(0, 15))
+        catalog_header = tk.Frame(left_frame, bg=COLOR_WHITE)
+        catalog_header.pack(fill="x", pady=(0, 15))
+        tk.Label(catalog_header, text="Product Catalog", font=("Helvetica", 16, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_WHITE).pack(side="left")
+        self.busy = BusyIndicator(catalog_header, bg=COLOR_WHITE)
+        self.busy.pack(side="right")
         
         # Search
         search_box = tk.Frame(left_frame, bg="#f1f5f9", padx=10, pady=5, bd=0)
@@ -81,11 +249,12 @@ class SalesPanel(tk.Frame):
         tk.Label(search_box, text="🔍", bg="#f1f5f9").pack(side="left")
         self.search = tk.Entry(search_box, font=("Helvetica", 12), bg="#f1f5f9", bd=0)
         self.search.pack(side="left", fill="x", expand=True, padx=10)
-        self.search.bind("<KeyRelease>", self.load_items)
+        self.search.bind("<KeyRelease>", Debouncer(self, SEARCH_DEBOUNCE_MS, self.load_items))
+        self.search.bind("<KeyPress>", lambda e: self.app.telemetry.start("search_paint"), add="+")
         
         # Table
         cols = ("ID", "Product Name", "Stock", "Price")
-        self.tree = ttk.Treeview(left_frame, columns=cols, show="headings", height=18)
+        self.tree = VirtualTable(left_frame, cols, fmt=lambda r: (r[0], r[1], r[6] - self.cart.reserved(r[0]), f"{r[5]:,.0f}"), height=18)
         self.tree.column("ID", width=60, anchor="center")
         self.tree.column("Product Name", width=280, anchor="w")
         self.tree.column("Stock", width=80, anchor="center")
@@ -93,7 +262,6 @@ class SalesPanel(tk.Frame):
         for c in cols: self.tree.heading(c, text=c)
         self.tree.pack(fill="both", expand=True)
         self.tree.bind("<Double-1>", self.add_to_cart)
-        self.tree.tag_configure('odd', background='#f8fafc'); self.tree.tag_configure('even', background='#ffffff')
         
         tk.Label(left_frame, text="Double click item to add to bill", font=("Helvetica", 9), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(pady=5)
 
@@ -103,12 +271,28 @@ class SalesPanel(tk.Frame):
         right_frame.config(highlightbackground="#cbd5e1", highlightthickness=1)
         
         tk.Label(right_frame, text="Current Order", font=("Helvetica", 16, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_WHITE).pack(anchor="w", pady=(0, 15))
+
+        # Scan lane: barcode scanner or typed SKU straight into the cart, no dialog
+        scan_box = tk.Frame(right_frame, bg="#ecfdf5", padx=10, pady=5)
+        scan_box.pack(fill="x")
+        tk.Label(scan_box, text="▦ Scan", font=FONT_BOLD, fg=COLOR_SUCCESS, bg="#ecfdf5").pack(side="left")
+        self.scan = tk.Entry(scan_box, font=("Helvetica", 12), bg="#ecfdf5", bd=0)
+        self.scan.pack(side="left", fill="x", expand=True, padx=10)
+        tk.Label(right_frame, text="Barcode or SKU + Enter  ·  3*code adds 3  ·  + / − last line  ·  Del removes it",
+                 font=("Helvetica", 8), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(anchor="w", pady=(2, 10))
+        self.codes, self.detector = BarcodeIndex(), ScanDetector()
+        self._scan_end = None
+        self.scan.bind("<Key>", self.scan_key)
+        for seq in ("<Return>", "<KP_Enter>"): self.scan.bind(seq, self.scan_submit)
+        for seq, step in (("<plus>", 1), ("<KP_Add>", 1), ("<minus>", -1), ("<KP_Subtract>", -1)):
+            self.scan.bind(seq, lambda e, step=step: self.bump(step))
+        self.scan.bind("<Delete>", self.drop_last)
         
         # Cart Buttons (At Bottom)
         btn_grid = tk.Frame(right_frame, bg=COLOR_WHITE)
         btn_grid.pack(side="bottom", fill="x", pady=10)
         
-        chk_btn = tk.Button(btn_grid, text="✅  CONFIRM & PRINT", font=("Helvetica", 11, "bold"), 
+        self.chk_btn = chk_btn = tk.Button(btn_grid, text="✅  CONFIRM & PRINT", font=("Helvetica", 11, "bold"), 
                             bg=COLOR_ACCENT, fg=COLOR_WHITE, relief="flat", pady=12, cursor="hand2", 
                             activebackground=COLOR_ACCENT_HOVER, command=self.checkout)
         chk_btn.pack(fill="x", side="bottom")
@@ -117,6 +301,17 @@ class SalesPanel(tk.Frame):
                             bg="#fee2e2", fg="#dc2626", relief="flat", pady=10, cursor="hand2", 
                             activebackground="#fca5a5", command=self.clear_cart)
         clr_btn.pack(fill="x", side="bottom", pady=(0, 10))
+
+        park_row = tk.Frame(btn_grid, bg=COLOR_WHITE)
+        park_row.pack(fill="x", side="bottom", pady=(0, 10))
+        for text, cmd, pad in (("⏸  PARK SALE", self.park_sale, (0, 5)), ("▶  RESUME", self.resume_sale, (5, 0))):
+            tk.Button(park_row, text=text, font=("Helvetica", 10, "bold"), bg="#f1f5f9", fg=COLOR_TEXT_MAIN, relief="flat", pady=10,
+                      cursor="hand2", activebackground="#e2e8f0", command=cmd).pack(side="left", fill="x", expand=True, padx=pad)
+
+        rcpt_btn = tk.Button(btn_grid, text="🧾  RECEIPTS / RETURNS", font=("Helvetica", 10, "bold"),
+                             bg="#f1f5f9", fg=COLOR_TEXT_MAIN, relief="flat", pady=10, cursor="hand2",
+                             activebackground="#e2e8f0", command=self.open_receipt)
+        rcpt_btn.pack(fill="x", side="bottom", pady=(0, 10))
         
         # Total Box
         total_box = tk.Frame(right_frame, bg="#f8fafc", padx=15, pady=15)
@@ -124,82 +319,212 @@ class SalesPanel(tk.Frame):
         self.total_lbl = tk.Label(total_box, text="Rs. 0", font=("Helvetica", 24, "bold"), fg=COLOR_SUCCESS, bg="#f8fafc")
         self.total_lbl.pack(anchor="e")
         tk.Label(total_box, text="Grand Total", font=("Helvetica", 10), fg=COLOR_TEXT_SEC, bg="#f8fafc").pack(anchor="e")
+        self.status_lbl = tk.Label(total_box, text="", font=("Helvetica", 9), fg=COLOR_TEXT_SEC, bg="#f8fafc")
+        self.status_lbl.pack(anchor="w")
         
         # Cart Table (Remaining Space)
         cart_cols = ("Item", "Qty", "Total")
-        self.cart_tree = ttk.Treeview(right_frame, columns=cart_cols, show="headings")
+        self.cart_tree = VirtualTable(right_frame, cart_cols, fmt=lambda r: r[1:])
         self.cart_tree.column("Item", width=140, anchor="w")
         self.cart_tree.column("Qty", width=50, anchor="center")
         self.cart_tree.column("Total", width=80, anchor="e")
         for c in cart_cols: self.cart_tree.heading(c, text=c)
         self.cart_tree.pack(side="top", fill="both", expand=True)
+        self.cart.subscribe(self.cart_changed)
+        self._catalog = {}  # item id -> catalog row on screen, to redraw its available stock
 
         self.load_items()
+        self.load_codes()
+        self.scan.focus_set()
+
+    def refresh(self):
+        """Cart is kept; the catalog and barcode index reload only if the data changed"""
+        token = self.app.db.data_token()
+        if self._seen != token: self.load_items()
+        if self.codes.stale(token): self.load_codes()
+        self.scan.focus_set()
+
+    # --- SCAN LANE ---
+    def load_codes(self):
+        token = self.app.db.data_token()
+        self.app.queries.submit((self, "codes"), BarcodeIndex.build, lambda codes: self.codes.swap(codes, token))
+
+    def scan_key(self, e):
+        """Times each keystroke; a scanner burst without an Enter suffix is submitted after SCAN_END_MS"""
+        if not e.char or not e.char.isprintable(): return
+        self.detector.key(e.time)
+        if self.detector.burst():
+            if self._scan_end: self.after_cancel(self._scan_end)
+            self._scan_end = self.after(SCAN_END_MS, self.scan_submit)
+
+    def scan_submit(self, e=None):
+        if self._scan_end: self.after_cancel(self._scan_end); self._scan_end = None
+        t = time.perf_counter()
+        text = self.scan.get()
+        self.scan.delete(0, "end"); self.detector.reset()
+        if not text.strip(): return "break"
+        try: qty, item = scan_item(self.codes, self.app.db.reader, text)
+        except ValueError:
+            self.bell()
+            self.status_lbl.config(text=f"⚠ Invalid quantity: {text.strip()}", fg=COLOR_DANGER)
+            return "break"
+        if item is None:  # The cart is left as it was
+            self.bell()
+            self.status_lbl.config(text=f"⚠ Unknown barcode / SKU {text.strip()}", fg=COLOR_DANGER)
+            return "break"
+        self.add_line(*item, qty=qty)
+        self.app.telemetry.record("scan_to_cart", (time.perf_counter() - t) * 1000)
+        return "break"
+
+    def add_line(self, iid, name, price, stock, qty=1):
+        """Adds qty of an item, merging into its existing cart line"""
+        if self.paying(): return
+        line = self.cart.add(iid, name, price, qty, stock or 0)
+        if line.qty > line.stock: self.status_lbl.config(text=f"⚠ {name}: only {stock} in stock", fg=COLOR_DANGER)
+        else: self.status_lbl.config(text=f"＋ {qty} × {name}", fg=COLOR_TEXT_SEC)
+
+    def bump(self, step):
+        """+ / − on an empty scan field: change the last scanned line's quantity"""
+        if self.scan.get(): return  # Part of a code being typed
+        if self.paying(): return "break"
+        line = self.cart.lines.get(self.cart.last)
+        if line is not None: self.cart.set_qty(line.item_id, line.qty + step)
+        return "break"
+
+    def drop_last(self, e=None):
+        if self.scan.get() or not self.cart: return
+        if self.paying(): return "break"
+        self.cart.remove(self.cart.last if self.cart.last in self.cart.lines else next(reversed(self.cart.lines)))
+        return "break"
 
     def load_items(self, e=None):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        q = f"%{self.search.get()}%"
-        conn = sqlite3.connect(DB_NAME)
-        rows = conn.execute("SELECT id, name, stock, sale_price FROM items WHERE name LIKE ? AND stock > 0", (q,)).fetchall()
-        for i, r in enumerate(rows):
-            tag = 'even' if i % 2 == 0 else 'odd'
-            self.tree.insert("", "end", values=(r[0], r[1], r[2], f"{r[3]:,.0f}"), tags=(tag,))
-        conn.close()
+        self._seen = self.app.db.data_token()
+        text = self.search.get()
+        self.app.queries.submit((self, "catalog"), lambda conn: list(self.app.search.search(text, in_stock=True, conn=conn)),
+                                self.show_items, busy=self.busy.set)
+
+    def show_items(self, rows):
+        self._catalog = {r[0]: r for r in rows}
+        self.tree.load(rows)
+        self.app.telemetry.painted("search_paint")
 
     def add_to_cart(self, e):
         sel = self.tree.selection()
-        if not sel: return
+        if not sel or self.paying(): return
+        self.app.telemetry.start("qty_prompt", until="dialog")
         val = self.tree.item(sel[0])['values']
-        conn = sqlite3.connect(DB_NAME)
-        item = conn.execute("SELECT id, name, stock, sale_price FROM items WHERE id=?", (val[0],)).fetchone()
-        conn.close()
-        
-        qty = simpledialog.askinteger("Qty", f"Add {item[1]} (Stock: {item[2]})", minvalue=1, maxvalue=item[2])
-        if qty:
-            total = qty * item[3]
-            self.cart.append({"id": item[0], "name": item[1], "qty": qty, "price": item[3], "total": total})
-            self.update_cart()
-
-    def update_cart(self):
-        for i in self.cart_tree.get_children(): self.cart_tree.delete(i)
-        gt = 0
-        for c in self.cart:
-            self.cart_tree.insert("", "end", values=(c['name'], c['qty'], f"{c['total']:,.0f}"))
-            gt += c['total']
-        self.total_lbl.config(text=f"Rs. {gt:,.0f}")
+        item = store.item(self.app.db.reader, val[0])
+        if item is None:  # Deleted (here or on another till) since the list was loaded
+            self.load_items()
+            return messagebox.showwarning("Not Found", f"{val[1]} is no longer in the inventory")
+        free = item[2] - self.cart.reserved(item[0])
+        if free <= 0: return messagebox.showwarning("Stock", f"All {item[2]} of {item[1]} are already in the cart")
+        
+        qty = simpledialog.askinteger("Qty", f"Add {item[1]} (Available: {free})", minvalue=1, maxvalue=free)
+        if qty: self.cart.add(item[0], item[1], item[3], qty, item[2])
+
+    def cart_changed(self, event, line):
+        """Cart event -> redraw just that cart row, the total and the item's available stock"""
+        if event == "clear": self.cart_tree.clear()
+        elif event == "remove": self.cart_tree.remove_row(line.item_id)
+        else: self.cart_tree.upsert_row(line.row())
+        for l in line if event == "clear" else (line,):
+            r = self._catalog.get(l.item_id)
+            if r is not None: self.tree.refresh_row(r)
+        self.total_lbl.config(text=f"Rs. {self.cart.total:,.0f}")
 
     def clear_cart(self):
-        self.cart = []
-        self.update_cart()
+        if not self.paying(): self.cart.clear()
+
+    def paying(self):
+        """True (and says so) while a payment is being committed; the cart must not change under it"""
+        if self._paying: self.status_lbl.config(text="⏳ Payment in progress…", fg=COLOR_TEXT_SEC)
+        return self._paying
+
+    # --- PARKED SALES ---
+    def park_sale(self):
+        if self.paying(): return
+        if not self.cart: return messagebox.showwarning("Park Sale", "Cart is empty")
+        label = simpledialog.askstring("Park Sale", "Customer / note (optional):", parent=self)
+        if label is None: return
+        pid = park(self.app.db, self.cart, label.strip(), getattr(self.app.checkout, "terminal", TERMINAL_ID))
+        self.clear_cart()
+        self.status_lbl.config(text=f"⏸ Sale parked as #{pid}", fg=COLOR_TEXT_SEC)
+
+    def resume_sale(self):
+        if self.paying(): return
+        if self.cart: return messagebox.showwarning("Resume Sale", "Park or clear the current sale first")
+        rows = parked(self.app.db.reader)
+        if not rows: return messagebox.showinfo("Resume Sale", "No parked sales")
+        if len(rows) == 1: return self.resume(rows[0][0])
+        ParkedDialog(self, rows, self.resume)
+
+    def resume(self, pid):
+        data = unpark(self.app.db, pid)
+        if data is None: return messagebox.showwarning("Resume Sale", f"Parked sale #{pid} was already resumed")
+        self.cart.load_json(data)
+        short = self.cart.short()
+        if short: self.status_lbl.config(text="⚠ Check stock: " + ", ".join(l.name for l in short), fg=COLOR_DANGER)
+        else: self.status_lbl.config(text=f"▶ Parked sale #{pid} resumed", fg=COLOR_TEXT_SEC)
 
     def checkout(self):
+        if self.paying(): return
         if not self.cart: return messagebox.showwarning("Error", "Cart is empty")
-        conn = sqlite3.connect(DB_NAME)
-        rid = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        dt = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        # Commit on the query executor: a busy database (retries, busy timeout) must not freeze the till
+        lines = self.cart.checkout_lines()
+        self._paying = True
+        self.chk_btn.config(state="disabled")
+        self.status_lbl.config(text="⏳ Processing payment…", fg=COLOR_TEXT_SEC)
+        self.app.queries.submit((self, "checkout"), lambda conn: self.app.checkout.commit(lines), self.paid, self.pay_failed)
+
+    def pay_done(self):
+        self._paying = False
+        self.chk_btn.config(state="normal")
+
+    def pay_failed(self, e):
+        self.pay_done()
+        self.status_lbl.config(text="")
+        if isinstance(e, StockConflict):
+            messagebox.showerror("Stock Changed", f"Not enough stock, nothing was charged:\n\n{e}"); self.load_items()
+        else: messagebox.showerror("Error", str(e))
+
+    def paid(self, res):
+        rid, dt = res
+        self.pay_done()
+        # Sale is committed: hand the receipt to the spooler and free the till immediately
+        receipt = {"id": rid, "date": dt, "total": self.cart.total, "lines": [(l.name, l.qty, l.total) for l in self.cart]}
+        self.clear_cart(); self.load_items()
+        if self.codes.due(): self.load_codes()  # Keep prices / names in the scan index fresh while selling
         try:
-            for c in self.cart:
-                conn.execute("UPDATE items SET stock=stock-? WHERE id=?", (c['qty'], c['id']))
-                conn.execute("INSERT INTO sales (receipt_id, item_id, quantity, sale_price, profit, total, date) VALUES (?,?,?,?,?,?,?)",
-                             (rid, c['id'], c['qty'], c['price'], 0, c['total'], dt))
-            conn.commit()
-            
-            if not os.path.exists(RECEIPT_DIR): os.makedirs(RECEIPT_DIR)
-            path = os.path.abspath(f"{RECEIPT_DIR}/{rid}.txt")
-            with open(path, "w") as f:
-                f.write(f"DOLMEN CLOTHES\nReceipt #{rid}\nDate: {dt}\n{'-'*30}\n")
-                for c in self.cart: f.write(f"{c['name']} x{c['qty']} = {c['total']:,.0f}\n")
-                f.write(f"{'-'*30}\nTOTAL: {self.total_lbl.cget('text')}\nThank you!")
-            os.startfile(path)
-            self.clear_cart(); self.load_items(); messagebox.showinfo("Success", "Order Processed!")
-        except Exception as e: messagebox.showerror("Error", str(e))
-        finally: conn.close()
+            self.app.spooler.submit(receipt)
+            self.status_lbl.config(text=f"✔ Order #{rid} processed", fg=COLOR_TEXT_SEC)
+        except queue.Full:
+            messagebox.showwarning("Receipt Printer", f"Order #{rid} saved, but the receipt queue is full.")
+        self.watch_spooler()
+
+    def open_receipt(self):
+        number = simpledialog.askstring("Receipt", "Receipt number:", parent=self)
+        if not number: return
+        r = find_receipt(self.app.db.reader, number.strip().lstrip("#"))
+        if r is None: return messagebox.showwarning("Receipt", f"No receipt #{number}")
+        ReceiptDialog(self, r)
+
+    def watch_spooler(self):
+        """Shows the receipt backlog until it drains"""
+        n = self.app.spooler.depth()
+        if n:
+            self.status_lbl.config(text=f"🖨 {n} receipt(s) printing...", fg=COLOR_TEXT_SEC)
+            self.after(500, self.watch_spooler)
+        elif self.app.spooler.errors:
+            rid, err = self.app.spooler.errors.pop()
+            self.status_lbl.config(text=f"⚠ Receipt #{rid} not printed: {err}", fg=COLOR_DANGER)
 
 
 # --- 3. INVENTORY PANEL ---
 class InventoryPanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
+        self.app = app
         
         main_card = create_card_frame(self)
         main_card.pack(fill="both", expand=True, padx=30, pady=30)
@@ -209,18 +534,23 @@ class InventoryPanel(tk.Frame):
         header.pack(fill="x", pady=(0, 20))
         tk.Label(header, text="Inventory Management", font=("Helvetica", 18, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_WHITE).pack(side="left")
         ModernButton(header, text="➕ Add New Item", bg=COLOR_SUCCESS, command=self.add_item).pack(side="right")
+        ModernButton(header, text="📥 Import CSV", command=lambda: import_csv(self, "items", self.load_data)).pack(side="right", padx=(0, 10))
+        self.busy = BusyIndicator(header, bg=COLOR_WHITE)
+        self.busy.pack(side="right", padx=20)
         
         # Search
         search_box = tk.Frame(main_card, bg="#f1f5f9", padx=10, pady=5)
         search_box.pack(fill="x", pady=(0, 15))
         tk.Label(search_box, text="Search Item:", bg="#f1f5f9", font=("Helvetica", 10, "bold")).pack(side="left", padx=(0,10))
         self.search_var = tk.StringVar()
-        self.search_var.trace("w", self.load_data)
-        tk.Entry(search_box, textvariable=self.search_var, font=("Helvetica", 11), bg="white", relief="flat").pack(side="left", fill="x", expand=True)
+        self.search_var.trace("w", Debouncer(self, SEARCH_DEBOUNCE_MS, self.load_data))
+        entry = tk.Entry(search_box, textvariable=self.search_var, font=("Helvetica", 11), bg="white", relief="flat")
+        entry.pack(side="left", fill="x", expand=True)
+        entry.bind("<KeyPress>", lambda e: self.app.telemetry.start("search_paint"))
         
         # Table
         cols = ("ID", "Name", "Category", "Season", "Cost", "Price", "Stock")
-        self.tree = ttk.Treeview(main_card, columns=cols, show="headings", height=15)
+        self.tree = VirtualTable(main_card, cols, height=15)
         
         self.tree.column("ID", width=50, anchor="center")
         self.tree.column("Name", width=200, anchor="w")
@@ -232,7 +562,6 @@ class InventoryPanel(tk.Frame):
         
         for c in cols: self.tree.heading(c, text=c)
         self.tree.pack(fill="both", expand=True)
-        self.tree.tag_configure('odd', background='#f8fafc'); self.tree.tag_configure('even', background='#ffffff')
         
         # Actions
         btn_frame = tk.Frame(main_card, bg=COLOR_WHITE)
@@ -242,15 +571,25 @@ class InventoryPanel(tk.Frame):
         
         self.load_data()
 
+    def refresh(self):
+        if self._seen != self.app.db.data_token(): self.load_data()
+
     def load_data(self, *args):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        q = f"%{self.search_var.get()}%"
-        conn = sqlite3.connect(DB_NAME)
-        rows = conn.execute("SELECT * FROM items WHERE name LIKE ? ORDER BY id DESC", (q,)).fetchall()
-        for i, r in enumerate(rows):
-            tag = 'even' if i % 2 == 0 else 'odd'
-            self.tree.insert("", "end", values=r, tags=(tag,))
-        conn.close()
+        self._seen = self.app.db.data_token()
+        text = self.search_var.get()
+        if not to_match_query(text):  # Blank: the whole inventory, no SEARCH_LIMIT cap
+            return self.app.queries.submit((self, "inventory"), store.items_page, self.show_all, busy=self.busy.set)
+        self.app.queries.submit((self, "inventory"), lambda conn: list(self.app.search.search(text, conn=conn)),
+                                self.show_items, busy=self.busy.set)
+
+    def show_all(self, first):
+        """First page from the worker; the table pulls the rest by keyset as the user scrolls"""
+        rest = store.all_items(self.app.db.reader, first[-1][0]) if len(first) == TABLE_PAGE_SIZE else ()
+        self.show_items(chain(first, rest))
+
+    def show_items(self, rows):
+        self.tree.load(rows)
+        self.app.telemetry.painted("search_paint")
 
     def add_item(self): self.popup("Add Item")
     def edit_item(self):
@@ -260,19 +599,19 @@ class InventoryPanel(tk.Frame):
         sel = self.tree.selection()
         if sel and messagebox.askyesno("Confirm", "Delete this item?"):
             iid = self.tree.item(sel[0])['values'][0]
-            conn = sqlite3.connect(DB_NAME)
-            conn.execute("DELETE FROM items WHERE id=?", (iid,)); conn.commit(); conn.close()
+            store.delete_item(self.app.db, iid)
             self.load_data()
 
     def popup(self, title, data=None):
         top = tk.Toplevel(self)
         top.title(title)
-        top.geometry("400x500")
+        top.geometry("400x570")
         top.configure(bg=COLOR_WHITE)
         
         tk.Label(top, text=title, font=("Helvetica", 16, "bold"), bg=COLOR_WHITE, fg=COLOR_SIDEBAR).pack(pady=20)
         
-        fields = ["Name", "Category", "Season", "Purchase Price", "Sale Price", "Stock"]
+        fields = ["Name", "Category", "Season", "Purchase Price", "Sale Price", "Stock", "Barcode"]
+        if data: data = list(data[:7]) + [store.item_barcode(self.app.db.reader, data[0]) or ""]
         entries = {}
         
         for f in fields:
@@ -293,12 +632,11 @@ class InventoryPanel(tk.Frame):
         def save():
             try:
                 v = [entries[f].get() for f in fields]
-                v[3], v[4], v[5] = float(v[3]), float(v[4]), int(v[5])
-                conn = sqlite3.connect(DB_NAME)
-                if data: conn.execute("UPDATE items SET name=?, category=?, season=?, purchase_price=?, sale_price=?, stock=? WHERE id=?", v + [data[0]])
-                else: conn.execute("INSERT INTO items (name, category, season, purchase_price, sale_price, stock) VALUES (?,?,?,?,?,?)", v)
-                conn.commit(); conn.close(); self.load_data(); top.destroy()
-            except: messagebox.showerror("Error", "Invalid inputs")
+                v[3], v[4], v[5], v[6] = float(v[3]), float(v[4]), int(v[5]), v[6].strip() or None
+            except: return messagebox.showerror("Error", "Invalid inputs")
+            try: store.save_item(self.app.db, data[0] if data else None, *v)
+            except Exception as e: return messagebox.showerror("Error", str(e), parent=top)  # Barcode taken, server unreachable
+            self.load_data(); top.destroy()
         
         ModernButton(top, text="SAVE ITEM", command=save).pack(fill="x", padx=30, pady=30)
 
@@ -307,12 +645,26 @@ class InventoryPanel(tk.Frame):
 class PurchasePanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
+        self.app = app
         
         wrapper = tk.Frame(self, bg=COLOR_BG)
         wrapper.pack(expand=True, fill="both")
         
         card = create_card_frame(wrapper, padding=40)
-        card.place(relx=0.5, rely=0.5, anchor="center", width=500)
+        card.place(relx=0.03, rely=0.5, anchor="w", relwidth=0.4)
+        
+        # Suggested orders (forecast.py); clicking one fills in the form
+        side = create_card_frame(wrapper)
+        side.place(relx=0.97, rely=0.5, anchor="e", relwidth=0.53, relheight=0.85)
+        head = tk.Frame(side, bg=COLOR_WHITE)
+        head.pack(fill="x", pady=(0, 10))
+        tk.Label(head, text="🔁 Reorder Suggestions", font=FONT_TITLE, bg=COLOR_WHITE, fg=COLOR_TEXT_MAIN).pack(side="left")
+        self.busy = BusyIndicator(head, bg=COLOR_WHITE)
+        self.busy.pack(side="right")
+        self.reorder = reorder_table(side, height=15)
+        self.reorder.pack(fill="both", expand=True)
+        self.reorder.bind("<<TreeviewSelect>>", self.pick)
+        self.suggested = {}
         
         tk.Label(card, text="📦 Stock Entry", font=("Helvetica", 20, "bold"), bg=COLOR_WHITE, fg=COLOR_SIDEBAR).pack(pady=(0, 30))
         
@@ -329,6 +681,8 @@ class PurchasePanel(tk.Frame):
         self.cost.pack(fill="x", ipady=8, pady=(0, 25))
         
         ModernButton(card, text="UPDATE STOCK", command=self.save).pack(fill="x", ipady=5)
+        ModernButton(card, text="📥 IMPORT SHIPMENT CSV", bg=COLOR_SIDEBAR,
+                     command=lambda: import_csv(self, "purchases", self.load_items)).pack(fill="x", ipady=5, pady=(10, 0))
         
         self.items_map = {}
         self.load_items()
@@ -336,23 +690,39 @@ class PurchasePanel(tk.Frame):
     def create_label(self, p, t):
         tk.Label(p, text=t, font=("Helvetica", 9, "bold"), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(anchor="w", pady=(0, 5))
 
+    def refresh(self):
+        if self._seen != self.app.db.data_token(): self.load_items()
+
     def load_items(self):
-        conn = sqlite3.connect(DB_NAME)
-        for r in conn.execute("SELECT id, name, purchase_price FROM items"):
-            self.items_map[f"{r[1]} (Cost: {r[2]})"] = r[0]
-        conn.close()
+        self._seen = self.app.db.data_token()
+        self.app.queries.submit((self, "items"), store.stock_items, self.show_items, busy=self.busy.set)
+        self.app.queries.submit((self, "reorder"), lambda conn: forecast.reorder_list(conn, limit=REORDER_LIST_SIZE),
+                                self.show_reorder, busy=self.busy.set)
+
+    def show_items(self, rows):
+        self.items_map = {f"{r[1]} (Cost: {r[2]})": r[0] for r in rows}
         self.item_combo['values'] = list(self.items_map.keys())
 
+    def show_reorder(self, rows):
+        self.suggested = {str(r[0]): r for r in rows}
+        self.reorder.load(reorder_rows(rows))
+
+    def pick(self, e=None):
+        sel = self.reorder.selection()
+        if not sel or sel[0] not in self.suggested: return
+        iid, _, _, cost, _, _, qty = self.suggested[sel[0]]
+        label = next((k for k, v in self.items_map.items() if v == iid), None)
+        if label is None: return
+        self.item_combo.set(label)
+        for entry, val in ((self.qty, qty), (self.cost, cost)):
+            entry.delete(0, 'end'); entry.insert(0, val)
+
     def save(self):
         try:
             item_id = self.items_map[self.item_combo.get()]
             q = int(self.qty.get())
             c = float(self.cost.get())
-            conn = sqlite3.connect(DB_NAME)
-            conn.execute("UPDATE items SET stock=stock+?, purchase_price=? WHERE id=?", (q, c, item_id))
-            conn.execute("INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)",
-                        (item_id, q, c, datetime.datetime.now().strftime("%Y-%m-%d")))
-            conn.commit(); conn.close()
+            store.receive_stock(self.app.db, item_id, q, c, datetime.datetime.now().strftime("%Y-%m-%d"))
             messagebox.showinfo("Success", "Stock Added"); self.load_items()
         except: messagebox.showerror("Error", "Invalid Data")
 
@@ -361,6 +731,8 @@ class PurchasePanel(tk.Frame):
 class ReportsPanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
+        self.app = app
+        self.analytics = analytics.Analytics() if analytics.available() else None
         
         main_card = create_card_frame(self, padding=30)
         main_card.pack(fill="both", expand=True, padx=30, pady=30)
@@ -370,38 +742,129 @@ class ReportsPanel(tk.Frame):
         filter_frame = tk.Frame(main_card, bg=COLOR_WHITE)
         filter_frame.pack(fill="x", pady=20)
         
-        ModernButton(filter_frame, text="Today's Report", command=lambda: self.gen('day')).pack(side="left", padx=(0, 10))
+        ModernButton(filter_frame, text="Today's Report", command=lambda: self.gen('today')).pack(side="left", padx=(0, 10))
         ModernButton(filter_frame, text="Monthly Report", command=lambda: self.gen('month')).pack(side="left", padx=10)
-        
-        self.text = tk.Text(main_card, font=("Consolas", 11), bg="#f8fafc", relief="flat", padx=20, pady=20)
-        self.text.pack(fill="both", expand=True)
+        ModernButton(filter_frame, text="Last 30 Days", command=lambda: self.gen('30d')).pack(side="left", padx=10)
+        ModernButton(filter_frame, text="This Year", command=lambda: self.gen('year')).pack(side="left", padx=10)
+        
+        # Any range: From / To are both inclusive, YYYY-MM-DD
+        self.range = {}
+        for label in ("From", "To"):
+            tk.Label(filter_frame, text=label, font=FONT_BOLD, bg=COLOR_WHITE, fg=COLOR_TEXT_SEC).pack(side="left", padx=(20, 5))
+            e = tk.Entry(filter_frame, width=11, font=("Helvetica", 11), bg="#f8fafc", relief="flat", highlightthickness=1, highlightbackground="#e2e8f0")
+            e.pack(side="left", ipady=4)
+            self.range[label] = e
+        ModernButton(filter_frame, text="Generate", bg=COLOR_SUCCESS, command=self.run).pack(side="left", padx=10)
+        self.busy = BusyIndicator(filter_frame, bg=COLOR_WHITE)
+        self.busy.pack(side="left", padx=10)
+        
+        tabs = ttk.Notebook(main_card)
+        tabs.pack(fill="both", expand=True)
+        self.text = tk.Text(tabs, font=("Consolas", 11), bg="#f8fafc", relief="flat", padx=20, pady=20)
+        tabs.add(self.text, text="Summary")
+        
+        if self.analytics is None:
+            tk.Label(main_card, text="Install numpy (pip install numpy) for top sellers, category mix and the hourly heatmap.",
+                     font=FONT_NORMAL, bg=COLOR_WHITE, fg=COLOR_TEXT_SEC).pack(side="bottom", pady=10)
+        else:
+            self.top = self.table(tabs, "Top Sellers", ("ID", "Name", "Category", "Qty", "Revenue", "Profit", "Margin", "Sell-through"))
+            self.mix = self.table(tabs, "Category / Season", ("Category", "Season", "Qty", "Revenue", "Profit", "Margin", "Received", "On Hand", "Sell-through"))
+            self.heat = tk.Canvas(tabs, bg=COLOR_WHITE, highlightthickness=0)
+            self.heat.bind("<Configure>", lambda e: self.draw_heatmap())
+            tabs.add(self.heat, text="Hourly Heatmap")
+        self.grid_data = None
+        self.gen('today')
 
-    def gen(self, type):
-        self.text.delete(1.0, 'end')
-        start = datetime.datetime.now().strftime("%Y-%m-%d") if type == 'day' else datetime.datetime.now().strftime("%Y-%m-01")
-        conn = sqlite3.connect(DB_NAME)
-        res = conn.execute("SELECT count(*), sum(total), sum(profit) FROM sales WHERE date >= ?", (start,)).fetchone()
-        conn.close()
-        
+    def table(self, tabs, title, cols):
+        tree = VirtualTable(tabs, cols, key=lambda r: (r[0], r[1]), height=15)
+        for c in cols:
+            tree.heading(c, text=c)
+            tree.column(c, width=220 if c == "Name" else 90, anchor="w" if c in ("Name", "Category", "Season") else "e")
+        tabs.add(tree, text=title)
+        return tree
+
+    def refresh(self):
+        pass  # Reports are generated on demand
+
+    def gen(self, preset):
+        start, end = analytics.date_range(preset)
+        last = datetime.date.fromisoformat(end) - datetime.timedelta(days=1)
+        for label, val in (("From", start), ("To", last.isoformat())):
+            self.range[label].delete(0, 'end'); self.range[label].insert(0, val)
+        self.run()
+
+    def run(self):
+        try:
+            start = datetime.date.fromisoformat(self.range["From"].get().strip())
+            end = datetime.date.fromisoformat(self.range["To"].get().strip()) + datetime.timedelta(days=1)
+        except ValueError:
+            return messagebox.showerror("Error", "Dates must be YYYY-MM-DD")
+        if end <= start: return messagebox.showerror("Error", "'To' is before 'From'")
+        start, end = start.isoformat(), end.isoformat()
+        if self.analytics is None:
+            work = lambda conn: {"start": start, "end": end, "totals": summaries.period_totals(conn, start, end)}
+        else:
+            token = self.app.db.data_token()  # Taken on this thread, so cached reports compare like with like
+            work = lambda conn: self.analytics.report(conn, start, end, token)
+        self.app.queries.submit((self, "report"), work, self.show, on_error=lambda e: messagebox.showerror("Error", str(e)),
+                                busy=self.busy.set)
+
+    def show(self, res):
+        lines, qty, revenue, profit = res["totals"]
+        last = datetime.date.fromisoformat(res["end"]) - datetime.timedelta(days=1)
         rpt = f"""
         ========================================
-        FINANCIAL REPORT ({type.upper()})
-        Date: {datetime.datetime.now().strftime("%Y-%m-%d")}
+        FINANCIAL REPORT
+        Period: {res["start"]} to {last.isoformat()}
         ========================================
         
-        Total Transactions : {res[0]}
-        Total Revenue      : Rs. {res[1] or 0:,.2f}
-        Net Profit         : Rs. {res[2] or 0:,.2f}
+        Total Transactions : {lines}
+        Units Sold         : {qty}
+        Total Revenue      : Rs. {revenue:,.2f}
+        Net Profit         : Rs. {profit:,.2f}
+        Margin             : {profit / revenue if revenue else 0:.1%}
         
         ========================================
         """
+        self.text.delete(1.0, 'end')
         self.text.insert('end', rpt)
+        if self.analytics is None: return
+        pct = lambda v: f"{v:.1%}"
+        self.top.load([(i, n, c, q, f"{r:,.0f}", f"{p:,.0f}", pct(m), pct(st)) for i, n, c, q, r, p, m, st in res["top_items"]])
+        self.mix.load([(c, s, q, f"{r:,.0f}", f"{p:,.0f}", pct(m), rc, oh, pct(st)) for c, s, q, r, p, m, rc, oh, st in res["mix"]])
+        self.grid_data = res["heatmap"]
+        self.draw_heatmap()
+
+    def draw_heatmap(self):
+        """Revenue by weekday (rows) and hour (columns), darker = busier"""
+        c = self.heat
+        c.delete("all")
+        if not self.grid_data: return
+        hours = [h for h in range(24) if any(row[h] for row in self.grid_data)] or list(range(9, 23))
+        top = max(max(row) for row in self.grid_data) or 1
+        left, head = 50, 25
+        w = max((c.winfo_width() - left - 10) / len(hours), 10)
+        h = max((c.winfo_height() - head - 10) / 7, 10)
+        end = [int(COLOR_ACCENT[i:i + 2], 16) for i in (1, 3, 5)]
+        for j, hr in enumerate(hours):
+            c.create_text(left + j * w + w / 2, head / 2, text=f"{hr:02d}", font=FONT_NORMAL, fill=COLOR_TEXT_SEC)
+        for d, name in enumerate(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")):
+            y = head + d * h
+            c.create_text(left - 10, y + h / 2, text=name, anchor="e", font=FONT_BOLD, fill=COLOR_TEXT_MAIN)
+            for j, hr in enumerate(hours):
+                f = self.grid_data[d][hr] / top
+                colour = "#" + "".join(f"{round(255 + (e - 255) * f):02x}" for e in end)
+                c.create_rectangle(left + j * w, y, left + (j + 1) * w - 2, y + h - 2, fill=colour, outline="")
+                if self.grid_data[d][hr] and w > 45:
+                    c.create_text(left + j * w + w / 2, y + h / 2, text=f"{self.grid_data[d][hr] / 1000:,.0f}k",
+                                  font=("Helvetica", 8), fill=COLOR_WHITE if f > 0.5 else COLOR_TEXT_MAIN)
 
 
 # --- 6. SETTINGS PANEL (Redesigned Form) ---
 class SettingsPanel(tk.Frame):
     def __init__(self, parent, app):
         super().__init__(parent, bg=COLOR_BG)
+        self.app = app
         
         wrapper = tk.Frame(self, bg=COLOR_BG)
         wrapper.pack(expand=True, fill="both")
@@ -413,21 +876,53 @@ class SettingsPanel(tk.Frame):
         
         self.entries = {}
         fields = ["Shop Name", "Address", "Phone", "Terms"]
-        vals = app.db.get_shop_info()
-        data = [vals[1], vals[2], vals[3], vals[4]]
-        
-        for i, f in enumerate(fields):
+        for f in fields:
             tk.Label(card, text=f, font=("Helvetica", 9, "bold"), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(anchor="w", pady=(0, 5))
-            e = tk.Entry(card, font=("Helvetica", 11), bg="#f8fafc", relief="flat", highlightthickness=1, highlightbackground="#e2e8f0")
+            e = tk.Entry(card, font=("Helvetica", 11), bg="#f8fafc", relief="flat", highlightthickness=1, highlightbackground="#e2e8f0",
+                         state="disabled")  # Until the shop info arrives
             e.pack(fill="x", ipady=8, pady=(0, 15))
-            e.insert(0, data[i])
             self.entries[f] = e
+        self._loaded = False
+        app.queries.submit((self, "shop"), store.shop_info, self.show_shop)
             
         ModernButton(card, text="SAVE CHANGES", command=self.save).pack(fill="x", ipady=5, pady=10)
 
+        if app.backups:  # Standalone till; a store server backs up its own database
+            tk.Label(card, text="Backups", font=("Helvetica", 9, "bold"), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE).pack(anchor="w", pady=(15, 5))
+            self.backup_lbl = tk.Label(card, text="", font=("Helvetica", 9), fg=COLOR_TEXT_SEC, bg=COLOR_WHITE, justify="left", wraplength=420)
+            self.backup_lbl.pack(anchor="w")
+            ModernButton(card, text="BACK UP NOW", command=self.backup_now).pack(fill="x", ipady=5, pady=10)
+            self.show_backup()
+
+    def refresh(self):
+        if self.app.backups: self.show_backup()  # Shop info: only this panel edits it
+
+    def show_shop(self, vals):
+        for f, v in zip(["Shop Name", "Address", "Phone", "Terms"], vals[1:5]):
+            e = self.entries[f]
+            e.config(state="normal"); e.delete(0, "end"); e.insert(0, v or "")
+        self._loaded = True
+
+    # --- BACKUPS (backup.py) ---
+    def show_backup(self):
+        b = self.app.backups
+        if b.error: self.backup_lbl.config(text=f"⚠ Last backup failed: {b.error}", fg=COLOR_DANGER); return
+        if not b.last: self.backup_lbl.config(text=f"No backup yet (first one runs {BACKUP_FIRST_S // 60} min after start)", fg=COLOR_TEXT_SEC); return
+        when, path, size, _ = b.last
+        self.backup_lbl.config(text=f"Last backup {datetime.datetime.fromtimestamp(when):%Y-%m-%d %H:%M}  ·  {size / 1048576:.1f} MB  ·  "
+                                    f"{os.path.basename(path)}\nRestore with: python backup.py --restore <file>", fg=COLOR_TEXT_SEC)
+
+    def backup_now(self):
+        self.app.backups.run_now()
+        self.backup_lbl.config(text="Backing up in the background...", fg=COLOR_TEXT_SEC)
+        self.after(500, self.watch_backup, self.app.backups.runs)
+
+    def watch_backup(self, runs):
+        if self.app.backups.runs == runs: return self.after(500, self.watch_backup, runs)
+        self.show_backup()
+
     def save(self):
+        if not self._loaded: return  # Saving the empty fields would wipe the shop info
         d = [self.entries[f].get() for f in ["Shop Name", "Address", "Phone", "Terms"]]
-        conn = sqlite3.connect(DB_NAME)
-        conn.execute("UPDATE shop_info SET name=?, address=?, phone=?, terms=? WHERE id=1", d)
-        conn.commit(); conn.close()
+        store.save_shop(self.app.db, *d)
         messagebox.showinfo("Saved", "Settings Updated")
\ No newline at end of file
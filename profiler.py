@@ -0,0 +1,244 @@
+# FILE: profiler.py
+"""Query instrumentation: every statement the app runs, timed where it was issued.
+
+DBManager opens its connections with factory=TracedConnection (QUERY_PROFILE).
+Each statement is timed from execute() until its cursor is exhausted, closed or
+dropped (time spent inside SQLite only, not in the caller between fetches), and
+recorded with its call site and row count in a per-statement log2 histogram.
+
+Statements slower than SLOW_QUERY_MS go to a background thread that captures
+EXPLAIN QUERY PLAN on its own read-only connection (at most once per statement
+every QUERY_PLAN_INTERVAL_S) and appends them to a rotating log, so the till's
+thread never waits on disk or on a second query. The diagnostics overlay
+(F12, components.DiagnosticsOverlay) reads PROFILER.stats() / PROFILER.slow.
+
+Cost is a few microseconds per statement; benchmark.py profile measures it.
+"""
+import contextlib
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from config import *
+
+BUCKETS = 24  # log2 microsecond buckets: 1 us .. ~8 s
+SPACE_RE = re.compile(r"\s+")
+_SKIP = {os.path.abspath(__file__), os.path.abspath(sqlite3.__file__), os.path.abspath(contextlib.__file__)}
+_SKIP |= {os.path.join(os.path.dirname(os.path.abspath(__file__)), f) for f in ("database.py", "client.py", "endpoints.py")}
+_now = time.perf_counter
+
+def call_site(depth=2):
+    """(code, line) of the first frame outside the data layer; format with site_name()"""
+    f = sys._getframe(depth)
+    while f is not None and f.f_code.co_filename in _SKIP: f = f.f_back
+    return (f.f_code, f.f_lineno) if f is not None else None
+
+def site_name(site):
+    """'panels.py:212 load_items'"""
+    if not site: return "?"
+    if isinstance(site, str): return site
+    code, line = site
+    return f"{os.path.basename(code.co_filename)}:{line} {code.co_name}"
+
+def _bucket_ms(i):
+    """Upper bound of histogram bucket i in milliseconds"""
+    return (1 << i) / 1000
+
+class QueryProfiler:
+    """Per-statement latency histograms plus the recent slow statements"""
+    def __init__(self, slow_ms=SLOW_QUERY_MS, log_path=QUERY_LOG, max_statements=QUERY_STATS_MAX):
+        self.slow_ms, self.log_path, self.max_statements = slow_ms, log_path, max_statements
+        self.slow = deque(maxlen=QUERY_SLOW_KEEP)  # (time, ms, sql, site name, rows, plan)
+        self._stats = {}    # normalized sql -> [calls, total_ms, max_ms, rows, site, buckets]
+        self._planned = {}  # normalized sql -> last EXPLAIN time
+        self._keys = {}     # sql as issued -> normalized (statements are mostly the same string objects)
+        self._lock = threading.Lock()
+        self._queue = None
+        self._log = None
+
+    def key(self, sql):
+        key = self._keys.get(sql)
+        if key is None:
+            key = SPACE_RE.sub(" ", sql).strip()
+            if len(self._keys) < 4 * self.max_statements: self._keys[sql] = key
+        return key
+
+    def record(self, sql, site, ms, rows, db_path=None, params=()):
+        """db_path: EXPLAIN the statement there if it is slow (params=None: no plan, e.g. executemany)"""
+        key, rows = self.key(sql), max(rows, 0)
+        b = min(int(ms * 1000).bit_length(), BUCKETS - 1)
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                if len(self._stats) >= self.max_statements: key = "(other statements)"
+                s = self._stats.setdefault(key, [0, 0.0, 0.0, 0, site, [0] * BUCKETS])
+            s[0] += 1; s[1] += ms; s[3] += rows; s[4] = site; s[5][b] += 1
+            if ms > s[2]: s[2] = ms
+        if ms >= self.slow_ms: self._slow(key, sql, site, ms, rows, db_path, params)
+
+    def reset(self):
+        with self._lock: self._stats.clear()
+        self.slow.clear()
+
+    def stats(self):
+        """[(sql, calls, total_ms, p50_ms, p95_ms, max_ms, rows, site, buckets)] slowest total first.
+        Percentiles are histogram bucket upper bounds."""
+        with self._lock: snap = [(k, s[0], s[1], s[2], s[3], s[4], list(s[5])) for k, s in self._stats.items()]
+        out = []
+        for sql, calls, total, mx, rows, site, buckets in snap:
+            pct = lambda q: next(_bucket_ms(i) for i, c in enumerate(self._cumsum(buckets)) if c >= q * calls)
+            out.append((sql, calls, total, min(pct(0.5), mx), min(pct(0.95), mx), mx, rows, site_name(site), buckets))
+        return sorted(out, key=lambda r: -r[2])
+
+    @staticmethod
+    def _cumsum(values):
+        n = 0
+        for v in values:
+            n += v
+            yield n
+
+    # --- SLOW LOG (background thread) ---
+    def _slow(self, key, sql, site, ms, rows, db_path, params):
+        now = time.time()
+        with self._lock:
+            plan = db_path is not None and params is not None and now - self._planned.get(key, 0) >= QUERY_PLAN_INTERVAL_S
+            if plan: self._planned[key] = now
+            if self._queue is None:
+                self._queue = queue.SimpleQueue()
+                threading.Thread(target=self._writer, name="slow-query-log", daemon=True).start()
+        self._queue.put((now, ms, sql, site_name(site), rows, db_path if plan else None, params))
+
+    def _writer(self):
+        while True:
+            when, ms, sql, site, rows, db_path, params = self._queue.get()
+            plan = None
+            if db_path is not None:
+                # A connection per plan (they are rare): one held open would keep the database's WAL alive after the app closes it
+                try:
+                    with contextlib.closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+                        plan = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                except (sqlite3.Error, ValueError) as e:
+                    plan = [f"(plan unavailable: {e})"]  # e.g. temp tables, or a statement EXPLAIN can't take
+            self.slow.append((when, ms, sql, site, rows, plan))
+            try: self._logger().warning("%.1f ms  %s rows  %s\n    %s%s", ms, rows, site, self.key(sql),
+                                        "".join(f"\n    | {p}" for p in plan or ()))
+            except OSError: pass  # Read-only install directory: the overlay still has the entry
+
+    def _logger(self):
+        if self._log is None:
+            log = logging.getLogger("dolmen.slow_queries")
+            log.propagate = False
+            h = logging.handlers.RotatingFileHandler(self.log_path, maxBytes=QUERY_LOG_BYTES, backupCount=QUERY_LOG_BACKUPS, encoding="utf-8")
+            h.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            log.addHandler(h)
+            self._log = log
+        return self._log
+
+PROFILER = QueryProfiler()
+
+# --- CONNECTION HOOK ---
+class TracedCursor(sqlite3.Cursor):
+    """Times execute + fetches; reports when exhausted, closed, re-executed or garbage collected"""
+    _sql = None
+
+    def execute(self, sql, params=()):
+        if self._sql is not None: self._finish()
+        site = call_site()
+        t = _now()
+        try: super().execute(sql, params)
+        finally:
+            self._ms, self._rows = (_now() - t) * 1000, 0
+            self._sql, self._site, self._params = sql, site, params
+        if self.description is None: self._finish(self.rowcount)  # DML / DDL / BEGIN: nothing to fetch
+        return self
+
+    def executemany(self, sql, seq):
+        if self._sql is not None: self._finish()
+        site = call_site()
+        t = _now()
+        try: super().executemany(sql, seq)
+        finally:
+            self._ms, self._rows = (_now() - t) * 1000, 0
+            self._sql, self._site, self._params = sql, site, None  # seq is consumed: no plan
+        self._finish(self.rowcount)
+        return self
+
+    def fetchone(self):
+        t = _now()
+        row = super().fetchone()
+        if self._sql is None: return row
+        self._ms += (_now() - t) * 1000
+        if row is None: self._finish()
+        else: self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t = _now()
+        rows = super().fetchmany(size)
+        if self._sql is None: return rows
+        self._ms += (_now() - t) * 1000
+        self._rows += len(rows)
+        if len(rows) < size: self._finish()
+        return rows
+
+    def fetchall(self):
+        t = _now()
+        rows = super().fetchall()
+        if self._sql is None: return rows
+        self._ms += (_now() - t) * 1000
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        t = _now()
+        try: row = super().__next__()
+        except StopIteration:
+            if self._sql is not None: self._ms += (_now() - t) * 1000; self._finish()
+            raise
+        if self._sql is not None: self._ms += (_now() - t) * 1000; self._rows += 1
+        return row
+
+    def close(self):
+        if self._sql is not None: self._finish()
+        super().close()
+
+    def __del__(self):
+        if self._sql is not None:
+            try: self._finish()
+            except Exception: pass
+
+    def _finish(self, rows=None):
+        sql, self._sql = self._sql, None
+        PROFILER.record(sql, self._site, self._ms, self._rows if rows is None else rows, self.connection.db_path, self._params)
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TracedConnection); db_path is where slow statements get EXPLAINed"""
+    db_path = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def commit(self):
+        t = _now()
+        super().commit()
+        PROFILER.record("COMMIT", call_site(), (_now() - t) * 1000, 0, params=None)
+
+def connect(path, **kwargs):
+    """sqlite3.connect with the profiling hook; path may be a file: URI"""
+    conn = sqlite3.connect(path, factory=TracedConnection, **kwargs)
+    conn.db_path = path[5:].split("?", 1)[0] if kwargs.get("uri") else path
+    return conn
@@ -0,0 +1,244 @@
+# FILE: receipt_archive.py
+"""Receipt archive: every printed receipt, packed into one compressed segment per month.
+
+Instead of one receipts/<id>.txt per sale, rendered receipts are appended to
+receipts/YYYY-MM.rca and indexed by receipt number in receipts/index.db
+(number -> segment, offset, length), so a reprint is one index lookup and one
+read, and a store's years of receipts are a few dozen files.
+
+Each record is self-describing (magic, format, number, compressed text), so the
+index can always be rebuilt from the segments; a record torn by a crash is cut
+off when its segment is next opened, and skipped by a rebuild. Receipts are a few hundred bytes
+of near-identical text, too little for zlib to find repeats in on its own; each
+one is compressed against a preset dictionary of typical receipt text instead
+(format 1), which still leaves every record readable on its own.
+
+    python receipt_archive.py --pack        # move old receipts/*.txt into the archive
+    python receipt_archive.py --get T1-000042
+    python receipt_archive.py --stats
+    python receipt_archive.py --rebuild-index
+"""
+import argparse
+import datetime
+import glob
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from config import *
+
+HEADER = struct.Struct("<2sBHI")  # magic, format, number length, compressed length
+MAGIC = b"RC"
+FORMAT = 1
+SEGMENT_EXT = ".rca"
+# Format 1 preset dictionary; never change it, add a new format instead
+ZDICT = ("Men Formal Shirt Women Kurti Kids Winter Jacket Trouser Scarf Sweater Jeans Shalwar\n x1 = 1,500\n x2 = 3,000\n"
+         "DOLMEN CLOTHES\nReceipt #T1-000000\nDate: 2025-01-01 12:00\n" + "-" * 30 + "\nTOTAL: Rs. \nThank you!").encode()
+
+def _compress(text):
+    c = zlib.compressobj(RECEIPT_ARCHIVE_LEVEL, zdict=ZDICT)
+    return c.compress(text.encode()) + c.flush()
+
+def _decompress(data):
+    d = zlib.decompressobj(zdict=ZDICT)
+    return (d.decompress(data) + d.flush()).decode()
+
+def _record(buf, pos):
+    """(number, length) if an intact record starts at buf[pos], else None"""
+    magic, fmt, klen, dlen = HEADER.unpack_from(buf, pos)
+    start, end = pos + HEADER.size + klen, pos + HEADER.size + klen + dlen
+    if magic != MAGIC or fmt != FORMAT or end > len(buf): return None
+    try:
+        number = buf[pos + HEADER.size:start].decode()
+        d = zlib.decompressobj(zdict=ZDICT)
+        d.decompress(buf[start:end])
+    except (UnicodeDecodeError, zlib.error):
+        return None
+    if not d.eof or d.unused_data: return None  # Cut short, or the length ran into the next record
+    return number, end - pos
+
+class ReceiptArchive:
+    def __init__(self, directory=RECEIPT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(os.path.join(directory, RECEIPT_ARCHIVE_INDEX), check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute("CREATE TABLE IF NOT EXISTS receipts (number TEXT PRIMARY KEY, segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL) WITHOUT ROWID")
+        self._segments = {}  # month -> open append handle
+        self._recovered = set()  # Months checked for a torn tail since this archive was opened
+
+    def _segment(self, month):
+        f = self._segments.get(month)
+        if f is None:
+            if len(self._segments) >= 4:  # Old months are only written by --pack; don't hold them open
+                for old in self._segments.values(): old.close()
+                self._segments.clear()
+            path = os.path.join(self.directory, month + SEGMENT_EXT)
+            if month not in self._recovered:  # Once: later reopens would see this put_many's unindexed records
+                self._recover(month, path)
+                self._recovered.add(month)
+            f = self._segments[month] = open(path, "ab")
+        return f
+
+    def _recover(self, month, path):
+        """Before appending to a segment: indexes complete records the index missed and cuts off
+        a torn final write (a crash mid-put), so new receipts don't land behind unreadable bytes"""
+        if not os.path.exists(path): return
+        end = self._index.execute("SELECT max(offset + length) FROM receipts WHERE segment = ?", (month,)).fetchone()[0] or 0
+        size = os.path.getsize(path)
+        if size <= end: return  # Clean (or the index is ahead of a restored file: leave both alone)
+        found = list(self.scan(path, end))
+        with self._index:
+            self._index.executemany("INSERT OR IGNORE INTO receipts (number, segment, offset, length) VALUES (?, ?, ?, ?)",
+                                    ((n, month, off, ln) for n, off, ln in found))
+        good = found[-1][1] + found[-1][2] if found else end
+        if size > good: os.truncate(path, good)
+
+    # --- WRITE ---
+    def put(self, number, text, month=None):
+        """Appends a receipt to its month's segment (month 'YYYY-MM', default this month).
+        A number already archived is left as it is (reprints), returns False."""
+        return self.put_many([(number, text, month)]) == 1
+
+    def put_many(self, receipts):
+        """[(number, text, month)] in one index transaction; returns how many were new"""
+        rows, seen = [], set()
+        with self._lock:
+            have = self._index.execute
+            for number, text, month in receipts:
+                number = str(number)
+                if number in seen or have("SELECT 1 FROM receipts WHERE number = ?", (number,)).fetchone(): continue
+                seen.add(number)
+                month = month or datetime.date.today().strftime("%Y-%m")
+                key, data = number.encode(), _compress(text)
+                f = self._segment(month)
+                offset = f.tell()
+                f.write(HEADER.pack(MAGIC, FORMAT, len(key), len(data)) + key + data)
+                rows.append((number, month, offset, HEADER.size + len(key) + len(data)))
+            if not rows: return 0
+            for f in self._segments.values(): f.flush()  # Data reaches the file before the index points at it
+            with self._index:
+                self._index.executemany("INSERT INTO receipts (number, segment, offset, length) VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # --- READ ---
+    def get(self, number):
+        """The receipt text as printed, or None"""
+        with self._lock:
+            row = self._index.execute("SELECT segment, offset, length FROM receipts WHERE number = ?", (str(number),)).fetchone()
+            if row is None: return None
+            f = self._segments.get(row[0])
+            if f: f.flush()
+        month, offset, length = row
+        with open(os.path.join(self.directory, month + SEGMENT_EXT), "rb") as f:
+            f.seek(offset)
+            rec = f.read(length)
+        magic, fmt, klen, dlen = HEADER.unpack_from(rec)
+        if magic != MAGIC or fmt != FORMAT or rec[HEADER.size:HEADER.size + klen].decode() != str(number):
+            raise ValueError(f"receipt archive: bad record for {number} in {month}{SEGMENT_EXT} at {offset}")
+        return _decompress(rec[HEADER.size + klen:HEADER.size + klen + dlen])
+
+    def __contains__(self, number):
+        with self._lock:
+            return self._index.execute("SELECT 1 FROM receipts WHERE number = ?", (str(number),)).fetchone() is not None
+
+    def segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*" + SEGMENT_EXT)))
+
+    def scan(self, path, start=0):
+        """Yields (number, offset, length) for every intact record in a segment from `start`.
+        A damaged or torn record is skipped by resyncing to the next valid header, so the
+        receipts written after it are still found."""
+        with open(path, "rb") as f:
+            f.seek(start)
+            buf = f.read()
+        pos = 0
+        while pos + HEADER.size <= len(buf):
+            rec = _record(buf, pos)
+            if rec is None:
+                pos = buf.find(MAGIC, pos + 1)
+                if pos < 0: return
+                continue
+            yield rec[0], start + pos, rec[1]
+            pos += rec[1]
+
+    def rebuild_index(self):
+        """Re-derives the index from the segments; returns the number of receipts found"""
+        with self._lock:
+            for f in self._segments.values(): f.flush()
+            with self._index:
+                self._index.execute("DELETE FROM receipts")
+                for path in self.segments():
+                    month = os.path.basename(path)[:-len(SEGMENT_EXT)]
+                    self._index.executemany("INSERT OR REPLACE INTO receipts (number, segment, offset, length) VALUES (?, ?, ?, ?)",
+                                            ((n, month, off, ln) for n, off, ln in self.scan(path)))
+            return self._index.execute("SELECT count(*) FROM receipts").fetchone()[0]
+
+    def stats(self):
+        """(receipts, segments, bytes on disk)"""
+        with self._lock: n = self._index.execute("SELECT count(*) FROM receipts").fetchone()[0]
+        segs = self.segments()
+        return n, len(segs), sum(os.path.getsize(p) for p in segs)
+
+    # --- ONE-TIME MIGRATION ---
+    def pack(self, directory=None, batch=RECEIPT_ARCHIVE_BATCH, progress=None):
+        """Moves loose <number>.txt receipts (the old one-file-per-sale layout) into the archive,
+        filed under the month of each file's mtime. A file is deleted only once its receipt is
+        indexed, so an interrupted run just resumes. Returns the number of files packed."""
+        directory = directory or self.directory
+        done = 0
+        while True:
+            chunk = []
+            with os.scandir(directory) as it:
+                for e in it:
+                    if e.name.endswith(".txt") and e.is_file():
+                        chunk.append(e)
+                        if len(chunk) >= batch: break
+            if not chunk: return done
+            items = []
+            for e in chunk:
+                with open(e.path, encoding="utf-8", errors="replace") as f: text = f.read()
+                items.append((e.name[:-4], text, datetime.date.fromtimestamp(e.stat().st_mtime).strftime("%Y-%m")))
+            self.put_many(items)
+            for e in chunk: os.remove(e.path)
+            done += len(chunk)
+            if progress: progress(done)
+
+    def close(self):
+        with self._lock:
+            for f in self._segments.values(): f.close()
+            self._segments.clear()
+            self._index.close()
+
+def has_loose_files(directory=RECEIPT_DIR):
+    """True if the old one-file-per-receipt layout still has files to pack"""
+    if not os.path.isdir(directory): return False
+    with os.scandir(directory) as it:
+        return any(e.name.endswith(".txt") for e in it)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pack, inspect or repair the receipt archive")
+    ap.add_argument("--dir", default=RECEIPT_DIR)
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--pack", action="store_true", help="move loose <number>.txt receipts into the archive")
+    g.add_argument("--get", metavar="NUMBER")
+    g.add_argument("--stats", action="store_true")
+    g.add_argument("--rebuild-index", action="store_true")
+    args = ap.parse_args()
+    archive = ReceiptArchive(args.dir)
+    if args.pack:
+        n = archive.pack(progress=lambda n: print(f"\r{n} receipts packed...", end="", flush=True))
+        print(f"\r{n} receipts packed.")
+    elif args.get:
+        text = archive.get(args.get)
+        if text is None: raise SystemExit(f"No receipt {args.get} in the archive")
+        print(text)
+    elif args.stats:
+        n, segs, size = archive.stats()
+        print(f"{n} receipts in {segs} segment(s), {size / 1024:.1f} KiB ({size / max(n, 1):.0f} bytes per receipt)")
+    else:
+        print(f"Index rebuilt: {archive.rebuild_index()} receipts.")
+    archive.close()
@@ -0,0 +1,117 @@
+# FILE: receipts.py
+"""Background receipt spooler.
+
+checkout() only builds a receipt dict and submits it; worker threads render it,
+persist it and hand it to the configured output sink, so the cashier can start the
+next sale as soon as the database commit returns. The queue is bounded so a stuck
+printer can't eat memory; depth() reports the backlog. Receipts are kept in the
+compressed monthly archive (receipt_archive.py), not as one file each.
+"""
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from config import *
+
+def render_receipt(r):
+    """r: {id, date, lines: [(name, qty, total)], total, shop?} -> receipt text; r['text'] is
+    used as it is (a reprint from the archive)"""
+    if r.get("text"): return r["text"]
+    out = [f"{r.get('shop', DEFAULT_SHOP_NAME).upper()}", f"Receipt #{r['id']}", f"Date: {r['date']}", "-" * 30]
+    out += [f"{name} x{qty} = {total:,.0f}" for name, qty, total in r['lines']]
+    out += ["-" * 30, f"TOTAL: Rs. {r['total']:,.0f}", "Thank you!"]
+    return "\n".join(out)
+
+# --- OUTPUT SINKS: sink(receipt, text) ---
+class ArchiveSink:
+    """Appends the receipt to the monthly archive; optionally opens a copy in the OS viewer (Windows only)"""
+    def __init__(self, archive=None, open_after=False):
+        from receipt_archive import ReceiptArchive
+        self.archive, self.open_after = archive or ReceiptArchive(), open_after
+
+    def __call__(self, receipt, text):
+        self.archive.put(receipt['id'], text, str(receipt.get('date', ''))[:7] or None)
+        if self.open_after and hasattr(os, "startfile"):
+            path = os.path.join(tempfile.gettempdir(), f"receipt-{receipt['id']}.txt")
+            with open(path, "w") as f: f.write(text)
+            os.startfile(path)
+
+class FileSink:
+    """Writes receipts/<id>.txt; optionally opens it in the OS viewer (Windows only)"""
+    def __init__(self, directory=RECEIPT_DIR, open_after=False):
+        self.directory, self.open_after = directory, open_after
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, receipt, text):
+        path = os.path.abspath(os.path.join(self.directory, f"{receipt['id']}.txt"))
+        with open(path, "w") as f: f.write(text)
+        if self.open_after and hasattr(os, "startfile"): os.startfile(path)
+        return path
+
+class CommandSink:
+    """Pipes the receipt text to a print command, e.g. ["lp", "-d", "receipt"]"""
+    def __init__(self, command, persist=None):
+        self.command, self.persist = command, persist
+        self.archive = getattr(persist, "archive", None)
+
+    def __call__(self, receipt, text):
+        if self.persist: self.persist(receipt, text)
+        subprocess.run(self.command, input=text.encode(), check=True, timeout=30)
+
+class NullSink:
+    """Discards receipts (tests / benchmarks); keeps the last few for inspection"""
+    def __init__(self, keep=100):
+        self.seen = deque(maxlen=keep)
+
+    def __call__(self, receipt, text):
+        self.seen.append((receipt['id'], text))
+
+def make_sink(kind=RECEIPT_SINK):
+    if kind == "none": return NullSink()
+    if kind == "printer": return CommandSink(RECEIPT_PRINT_COMMAND, persist=ArchiveSink())
+    if kind == "file": return FileSink(open_after=RECEIPT_OPEN_AFTER)
+    return ArchiveSink(open_after=RECEIPT_OPEN_AFTER)
+
+# --- SPOOLER ---
+class ReceiptSpooler:
+    def __init__(self, sink, workers=RECEIPT_WORKERS, maxsize=RECEIPT_QUEUE_SIZE):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize)
+        self.errors = deque(maxlen=50)  # (receipt id, error) of failed hand-offs
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, name=f"receipt-spooler-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads: t.start()
+
+    def submit(self, receipt, timeout=2.0):
+        """Queues a receipt; raises queue.Full if the backlog doesn't drain within timeout"""
+        self.queue.put(receipt, timeout=timeout)
+
+    def depth(self):
+        """Receipts queued or being printed"""
+        with self._lock: return self.queue.qsize() + self._busy
+
+    def _work(self):
+        while True:
+            receipt = self.queue.get()
+            if receipt is None:
+                self.queue.task_done()
+                return
+            with self._lock: self._busy += 1
+            try:
+                self.sink(receipt, render_receipt(receipt))
+            except Exception as e:
+                self.errors.append((receipt.get('id'), e))
+            finally:
+                with self._lock: self._busy -= 1
+                self.queue.task_done()
+
+    def shutdown(self, wait=True):
+        """Drains the backlog (if wait) and stops the workers"""
+        if wait: self.queue.join()
+        for _ in self._threads: self.queue.put(None)
+        if wait:
+            for t in self._threads: t.join()
+            if getattr(self.sink, "archive", None): self.sink.archive.close()
@@ -0,0 +1,90 @@
+# FILE: scanner.py
+"""Barcode / SKU scan lane for the Sales panel.
+
+BarcodeIndex keeps every item in a dict keyed by barcode and by item id (the SKU
+printed on shelf labels), so a scan is one hash lookup and no query. It is built
+on the background query executor and rebuilt when the panel is shown after the
+data changed, or at most every SCAN_INDEX_MAX_AGE_S while selling; stock in it is
+a snapshot (checkout re-checks stock under the write lock anyway).
+
+ScanDetector tells keyboard-wedge scanners from people: a scanner "types" a whole
+code in a burst of keystrokes a few ms apart. A burst is submitted on its Enter
+suffix, or after SCAN_END_MS of silence for scanners configured without one.
+"""
+import re
+import time
+from config import *
+from endpoints import remote_read
+import store
+
+QTY_PREFIX_RE = re.compile(r"^\s*(\d{1,4})\s*[*xX]\s*(.+)$")
+
+def parse_entry(text):
+    """'3*8901234567890' -> (3, '8901234567890'); 'ABC-1' -> (1, 'ABC-1').
+    Raises ValueError for a zero quantity ('0*...'), which would ring up an empty sales line."""
+    m = QTY_PREFIX_RE.match(text)
+    if not m: return 1, text.strip()
+    qty = int(m.group(1))
+    if qty < 1: raise ValueError(f"invalid quantity {qty}")
+    return qty, m.group(2).strip()
+
+class BarcodeIndex:
+    def __init__(self):
+        self.codes = {}       # barcode or str(item id) -> (id, name, sale_price, stock)
+        self.token = None     # Data token the index was built at
+        self.built = 0.0      # time.monotonic() of the last build
+
+    @staticmethod
+    @remote_read
+    def build(conn):
+        """code -> item row; runs on a worker thread. Barcodes win over an equal item id."""
+        codes, barcodes = {}, []
+        for iid, name, price, stock, barcode in conn.execute("SELECT id, name, sale_price, stock, barcode FROM items"):
+            row = (iid, name, price or 0, stock or 0)
+            codes[str(iid)] = row
+            if barcode: barcodes.append((barcode, row))
+        codes.update(barcodes)
+        return codes
+
+    def swap(self, codes, token):
+        self.codes, self.token, self.built = codes, token, time.monotonic()
+
+    def stale(self, token):
+        return self.token != token
+
+    def due(self):
+        return time.monotonic() - self.built >= SCAN_INDEX_MAX_AGE_S
+
+    def lookup(self, code):
+        return self.codes.get(code)
+
+    def find(self, conn, code):
+        """lookup(), falling back to the database for items added since the build; None if unknown"""
+        item = self.codes.get(code)
+        return item if item is not None else store.item_by_code(conn, code)
+
+    def __len__(self):
+        return len(self.codes)
+
+def scan_item(index, conn, text):
+    """A scan / typed entry -> (qty, (id, name, sale_price, stock) or None); ValueError as parse_entry"""
+    qty, code = parse_entry(text)
+    return qty, index.find(conn, code)
+
+class ScanDetector:
+    """Feed it (char, event time in ms); it says when the keys so far look like a scanner burst"""
+    def __init__(self, gap_ms=SCAN_BURST_MS, min_len=SCAN_MIN_LEN):
+        self.gap_ms, self.min_len = gap_ms, min_len
+        self.fast = 0         # Keystrokes in the current run of fast ones
+        self.last = None
+
+    def key(self, t_ms):
+        if self.last is not None and 0 <= t_ms - self.last <= self.gap_ms: self.fast += 1
+        else: self.fast = 1
+        self.last = t_ms
+
+    def burst(self):
+        return self.fast >= self.min_len
+
+    def reset(self):
+        self.fast, self.last = 0, None
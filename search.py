@@ -0,0 +1,66 @@
+# FILE: search.py
+"""Product search engine behind the POS catalog and inventory search boxes.
+
+Backed by the items_fts FTS5 index (migration 3), kept in sync with items by triggers.
+Every word typed is a prefix and all words must match. Items whose name matches
+rank above items that only match on category/season; newest first within a tier.
+(bm25 ranking was measured too slow for one-letter prefixes over 100k SKUs.)
+"""
+import re
+from config import *
+
+ITEM_COLS = "i.id, i.name, i.category, i.season, i.purchase_price, i.sale_price, i.stock"
+ID_BATCH = 256
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def to_match_query(text):
+    """'men shi' -> '"men"* AND "shi"*' (quoted so user input can't inject FTS syntax)"""
+    return " AND ".join(f'"{t}"*' for t in TOKEN_RE.findall(text.lower()))
+
+class ProductSearch:
+    def __init__(self, db):
+        self.db = db
+        self.fts = db.scalar("SELECT count(*) FROM sqlite_master WHERE name='items_fts'") == 1
+
+    def search(self, text, in_stock=False, limit=SEARCH_LIMIT, conn=None):
+        """Yields item rows (id, name, category, season, purchase_price, sale_price, stock).
+        Blank text lists everything, newest first. Rows are produced lazily and no
+        cursor is left open between batches, so a half-read result never pins a transaction."""
+        conn = conn or self.db.conn
+        stock = " AND i.stock > 0" if in_stock else ""
+        match = to_match_query(text)
+        if not match:
+            return iter(conn.execute(f"SELECT {ITEM_COLS} FROM items i WHERE 1{stock} ORDER BY i.id DESC LIMIT ?", (limit,)).fetchall())
+        if not self.fts:
+            return iter(self._search_like(conn, text, stock, limit))
+        return self._search_fts(conn, match, stock, limit)
+
+    def _search_fts(self, conn, match, stock, limit):
+        seen, count = set(), 0
+        for tier in (f"name : ({match})", match):
+            last = None
+            while count < limit:
+                # Keyset pagination over the FTS doclist: cheap even when a prefix matches every row
+                if last is None:
+                    ids = conn.execute("SELECT rowid FROM items_fts WHERE items_fts MATCH ? ORDER BY rowid DESC LIMIT ?",
+                                       (tier, ID_BATCH)).fetchall()
+                else:
+                    ids = conn.execute("SELECT rowid FROM items_fts WHERE items_fts MATCH ? AND rowid < ? ORDER BY rowid DESC LIMIT ?",
+                                       (tier, last, ID_BATCH)).fetchall()
+                if not ids: break
+                last = ids[-1][0]
+                new = [r[0] for r in ids if r[0] not in seen]
+                if not new: continue
+                seen.update(new)
+                rows = conn.execute(f"SELECT {ITEM_COLS} FROM items i WHERE i.id IN ({','.join('?' * len(new))}){stock} ORDER BY i.id DESC",
+                                    new).fetchall()
+                for r in rows[:limit - count]:
+                    yield r
+                count += min(len(rows), limit - count)
+
+    def _search_like(self, conn, text, stock, limit):
+        # Fallback for SQLite builds without FTS5: every word must appear in name/category/season
+        words = TOKEN_RE.findall(text)
+        where = " AND ".join("(i.name LIKE ? OR i.category LIKE ? OR i.season LIKE ?)" for _ in words)
+        params = [f"%{w}%" for w in words for _ in range(3)]
+        return conn.execute(f"SELECT {ITEM_COLS} FROM items i WHERE {where}{stock} ORDER BY i.name LIMIT ?", (*params, limit)).fetchall()
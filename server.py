@@ -0,0 +1,259 @@
+# FILE: server.py
+"""Store server: one process owns the database, every till talks to it over HTTP/JSON.
+
+    python server.py [--host 0.0.0.0 --key SECRET] [--port 8765] [--db clothes_system.db]
+    DOLMEN_SERVER=http://127.0.0.1:8765 DOLMEN_TERMINAL=T2 [DOLMEN_SERVER_KEY=SECRET] python main.py
+
+Tills can only call the typed endpoints below (endpoints.py): no SQL is accepted
+from the network. Serving anything but loopback needs a shared key.
+
+Writes (checkouts, stock entry, edits) from all tills go to a single writer
+thread that groups whatever is waiting into one BEGIN IMMEDIATE ... COMMIT.
+Each request runs in its own SAVEPOINT, so a stock conflict on one till's cart
+rolls back that cart only. Reads run on read-only connections, and results are
+cached until the database changes (PRAGMA data_version on a watch connection).
+The server also takes the scheduled online backups of its database (backup.py).
+
+Endpoints (POST, JSON body, JSON reply {"result": ...} or {"error": ...}):
+    /token                                  -> data token, changes on every commit
+    /read     {name, args, kwargs}          -> a registered reader's result (read-only connection)
+    /search   {text, in_stock, limit}       -> rows (search.py)
+    /checkout {lines, terminal}             -> [receipt number, date]; 409 + conflicts on StockConflict
+    /refund   {number, items, terminal}     -> [return receipt number, date]; items [[item_id, qty]], [] = all
+    /write    {name, args}                  -> a registered writer's result, in its own savepoint
+"""
+import argparse
+import datetime
+import hmac
+import ipaddress
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import *
+from database import DBManager
+from search import ProductSearch
+from checkout import CheckoutEngine, StockConflict
+from backup import BackupScheduler
+from endpoints import READS, WRITES
+import forecast
+import analytics, cart, scanner, store, summaries  # noqa: F401  Register their endpoints
+
+# --- GROUP COMMIT ---
+class WriteBatcher:
+    """Single writer thread: commits queued write requests together, one savepoint each"""
+    def __init__(self, db, max_batch=SERVER_BATCH, window_ms=SERVER_BATCH_WINDOW_MS):
+        self.db, self.max_batch, self.window = db, max_batch, window_ms / 1000
+        self.queue = queue.Queue()
+        self.commits = self.writes = 0  # For the load test / status
+        self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op):
+        """Runs op(conn) inside the next batch; returns its result or raises its error.
+        No timeout: giving up while the batch may still commit would lie to the till."""
+        fut = Future()
+        self.queue.put((op, fut))
+        return fut.result()
+
+    def _take(self):
+        batch = [self.queue.get()]
+        if batch[0] is None: return None
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            try: item = self.queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty: break
+            if item is None:
+                self.queue.put(None)  # Stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None: return
+            done = []
+            try:
+                with self.db.transaction("IMMEDIATE") as conn:
+                    for op, fut in batch:
+                        conn.execute("SAVEPOINT req")
+                        try:
+                            done.append((fut, op(conn), None))
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO req")
+                            done.append((fut, None, e))
+                        conn.execute("RELEASE req")
+            except Exception as e:  # BEGIN / COMMIT failed: nothing in the batch was written
+                done = [(fut, None, e) for _, fut in batch]
+            else:
+                self.commits += 1
+                self.writes += len(batch)
+            for fut, res, err in done:
+                if err is None: fut.set_result(res)
+                else: fut.set_exception(err)
+
+    def shutdown(self):
+        self.queue.put(None)
+        self._thread.join()
+
+# --- READ CACHE ---
+class ReadCache:
+    """LRU of read results, dropped whenever the data token moves"""
+    def __init__(self, maxsize=SERVER_CACHE_SIZE):
+        self.maxsize, self.token = maxsize, None
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, token, compute):
+        with self._lock:
+            if token != self.token: self.data.clear(); self.token = token
+            elif key in self.data:
+                self.hits += 1
+                self.data.move_to_end(key)
+                return self.data[key]
+            self.misses += 1
+        val = compute()
+        with self._lock:
+            if token == self.token:
+                self.data[key] = val
+                if len(self.data) > self.maxsize: self.data.popitem(last=False)
+        return val
+
+# --- SERVER ---
+class StoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, db, host=STORE_SERVER_HOST, port=STORE_SERVER_PORT, key=STORE_SERVER_KEY):
+        if not key and not loopback(host):
+            raise ValueError(f"refusing to serve {host} without a store key: set DOLMEN_SERVER_KEY (or --key) on the server and the tills")
+        self.db, self.key = db, key
+        self.search = ProductSearch(db)
+        self.checkout = CheckoutEngine(db)
+        self.writer = WriteBatcher(db)
+        self.cache = ReadCache()
+        self._watch = sqlite3.connect(f"file:{db.path}?mode=ro", uri=True, check_same_thread=False)
+        self._watch_lock = threading.Lock()
+        self._stop = threading.Event()
+        super().__init__((host, port), StoreHandler)
+        threading.Thread(target=self._forecast_loop, name="store-forecast", daemon=True).start()
+
+    def _forecast_loop(self):
+        """Tills in client mode don't write; the server folds each finished day into the reorder forecast"""
+        while True:
+            try: self.writer.submit(forecast.update)
+            except Exception: pass  # Retried next interval; the Dashboard keeps the previous forecast
+            if self._stop.wait(FORECAST_INTERVAL_S): return
+
+    def token(self):
+        """Moves whenever any connection commits (the writer thread or an outside tool)"""
+        with self._watch_lock: return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    # --- ENDPOINTS ---
+    def do_token(self, req):
+        return self.token()
+
+    def do_read(self, req):
+        name, args, kwargs = req["name"], req.get("args", []), req.get("kwargs", {})
+        fn, cacheable = READS[name]
+        run = lambda: fn(self.db.reader, *args, **kwargs)
+        if not cacheable: return run()
+        return self.cache.get(("r", name, json.dumps([args, kwargs])), self.token(), run)
+
+    def do_search(self, req):
+        text, in_stock, limit = req.get("text", ""), bool(req.get("in_stock")), int(req.get("limit", SEARCH_LIMIT))
+        return self.cache.get(("s", text, in_stock, limit), self.token(),
+                              lambda: [list(r) for r in self.search.search(text, in_stock, limit, conn=self.db.reader)])
+
+    def do_checkout(self, req):
+        lines = req["lines"]
+        if not lines: raise ValueError("Cart is empty")
+        terminal, dt = req.get("terminal", "T"), datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        return [self.writer.submit(lambda conn: self.checkout.write(conn, lines, terminal, dt)), dt]
+
+    def do_refund(self, req):
+        items = {int(iid): int(q) for iid, q in req.get("items") or ()}
+        terminal, dt = req.get("terminal", "T"), datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        return [self.writer.submit(lambda conn: self.checkout.write_refund(conn, req["number"], items, terminal, dt)), dt]
+
+    def do_write(self, req):
+        fn, args = WRITES[req["name"]], req.get("args", [])
+        return self.writer.submit(lambda conn: fn(conn, *args))
+
+    def server_close(self):
+        super().server_close()
+        self._stop.set()
+        self.writer.shutdown()
+        self._watch.close()
+
+class StoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive: one connection (and handler thread) per till
+    disable_nagle_algorithm = True  # Headers and body go out as two writes; don't stall on delayed ACKs
+
+    def do_POST(self):
+        srv = self.server
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))  # Always, or the keep-alive stream desyncs
+            if srv.key and not hmac.compare_digest(self.headers.get("X-Store-Key", ""), srv.key): return self.reply(403, {"error": "bad store key"})
+            fn = getattr(srv, f"do_{self.path.strip('/')}", None)
+            if fn is None: return self.reply(404, {"error": f"no endpoint {self.path}"})
+            req = json.loads(body or b"{}")
+            self.reply(200, {"result": fn(req)})
+        except StockConflict as e:
+            self.reply(409, {"error": str(e), "conflicts": e.conflicts})
+        except (ValueError, KeyError, TypeError, sqlite3.Error) as e:
+            self.reply(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self.reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def finish(self):
+        super().finish()
+        self.server.db.release()  # This till disconnected: close its read connection
+
+    def log_message(self, fmt, *args):
+        pass  # One line per request would swamp the console at checkout rates
+
+def loopback(host):
+    """True if the bind address only accepts connections from this machine"""
+    if host == "localhost": return True
+    try: return ipaddress.ip_address(host).is_loopback
+    except ValueError: return False  # A host name: could be any interface
+
+def serve(db, host=STORE_SERVER_HOST, port=STORE_SERVER_PORT, key=STORE_SERVER_KEY):
+    """Starts a server on a background thread (port 0 picks a free one); stop with shutdown() + server_close()"""
+    srv = StoreServer(db, host, port, key)
+    threading.Thread(target=srv.serve_forever, name="store-server", daemon=True).start()
+    return srv
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve the store database to several tills")
+    ap.add_argument("--host", default=STORE_SERVER_HOST)
+    ap.add_argument("--port", type=int, default=STORE_SERVER_PORT)
+    ap.add_argument("--db", default=DB_NAME)
+    ap.add_argument("--key", default=STORE_SERVER_KEY, help="shared secret the tills send (required unless serving loopback)")
+    args = ap.parse_args()
+    if not args.key and not loopback(args.host):
+        raise SystemExit(f"Refusing to serve {args.host} without a store key: pass --key or set DOLMEN_SERVER_KEY (tills set it too).")
+    db = DBManager(args.db)
+    srv = StoreServer(db, args.host, args.port, args.key)
+    backups = BackupScheduler(args.db).start()
+    print(f"Store server on http://{args.host}:{srv.server_address[1]} ({args.db}), Ctrl+C to stop")
+    try: srv.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        backups.stop()
+        srv.server_close()
+        db.close()
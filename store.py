@@ -0,0 +1,83 @@
+# FILE: store.py
+"""The panels' own item, stock and shop reads / writes, as typed endpoints (endpoints.py).
+
+Standalone they run on the till's database; in client mode each call is one
+named request to the store server, which runs the same function there.
+"""
+from config import *
+from endpoints import remote_read, remote_write
+
+# --- READS ---
+@remote_read(cache=False)
+def login(conn, username, password):
+    """The user's role, or None; passwords never leave the database's machine"""
+    row = conn.execute("SELECT role FROM users WHERE username=? AND password=?", (username, password)).fetchone()
+    return row[0] if row else None
+
+@remote_read
+def shop_info(conn):
+    return conn.execute("SELECT * FROM shop_info WHERE id=1").fetchone()
+
+@remote_read
+def item(conn, item_id):
+    """(id, name, stock, sale_price) or None"""
+    return conn.execute("SELECT id, name, stock, sale_price FROM items WHERE id=?", (item_id,)).fetchone()
+
+@remote_read
+def item_by_code(conn, code):
+    """(id, name, sale_price, stock) for a barcode or item id, or None"""
+    return conn.execute("SELECT id, name, sale_price, stock FROM items WHERE barcode=? OR id=?", (code, code)).fetchone()
+
+@remote_read
+def item_barcode(conn, item_id):
+    row = conn.execute("SELECT barcode FROM items WHERE id=?", (item_id,)).fetchone()
+    return row[0] if row else None
+
+@remote_read
+def items_page(conn, before=None, limit=TABLE_PAGE_SIZE):
+    """Up to `limit` item rows (id, name, category, season, purchase_price, sale_price, stock)
+    with id < before, newest first: one keyset page of the full inventory list"""
+    cols = "id, name, category, season, purchase_price, sale_price, stock"
+    if before is None: return conn.execute(f"SELECT {cols} FROM items ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return conn.execute(f"SELECT {cols} FROM items WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)).fetchall()
+
+def all_items(conn, before=None, limit=TABLE_PAGE_SIZE):
+    """Every item below `before`, newest first, read a page at a time as it is consumed;
+    no cursor stays open between pages"""
+    while True:
+        rows = items_page(conn, before, limit)
+        yield from rows
+        if len(rows) < limit: return
+        before = rows[-1][0]
+
+@remote_read
+def stock_items(conn):
+    """[(id, name, purchase_price)] for the Stock Entry picker"""
+    return conn.execute("SELECT id, name, purchase_price FROM items").fetchall()
+
+# --- WRITES (called with the DBManager / RemoteDB) ---
+@remote_write
+def save_item(conn, item_id, name, category, season, purchase_price, sale_price, stock, barcode):
+    """Updates item_id, or adds an item if it is None; returns the item's id.
+    Raises ValueError if the barcode is already on another item."""
+    if barcode and conn.execute("SELECT id FROM items WHERE barcode=? AND id IS NOT ?", (barcode, item_id)).fetchone():
+        raise ValueError(f"Barcode {barcode} is already on another item")
+    v = (name, category, season, purchase_price, sale_price, stock, barcode)
+    if item_id is None:
+        return conn.execute("INSERT INTO items (name, category, season, purchase_price, sale_price, stock, barcode) VALUES (?,?,?,?,?,?,?)", v).lastrowid
+    conn.execute("UPDATE items SET name=?, category=?, season=?, purchase_price=?, sale_price=?, stock=?, barcode=? WHERE id=?", v + (item_id,))
+    return item_id
+
+@remote_write
+def delete_item(conn, item_id):
+    conn.execute("DELETE FROM items WHERE id=?", (item_id,))
+
+@remote_write
+def receive_stock(conn, item_id, qty, cost, date):
+    """Stock entry: stock, cost price and the purchases row move together"""
+    conn.execute("UPDATE items SET stock=stock+?, purchase_price=? WHERE id=?", (qty, cost, item_id))
+    conn.execute("INSERT INTO purchases (item_id, quantity, purchase_price, date) VALUES (?,?,?,?)", (item_id, qty, cost, date))
+
+@remote_write
+def save_shop(conn, name, address, phone, terms):
+    conn.execute("UPDATE shop_info SET name=?, address=?, phone=?, terms=? WHERE id=1", (name, address, phone, terms))
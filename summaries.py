@@ -0,0 +1,160 @@
+# FILE: summaries.py
+"""Materialized sales / inventory aggregates.
+
+Triggers on sales and items (created by migration 4) keep per-day, per-hour, per-item
+and per-category/season totals (plus one inventory row) up to date inside the same
+transaction as the write, so the Dashboard and Reports read O(days) rows instead of scanning every sale.
+Category/season are taken from the item at the time of sale; a rebuild re-derives
+them from the current items table.
+If the tables ever drift (manual edits, restored backups) run:
+
+    python summaries.py --verify     # report mismatches
+    python summaries.py --rebuild    # recompute everything from sales / items
+
+Days of fiscal years moved into history files (history.py) are kept: rebuild and
+verify cover the live days, verify --deep reads the history files as well.
+"""
+import argparse
+import datetime
+from config import *
+from endpoints import remote_read
+
+DAY = "substr({r}.date, 1, 10)"
+HOUR = "CAST(substr({r}.date, 12, 2) AS INTEGER)"
+CATEGORY = "coalesce((SELECT category FROM items WHERE id = {r}.item_id), '')"
+SEASON = "coalesce((SELECT season FROM items WHERE id = {r}.item_id), '')"
+
+# table -> (key columns, key expressions over a sales row)
+SALES_TABLES = {
+    "sales_daily": (("day",), (DAY,)),
+    "sales_hourly": (("day", "hour"), (DAY, HOUR)),
+    "sales_item_daily": (("day", "item_id"), (DAY, "{r}.item_id")),
+    "sales_category_daily": (("day", "category", "season"), (DAY, CATEGORY, SEASON)),
+}
+MEASURES = ("lines", "qty", "revenue", "profit")
+MEASURE_EXPRS = ("1", "{r}.quantity", "{r}.total", "{r}.profit")
+
+def drop_triggers(cur):
+    """Drops the sales summary triggers for a bulk job that updates the summaries itself
+    (datagen, archiving, the cost backfill); returns their SQL for restore_triggers().
+    The triggers are defined by the migrations; this only puts back what was there."""
+    saved = [r[0] for r in cur.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name IN "
+                                       "('summary_sales_ai', 'summary_sales_ad', 'summary_sales_au')")]
+    for t in ("summary_sales_ai", "summary_sales_ad", "summary_sales_au"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {t}")
+    return saved
+
+def restore_triggers(cur, saved):
+    for sql in saved: cur.execute(sql)
+
+def add_profit(cur, changes):
+    """Applies sales profit changes [(date, item_id, delta)] to every summary in one grouped
+    UPDATE per table, for bulk jobs that run with the sales triggers dropped (cost.py backfill)"""
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS profit_delta (date TEXT, item_id INTEGER, delta REAL)")
+    cur.executemany("INSERT INTO temp.profit_delta VALUES (?, ?, ?)", changes)
+    for table, (keys, key_exprs) in SALES_TABLES.items():
+        sel = ", ".join(f"{e.format(r='r')} AS {k}" for e, k in zip(key_exprs, keys))
+        match = " AND ".join(f"{table}.{k} = d.{k}" for k in keys)
+        cur.execute(f"UPDATE {table} SET profit = profit + d.delta FROM "
+                    f"(SELECT {sel}, sum(r.delta) AS delta FROM temp.profit_delta r GROUP BY {', '.join(keys)}) d WHERE {match}")
+    cur.execute("DELETE FROM temp.profit_delta")
+
+# --- REBUILD / VERIFY ---
+def _fresh_sql(table, since=False):
+    """SELECT that recomputes a summary table from sales (since: only sales dated >= ?)"""
+    keys, key_exprs = SALES_TABLES[table]
+    exprs = [e.format(r="s") for e in key_exprs]
+    sel = ", ".join(f"{e} AS {k}" for e, k in zip(exprs, keys))
+    return (f"SELECT {sel}, count(*) AS lines, coalesce(sum(s.quantity), 0) AS qty, "
+            f"coalesce(sum(s.total), 0) AS revenue, coalesce(sum(s.profit), 0) AS profit "
+            f"FROM sales s {'WHERE s.date >= ? ' if since else ''}GROUP BY {', '.join(keys)}")
+
+INVENTORY_SQL = "SELECT count(*), coalesce(sum(stock), 0) FROM items"
+# Not kept in inventory_summary: counted when read (two seeks on idx_items_stock), so a new LOW_STOCK_LEVEL applies at once
+LOW_SQL = "SELECT (SELECT count(*) FROM items WHERE stock <= ?) + (SELECT count(*) FROM items WHERE stock IS NULL)"
+
+def _cutoff(cur):
+    """First day still in the live sales table; days before it were archived (history.py)"""
+    import history
+    return history.cutoff(cur)
+
+def rebuild(cur):
+    """Recomputes the live days; the days of archived years are kept as they are"""
+    since = _cutoff(cur)
+    for table, (keys, _) in SALES_TABLES.items():
+        if since is None: cur.execute(f"DELETE FROM {table}")
+        else: cur.execute(f"DELETE FROM {table} WHERE day >= ?", (since,))
+        cur.execute(f"INSERT INTO {table} ({', '.join(keys + MEASURES)}) {_fresh_sql(table, since)}", (since,) if since else ())
+    cur.execute(f"UPDATE inventory_summary SET (item_count, total_stock) = ({INVENTORY_SQL}) WHERE id = 1")
+
+def _fresh_rows(cur, table, since, deep):
+    """(key..., measures...) rows recomputed from the live sales, or from every year's (deep)"""
+    if not deep: return cur.execute(_fresh_sql(table, since), (since,) if since else ()).fetchall()
+    import history
+    keys, key_exprs = SALES_TABLES[table]
+    sums = history.grouped(cur, "sales", [e.format(r="t") for e in key_exprs], [e.format(r="t") for e in MEASURE_EXPRS])
+    return [k + tuple(v) for k, v in sums.items()]
+
+def verify(cur, tolerance=0.005, deep=False):
+    """Returns a list of (table, key, stored, actual) for every drifted summary row.
+    Days of archived years are only checked with deep=True (reads every history file)."""
+    drift = []
+    since = None if deep else _cutoff(cur)
+    for table, (keys, _) in SALES_TABLES.items():
+        k = ", ".join(keys)
+        rows = cur.execute(f"SELECT {k}, {', '.join(MEASURES)} FROM {table}" + (" WHERE day >= ?" if since else ""), (since,) if since else ())
+        stored = {r[:len(keys)]: r[len(keys):] for r in rows}
+        for r in _fresh_rows(cur, table, since, deep):
+            key, actual = r[:len(keys)], r[len(keys):]
+            have = stored.pop(key, (0, 0, 0.0, 0.0))
+            if any(abs(a - b) > tolerance for a, b in zip(have, actual)):
+                drift.append((table, key, have, actual))
+        drift += [(table, key, have, (0, 0, 0.0, 0.0)) for key, have in stored.items() if any(have)]
+    have = cur.execute("SELECT item_count, total_stock FROM inventory_summary WHERE id = 1").fetchone()
+    actual = cur.execute(INVENTORY_SQL).fetchone()
+    if tuple(have or ()) != tuple(actual):
+        drift.append(("inventory_summary", (1,), have, actual))
+    return drift
+
+# --- READERS (used by Dashboard / Reports; conn may be a DBManager or a raw connection) ---
+@remote_read
+def inventory_totals(conn):
+    """(item_count, total_stock, low_count); low_count is items at or below LOW_STOCK_LEVEL"""
+    count, stock = conn.execute("SELECT item_count, total_stock FROM inventory_summary WHERE id = 1").fetchone()
+    return count, stock, conn.execute(LOW_SQL, (LOW_STOCK_LEVEL,)).fetchone()[0]
+
+@remote_read
+def period_totals(conn, start, end=None):
+    """(lines, qty, revenue, profit) for days in [start, end); dates as 'YYYY-MM-DD'"""
+    if end is None:
+        row = conn.execute("SELECT sum(lines), sum(qty), sum(revenue), sum(profit) FROM sales_daily WHERE day >= ?", (start,)).fetchone()
+    else:
+        row = conn.execute("SELECT sum(lines), sum(qty), sum(revenue), sum(profit) FROM sales_daily WHERE day >= ? AND day < ?", (start, end)).fetchone()
+    return tuple(v or 0 for v in row)
+
+@remote_read
+def dashboard_totals(conn, day=None):
+    """(total_stock, revenue for the day, low_count) for the Dashboard cards"""
+    day = day or datetime.date.today()
+    _, stock, low = inventory_totals(conn)
+    return stock, period_totals(conn, day.isoformat(), (day + datetime.timedelta(days=1)).isoformat())[2], low
+
+if __name__ == "__main__":
+    from database import DBManager
+    ap = argparse.ArgumentParser(description="Verify or rebuild the sales summary tables")
+    ap.add_argument("--db", default=DB_NAME)
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--verify", action="store_true")
+    g.add_argument("--rebuild", action="store_true")
+    ap.add_argument("--deep", action="store_true", help="verify archived years too (history.py)")
+    args = ap.parse_args()
+    db = DBManager(args.db)
+    if args.rebuild:
+        with db.transaction() as conn: rebuild(conn.cursor())
+        print("Summaries rebuilt.")
+    else:
+        drift = verify(db.conn.cursor(), deep=args.deep)
+        for table, key, have, actual in drift[:50]: print(f"{table} {key}: stored {have} != actual {actual}")
+        print(f"{len(drift)} drifted row(s)." if drift else "Summaries OK.")
+    db.close()
+    if args.verify and drift: raise SystemExit(1)
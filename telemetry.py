@@ -0,0 +1,159 @@
+# FILE: telemetry.py
+"""UI responsiveness telemetry: what the cashier feels, per panel.
+
+- loop_lag:     how late a UI_HEARTBEAT_MS after() heartbeat fires (the event loop was busy)
+- callback:     duration of every Tk callback (commands, bindings, after jobs), via tkinter.CallWrapper
+- search_paint: keystroke in a search box -> filtered table drawn (includes the debounce)
+- qty_prompt:   double-click on a product -> quantity dialog drawn
+
+Interactions are started with start(metric) and finished with painted(metric)
+(or by the next dialog being mapped); the time is taken at the first idle pass
+after the change, i.e. after Tk has redrawn it. Samples are kept per
+(panel, metric) and exported as percentiles to UI_TELEMETRY_FILE every
+UI_EXPORT_MS and on exit. Budgets (UI_BUDGETS, p95 in ms) are checked with:
+
+    python telemetry.py [ui_telemetry.json]     # exit 1 if a screen is over budget
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import deque
+from config import *
+
+_now = time.perf_counter
+
+def percentiles(samples):
+    s = sorted(samples)
+    if not s: return {"n": 0}
+    at = lambda q: round(s[min(int(len(s) * q), len(s) - 1)], 2)
+    return {"n": len(s), "p50": at(0.5), "p95": at(0.95), "p99": at(0.99), "max": round(s[-1], 2)}
+
+def budget_for(panel, metric, budgets=UI_BUDGETS):
+    return budgets.get(f"{panel}.{metric}", budgets.get(f"*.{metric}"))
+
+def check(panels, budgets=UI_BUDGETS):
+    """[(panel, metric, p95, budget)] for every screen over its budget"""
+    return [(panel, metric, s["p95"], b) for panel, metrics in panels.items() for metric, s in metrics.items()
+            if s.get("n", 0) >= UI_BUDGET_MIN_SAMPLES and (b := budget_for(panel, metric, budgets)) is not None and s["p95"] > b]
+
+def _callback_name(func):
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    if name.endswith("after.<locals>.callit") and func.__closure__:  # after(): report the scheduled function
+        inner = dict(zip(func.__code__.co_freevars, func.__closure__)).get("func")
+        if inner is not None: return _callback_name(inner.cell_contents)
+    return name
+
+class UITelemetry:
+    def __init__(self, root, heartbeat_ms=UI_HEARTBEAT_MS, keep=UI_SAMPLES):
+        self.root, self.heartbeat_ms, self.keep = root, heartbeat_ms, keep
+        self.panel = "login"     # Set by the app on navigation
+        self.samples = {}        # (panel, metric) -> deque of ms
+        self.callbacks = {}      # callback name -> [count, total_ms, max_ms]
+        self._pending = {}       # metric -> (start, until) where until is "paint" or "dialog"
+        self._due = None
+
+    def install(self):
+        """Starts the heartbeat, times every Tk callback and watches dialogs being mapped"""
+        import tkinter
+        telemetry = self
+
+        class TimedCallWrapper(tkinter.CallWrapper):
+            def __call__(self, *args):
+                t = _now()
+                try: return super().__call__(*args)
+                finally: telemetry.callback(self.func, (_now() - t) * 1000)
+
+        tkinter.CallWrapper = TimedCallWrapper  # Used for every command / binding / after() registered from now on
+        self.root.bind_class("Toplevel", "<Map>", self._dialog_mapped, add="+")
+        self._beat()
+        self.root.after(UI_EXPORT_MS, self._autosave)
+
+    # --- RECORDING ---
+    def record(self, metric, ms, panel=None):
+        key = (panel or self.panel, metric)
+        d = self.samples.get(key)
+        if d is None: d = self.samples[key] = deque(maxlen=self.keep)
+        d.append(ms)
+
+    def callback(self, func, ms):
+        name = _callback_name(func)
+        if name == "UITelemetry._beat": return  # The heartbeat itself
+        c = self.callbacks.get(name)
+        if c is None: c = self.callbacks[name] = [0, 0.0, 0.0]
+        c[0] += 1; c[1] += ms
+        if ms > c[2]: c[2] = ms
+        self.record("callback", ms)
+
+    def _beat(self):
+        now = _now()
+        if self._due is not None: self.record("loop_lag", max(now - self._due, 0) * 1000)
+        self._due = now + self.heartbeat_ms / 1000
+        self.root.after(self.heartbeat_ms, self._beat)
+
+    # --- INTERACTIONS ---
+    def start(self, metric, until="paint"):
+        """The user acted (keystroke, double-click); a later keystroke restarts the clock"""
+        self._pending[metric] = (_now(), until)
+
+    def painted(self, metric):
+        """The result of `metric` is on screen; measured once Tk has redrawn (first idle pass)"""
+        if metric not in self._pending: return  # A refresh nobody was waiting for
+        panel = self.panel
+        def done():
+            started = self._pending.pop(metric, None)
+            if started: self.record(metric, (_now() - started[0]) * 1000, panel)
+        self.root.after_idle(done)
+
+    def _dialog_mapped(self, event):
+        for metric, (_, until) in list(self._pending.items()):
+            if until == "dialog": self.painted(metric)
+
+    # --- EXPORT ---
+    def summary(self):
+        panels = {}
+        for (panel, metric), d in sorted(self.samples.items()):
+            panels.setdefault(panel, {})[metric] = percentiles(d)
+        return panels
+
+    def slowest_callbacks(self, n=UI_TOP_CALLBACKS):
+        """[(name, count, total_ms, max_ms)] by max"""
+        return sorted(((k, c, round(t, 2), round(m, 2)) for k, (c, t, m) in self.callbacks.items()), key=lambda r: -r[3])[:n]
+
+    def export(self, path=UI_TELEMETRY_FILE):
+        panels = self.summary()
+        data = {"meta": {"when": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform()},
+                "panels": panels, "callbacks": self.slowest_callbacks(),
+                "over_budget": [list(v) for v in check(panels)]}
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f: json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+        return data
+
+    def _autosave(self):
+        try: self.export()
+        except OSError: pass  # Read-only install directory: the overlay still shows everything
+        self.root.after(UI_EXPORT_MS, self._autosave)
+
+def report(data, budgets=UI_BUDGETS):
+    """Prints an exported file's percentiles against the budgets; returns the screens over budget"""
+    print(f"{'panel':<10}{'metric':<14}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'budget':>9}")
+    for panel, metrics in data["panels"].items():
+        for metric, s in metrics.items():
+            if not s.get("n"): continue
+            b = budget_for(panel, metric, budgets)
+            flag = "  OVER" if b is not None and s["p95"] > b and s["n"] >= UI_BUDGET_MIN_SAMPLES else ""
+            print(f"{panel:<10}{metric:<14}{s['n']:>7}{s['p50']:>9.1f}{s['p95']:>9.1f}{s['p99']:>9.1f}{s['max']:>9.1f}{'-' if b is None else b:>9}{flag}")
+    if data.get("callbacks"):
+        print("\nslowest callbacks (max ms):")
+        for name, count, total, mx in data["callbacks"][:10]: print(f"  {mx:>9.1f}  x{count:<6} {name}")
+    return check(data["panels"], budgets)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Check exported UI latency percentiles against the per-screen budgets")
+    ap.add_argument("file", nargs="?", default=UI_TELEMETRY_FILE)
+    args = ap.parse_args()
+    with open(args.file) as f: over = report(json.load(f))
+    if over: sys.exit(f"{len(over)} screen metric(s) over budget: " + ", ".join(f"{p}.{m} p95 {v:.0f} > {b} ms" for p, m, v, b in over))
@@ -0,0 +1,30 @@
+# FILE: tests/conftest.py
+"""Shared fixtures: every test runs against a scratch database, never the store file."""
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DBManager
+from profiler import PROFILER
+from benchmark import scratch_db
+
+@pytest.fixture(autouse=True, scope="session")
+def _slow_log(tmp_path_factory):
+    """Keeps the slow-query log out of the working tree"""
+    PROFILER.log_path = str(tmp_path_factory.mktemp("log") / "slow_queries.log")
+
+@pytest.fixture
+def db_path():
+    path = scratch_db(200, 2000)
+    yield path
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+@pytest.fixture
+def db(db_path):
+    db = DBManager(db_path)
+    yield db
+    db.close()
@@ -0,0 +1,12 @@
+# FILE: tests/test_bulk_import.py
+from bulk_import import BulkImporter
+
+def test_import_after_delete(db):
+    """After the newest item is deleted, new ids continue from sqlite_sequence, not max(id) + 1"""
+    db.execute("DELETE FROM items WHERE id = (SELECT max(id) FROM items)")
+    rows = [(2, {"name": "Check A", "purchase_price": "1", "sale_price": "2", "stock": "1", "barcode": "CHK-A"}),
+            (3, {"name": "Check B", "purchase_price": "1", "sale_price": "2", "stock": "1"}),
+            (4, {"name": "Check A", "purchase_price": "1", "sale_price": "9", "stock": "7", "barcode": "CHK-A"})]
+    report = BulkImporter(db, chunk_size=2).import_items(rows)
+    assert (report.inserted, report.updated, report.failed) == (2, 1, 0)
+    assert tuple(db.query_one("SELECT sale_price, stock FROM items WHERE barcode = 'CHK-A'")) == (9.0, 7)
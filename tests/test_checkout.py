@@ -0,0 +1,84 @@
+# FILE: tests/test_checkout.py
+import random
+import threading
+
+import pytest
+
+import history
+import summaries
+from checkout import CheckoutEngine, StockConflict, find_receipt
+from database import DBManager
+
+def till(path, items, receipts, seed, out):
+    """One till: commits random carts against the shared file, appends (committed, conflicts) to out"""
+    db = DBManager(path)
+    engine = CheckoutEngine(db)
+    rnd = random.Random(seed)
+    ok = conflicts = 0
+    for _ in range(receipts):
+        cart = [{"id": rnd.randint(1, items), "qty": rnd.randint(1, 3), "price": 1200.0, "total": 1200.0}
+                for _ in range(rnd.randint(1, 5))]
+        try:
+            engine.commit(cart)
+            ok += 1
+        except StockConflict:
+            conflicts += 1
+    db.close()
+    out.append((ok, conflicts))
+
+def test_concurrent_tills_never_oversell(db, db_path):
+    db.execute("UPDATE items SET stock = 5")
+    before = db.scalar("SELECT count(*) FROM receipts")
+    out = []
+    tills = [threading.Thread(target=till, args=(db_path, 200, 60, n, out)) for n in range(4)]
+    for t in tills: t.start()
+    for t in tills: t.join()
+    assert sum(o[1] for o in out) > 0  # Stock of 5 across 4 tills: some carts must be refused
+    assert db.scalar("SELECT count(*) FROM items WHERE stock < 0") == 0
+    assert db.scalar("SELECT count(*) FROM receipts") - before == sum(o[0] for o in out)
+    assert summaries.verify(db.conn.cursor()) == []
+
+def test_remote_tills_keep_summaries_in_step(db):
+    import server
+    from client import RemoteDB, RemoteCheckout
+    db.execute("UPDATE items SET stock = 5")
+    srv = server.serve(db, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{srv.server_address[1]}"
+    try:
+        engine = RemoteCheckout(RemoteDB(url), "T9")
+        rnd, ok = random.Random(1), 0
+        for _ in range(40):
+            try:
+                engine.commit([{"id": rnd.randint(1, 200), "qty": 2, "price": 1200.0, "total": 2400.0}])
+                ok += 1
+            except StockConflict: pass
+    finally:
+        srv.shutdown(); srv.server_close()
+    assert db.scalar("SELECT count(*) FROM receipts WHERE terminal = 'T9'") == ok
+    assert db.scalar("SELECT count(*) FROM items WHERE stock < 0") == 0
+    assert summaries.verify(db.conn.cursor()) == []
+
+def test_refund_keeps_summaries_in_step(db):
+    engine = CheckoutEngine(db)
+    iid = db.scalar("SELECT id FROM items WHERE stock >= 3 LIMIT 1")
+    stock = db.scalar("SELECT stock FROM items WHERE id = ?", (iid,))
+    number, _ = engine.commit([{"id": iid, "qty": 3, "price": 1200.0, "total": 3600.0}])
+    engine.refund(number, {iid: 1})
+    assert dict((l[0], l[5]) for l in find_receipt(db.reader, number)["lines"]) == {iid: 2}
+    assert db.scalar("SELECT stock FROM items WHERE id = ?", (iid,)) == stock - 2
+    assert summaries.verify(db.conn.cursor()) == []
+
+def test_zero_quantity_line_is_refused(db):
+    iid = db.scalar("SELECT id FROM items WHERE stock > 0 LIMIT 1")
+    before = db.scalar("SELECT count(*) FROM sales")
+    with pytest.raises(ValueError):
+        CheckoutEngine(db).commit([{"id": iid, "qty": 0, "price": 1200.0, "total": 0.0}])
+    assert db.scalar("SELECT count(*) FROM sales") == before
+
+def test_archived_receipt_cannot_be_returned(db):
+    number = db.scalar("SELECT number FROM receipts WHERE kind = 'sale' ORDER BY date LIMIT 1")
+    history.archive(db, keep=0)
+    r = find_receipt(db.reader, number)
+    assert r["archived"] and r["lines"] and not any(l[5] for l in r["lines"])
+    with pytest.raises(ValueError, match="archived"):
+        CheckoutEngine(db).refund(number)
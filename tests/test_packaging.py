@@ -0,0 +1,13 @@
+# FILE: tests/test_packaging.py
+"""PyInstaller (main.spec) bundles what modulefinder sees; a module main.py only reaches
+through importlib or __import__ is left out of the build and fails at runtime."""
+import modulefinder
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_main_imports_are_static():
+    finder = modulefinder.ModuleFinder(path=[ROOT], excludes=["numpy", "tkinter", "_tkinter", "PIL"])
+    finder.run_script(os.path.join(ROOT, "main.py"))
+    for name in ("panels", "components", "checkout", "scanner", "store", "forecast"):
+        assert name in finder.modules, f"{name} is not reachable from main.py by a static import"
@@ -0,0 +1,18 @@
+# FILE: tests/test_plans.py
+"""The statements the app issues must keep using their indexes (see migrations.py)"""
+import pytest
+
+EXPECTED_PLANS = [
+    ("SELECT sum(total) FROM sales WHERE date >= ? AND date < ?", ("2025-01-01", "2025-01-02"), "COVERING INDEX idx_sales_date_cover"),
+    ("SELECT count(*), sum(total), sum(profit) FROM sales WHERE date >= ?", ("2025-01-01",), "COVERING INDEX idx_sales_date_cover"),
+    ("SELECT * FROM sales WHERE receipt_id=?", (1,), "INDEX idx_sales_receipt"),
+    ("SELECT id FROM receipts WHERE number=?", ("T1-000001",), "INDEX sqlite_autoindex_receipts_1"),
+    ("SELECT sum(quantity) FROM sales WHERE item_id=? AND date >= ?", (1, "2025-01-01"), "INDEX idx_sales_item_date"),
+    ("SELECT * FROM purchases WHERE item_id=? ORDER BY date", (1,), "INDEX idx_purchases_item_date"),
+    ("SELECT count(*) FROM items WHERE stock <= 5", (), "COVERING INDEX idx_items_stock"),
+    ("SELECT id FROM items WHERE name LIKE ?", ("Shirt%",), "INDEX idx_items_name"),
+]
+
+@pytest.mark.parametrize("sql, params, expect", EXPECTED_PLANS, ids=[p[2].split()[-1] for p in EXPECTED_PLANS])
+def test_query_plan(db, sql, params, expect):
+    assert expect in " | ".join(db.explain(sql, params))
@@ -0,0 +1,30 @@
+# FILE: tests/test_receipt_archive.py
+import os
+
+from receipts import render_receipt
+from receipt_archive import ReceiptArchive
+
+def receipt(n):
+    doc = {"id": f"T1-{n:06d}", "date": "2025-01-15 12:00", "total": 0, "lines": [("Women Kurti", n, 2500.0)]}
+    return doc["id"], render_receipt(doc)
+
+def test_torn_record_does_not_hide_later_receipts(tmp_path):
+    """A crash mid-write must not hide the receipts archived after it"""
+    (a, ta), (b, tb), (c, tc), (d, td) = map(receipt, range(1, 5))
+    archive = ReceiptArchive(str(tmp_path))
+    archive.put(a, ta, "2025-01"); archive.close()
+    seg = str(tmp_path / "2025-01.rca")
+    good = os.path.getsize(seg)
+    with open(seg, "rb") as f: rec = f.read()
+    with open(seg, "ab") as f: f.write(rec[:len(rec) // 2])                # Torn write of a copy of a
+    archive = ReceiptArchive(str(tmp_path))
+    archive.put(b, tb, "2025-01")                                            # Opening the segment cuts it off
+    assert [(n, off) for n, off, _ in archive.scan(seg)] == [(a, 0), (b, good)]
+    archive.close()
+    with open(seg, "ab") as f: f.write(rec[:len(rec) // 2])                # A segment torn by an older build:
+    archive = ReceiptArchive(str(tmp_path))                                  # later records land behind the junk
+    archive._segments["2025-01"] = open(seg, "ab")
+    archive.put(c, tc, "2025-01"); archive.put(d, td, "2025-01")
+    assert archive.rebuild_index() == 4
+    assert [archive.get(n) for n in (a, b, c, d)] == [ta, tb, tc, td]
+    archive.close()
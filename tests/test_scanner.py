@@ -0,0 +1,31 @@
+# FILE: tests/test_scanner.py
+import pytest
+
+import store
+from cart import Cart
+from scanner import BarcodeIndex, parse_entry, scan_item
+
+@pytest.mark.parametrize("text, expect", [("3*8901234567890", (3, "8901234567890")), ("ABC-1", (1, "ABC-1")), ("12", (1, "12"))])
+def test_parse_entry(text, expect):
+    assert parse_entry(text) == expect
+
+@pytest.mark.parametrize("text", ["0*8901234567890", "0000*ABC-1"])
+def test_zero_quantity_is_rejected(text):
+    with pytest.raises(ValueError, match="invalid quantity"):
+        parse_entry(text)
+
+def test_unknown_scan_leaves_cart_unchanged(db):
+    """An unknown code, or an item deleted since the index was built, adds nothing"""
+    db.execute("UPDATE items SET barcode = printf('2%012d', id)")
+    index = BarcodeIndex()
+    index.swap(BarcodeIndex.build(db.reader), db.data_token())
+    gone = db.scalar("SELECT max(id) FROM items")
+    db.execute("DELETE FROM items WHERE id = ?", (gone,))
+    cart = Cart()
+    qty, item = scan_item(index, db.reader, "2*2000000000001")
+    cart.add(item[0], item[1], item[2], qty, item[3])
+    before = cart.to_json()
+    for text in ("0000000000000", "3*NO-SUCH-SKU", str(gone + 1)):
+        assert scan_item(index, db.reader, text)[1] is None
+    assert cart.to_json() == before
+    assert store.item(db.reader, gone) is None